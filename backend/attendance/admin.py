@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Presence, Retard, Absence, BiometricLog
+from .models import (
+    Presence, Retard, Absence, BiometricLog, ScheduledJob, JobRun, Holiday, SiteClosure,
+    Shift, ShiftRotation, ShiftRotationStep, ShiftAssignment, AttendanceAnomaly, Device
+)
+from .jobs import validate_justifications
 
 @admin.register(Presence)
 class PresenceAdmin(admin.ModelAdmin):
@@ -153,23 +157,15 @@ class RetardAdmin(admin.ModelAdmin):
     
     def approve_justifications(self, request, queryset):
         """Approuver les justifications sélectionnées"""
-        from django.utils import timezone
-        updated = queryset.update(
-            justification_status='APPROUVEE',
-            validated_by=request.user,
-            validated_at=timezone.now()
-        )
+        results = validate_justifications(queryset, 'APPROUVEE', request.user)
+        updated = sum(result == 'updated' for result in results.values())
         self.message_user(request, f'{updated} justifications approuvées.')
     approve_justifications.short_description = 'Approuver les justifications sélectionnées'
     
     def reject_justifications(self, request, queryset):
         """Refuser les justifications sélectionnées"""
-        from django.utils import timezone
-        updated = queryset.update(
-            justification_status='REFUSEE',
-            validated_by=request.user,
-            validated_at=timezone.now()
-        )
+        results = validate_justifications(queryset, 'REFUSEE', request.user)
+        updated = sum(result == 'updated' for result in results.values())
         self.message_user(request, f'{updated} justifications refusées.')
     reject_justifications.short_description = 'Refuser les justifications sélectionnées'
 
@@ -234,23 +230,15 @@ class AbsenceAdmin(admin.ModelAdmin):
     
     def approve_justifications(self, request, queryset):
         """Approuver les justifications sélectionnées"""
-        from django.utils import timezone
-        updated = queryset.update(
-            justification_status='APPROUVEE',
-            validated_by=request.user,
-            validated_at=timezone.now()
-        )
+        results = validate_justifications(queryset, 'APPROUVEE', request.user)
+        updated = sum(result == 'updated' for result in results.values())
         self.message_user(request, f'{updated} justifications approuvées.')
     approve_justifications.short_description = 'Approuver les justifications sélectionnées'
     
     def reject_justifications(self, request, queryset):
         """Refuser les justifications sélectionnées"""
-        from django.utils import timezone
-        updated = queryset.update(
-            justification_status='REFUSEE',
-            validated_by=request.user,
-            validated_at=timezone.now()
-        )
+        results = validate_justifications(queryset, 'REFUSEE', request.user)
+        updated = sum(result == 'updated' for result in results.values())
         self.message_user(request, f'{updated} justifications refusées.')
     reject_justifications.short_description = 'Refuser les justifications sélectionnées'
 
@@ -309,4 +297,114 @@ class BiometricLogAdmin(admin.ModelAdmin):
                 processed += 1
         
         self.message_user(request, f'{processed} logs retraités avec succès.')
-    reprocess_logs.short_description = 'Retraiter les logs sélectionnés' 
\ No newline at end of file
+    reprocess_logs.short_description = 'Retraiter les logs sélectionnés' 
+
+@admin.register(Device)
+class DeviceAdmin(admin.ModelAdmin):
+    """Admin pour les dispositifs de pointage et leurs clés d'API"""
+    list_display = ['device_id', 'name', 'key_prefix', 'is_active', 'last_seen_at']
+    list_filter = ['is_active']
+    search_fields = ['device_id', 'name']
+    readonly_fields = ['key_prefix', 'last_seen_at', 'created_at', 'updated_at']
+    exclude = ['key_hash']
+    
+    actions = ['generate_keys', 'enable_devices', 'disable_devices']
+    
+    def save_model(self, request, obj, form, change):
+        key = obj.set_key() if not obj.key_hash else None
+        super().save_model(request, obj, form, change)
+        if key:
+            self.message_user(request, f'Clé du dispositif {obj.device_id} (affichée une seule fois) : {key}')
+    
+    def generate_keys(self, request, queryset):
+        """Générer de nouvelles clés (les anciennes cessent de fonctionner)"""
+        for device in queryset:
+            key = device.set_key()
+            device.save(update_fields=['key_prefix', 'key_hash', 'updated_at'])
+            self.message_user(request, f'Clé du dispositif {device.device_id} (affichée une seule fois) : {key}')
+    generate_keys.short_description = 'Générer une nouvelle clé'
+    
+    def enable_devices(self, request, queryset):
+        for device in queryset:
+            device.is_active = True
+            device.save(update_fields=['is_active', 'updated_at'])
+        self.message_user(request, f'{len(queryset)} dispositifs activés.')
+    enable_devices.short_description = 'Activer les dispositifs sélectionnés'
+    
+    def disable_devices(self, request, queryset):
+        for device in queryset:
+            device.is_active = False
+            device.save(update_fields=['is_active', 'updated_at'])
+        self.message_user(request, f'{len(queryset)} dispositifs désactivés.')
+    disable_devices.short_description = 'Désactiver les dispositifs sélectionnés'
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    """Admin pour l'état des tâches planifiées"""
+    list_display = ['name', 'next_run_at', 'last_success_at', 'locked_by', 'locked_until']
+    readonly_fields = ['name', 'last_success_at', 'locked_by', 'locked_until']
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    """Admin pour l'historique des tâches planifiées"""
+    list_display = ['job_name', 'status', 'started_at', 'duration_seconds', 'node']
+    list_filter = ['job_name', 'status']
+    date_hierarchy = 'started_at'
+    ordering = ['-started_at']
+    readonly_fields = [
+        'job_name', 'node', 'status', 'window_start', 'started_at',
+        'finished_at', 'duration_seconds', 'message'
+    ]
+
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    """Admin pour les jours fériés du calendrier de travail"""
+    list_display = ['label', 'date', 'recurring']
+    list_filter = ['recurring']
+    search_fields = ['label']
+    date_hierarchy = 'date'
+
+@admin.register(SiteClosure)
+class SiteClosureAdmin(admin.ModelAdmin):
+    """Admin pour les fermetures du site"""
+    list_display = ['label', 'start_date', 'end_date']
+    search_fields = ['label']
+    date_hierarchy = 'start_date'
+
+
+@admin.register(Shift)
+class ShiftAdmin(admin.ModelAdmin):
+    """Admin pour les horaires de travail"""
+    list_display = ['name', 'start_time', 'end_time']
+    search_fields = ['name']
+
+class ShiftRotationStepInline(admin.TabularInline):
+    model = ShiftRotationStep
+    extra = 1
+    fields = ['position', 'shift', 'days']
+
+@admin.register(ShiftRotation)
+class ShiftRotationAdmin(admin.ModelAdmin):
+    """Admin pour les rotations d'horaires"""
+    list_display = ['name']
+    search_fields = ['name']
+    inlines = [ShiftRotationStepInline]
+
+@admin.register(ShiftAssignment)
+class ShiftAssignmentAdmin(admin.ModelAdmin):
+    """Admin pour les affectations d'horaires"""
+    list_display = ['employee', 'shift', 'rotation', 'start_date', 'end_date']
+    list_filter = ['shift', 'rotation']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__username']
+    date_hierarchy = 'start_date'
+    raw_id_fields = ['employee']
+
+@admin.register(AttendanceAnomaly)
+class AttendanceAnomalyAdmin(admin.ModelAdmin):
+    """Admin pour les anomalies de pointage"""
+    list_display = ['date', 'kind', 'employee', 'biometric_id', 'status', 'resolved_by']
+    list_filter = ['kind', 'status', 'date']
+    search_fields = ['employee__first_name', 'employee__last_name', 'biometric_id']
+    date_hierarchy = 'date'
+    readonly_fields = ['kind', 'date', 'employee', 'biometric_id', 'details', 'created_at', 'updated_at']
@@ -0,0 +1,155 @@
+"""
+Détection des anomalies de pointage sur une période.
+
+Deux requêtes groupées suffisent quel que soit l'effectif :
+- les présences dont la journée est incohérente (entrée sans sortie, sortie
+  avant l'entrée) ;
+- les logs biométriques regroupés par badge et par jour (entrées depuis
+  plusieurs dispositifs, badges désactivés ou inconnus).
+Les résultats sont synchronisés avec la table AttendanceAnomaly : une
+nouvelle analyse de la même période ne crée pas de doublons.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, Min, OuterRef, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AttendanceAnomaly, BiometricLog, Presence
+from .shifts import shift_resolver
+
+User = get_user_model()
+
+
+def _crosses_midnight(employee_id, day):
+    """Horaire de nuit : la sortie a lieu le lendemain, la journée est incomplète par nature"""
+    start, end = shift_resolver.resolve(employee_id, day)
+    return end < start
+
+
+def detect_presence_anomalies(date_from, date_to):
+    """{(type, date, employee_id, biometric_id): détails} depuis les présences"""
+    today = timezone.localdate()
+    found = {}
+    rows = Presence.objects.filter(
+        date__gte=date_from, date__lte=date_to, time_in__isnull=False
+    ).filter(
+        # Une journée en cours (aujourd'hui) n'a pas encore de sortie
+        Q(time_out__isnull=True, date__lt=today) | Q(time_out__lt=F('time_in'))
+    ).values_list('id', 'employee_id', 'employee__biometric_id', 'date', 'time_in', 'time_out')
+    for presence_id, employee_id, biometric_id, day, time_in, time_out in rows.iterator():
+        if _crosses_midnight(employee_id, day):
+            continue
+        kind = 'ENTREE_SANS_SORTIE' if time_out is None else 'SORTIE_AVANT_ENTREE'
+        found[(kind, day, employee_id, biometric_id or '')] = {
+            'presence_id': presence_id,
+            'time_in': time_in.isoformat(),
+            'time_out': time_out.isoformat() if time_out else None,
+        }
+    return found
+
+
+def detect_log_anomalies(date_from, date_to):
+    """{(type, date, employee_id, biometric_id): détails} depuis les logs biométriques"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(date_from, time.min), tz)
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz)
+    groups = list(
+        BiometricLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(
+            day=TruncDate('timestamp', tzinfo=tz),
+            active_badge=Exists(User.objects.filter(biometric_id=OuterRef('biometric_id'), is_active=True)),
+        )
+        .values('biometric_id', 'day', 'active_badge')
+        .annotate(
+            punches=Count('id'),
+            entries=Count('id', filter=Q(log_type='ENTREE')),
+            entry_devices=Count('device_id', filter=Q(log_type='ENTREE'), distinct=True),
+            first_punch=Min('timestamp'),
+            last_punch=Max('timestamp'),
+        )
+        .filter(Q(entry_devices__gt=1) | Q(active_badge=False))
+        .order_by()
+    )
+    if not groups:
+        return {}
+
+    badges = {group['biometric_id'] for group in groups}
+    employees = {
+        biometric_id: employee_id
+        for biometric_id, employee_id in User.objects.filter(
+            biometric_id__in=badges).values_list('biometric_id', 'id')
+    }
+    # Dispositifs des entrées multiples (uniquement pour les badges signalés)
+    devices = defaultdict(set)
+    multi = {group['biometric_id'] for group in groups if group['entry_devices'] > 1}
+    if multi:
+        for biometric_id, day, device_id in BiometricLog.objects.filter(
+                timestamp__gte=start, timestamp__lt=end, log_type='ENTREE', biometric_id__in=multi
+        ).annotate(day=TruncDate('timestamp', tzinfo=tz)).values_list(
+                'biometric_id', 'day', 'device_id').distinct():
+            devices[(biometric_id, day)].add(device_id)
+
+    found = {}
+    for group in groups:
+        biometric_id, day = group['biometric_id'], group['day']
+        employee_id = employees.get(biometric_id)
+        details = {
+            'punches': group['punches'],
+            'entries': group['entries'],
+            'first_punch': timezone.localtime(group['first_punch'], tz).isoformat(),
+            'last_punch': timezone.localtime(group['last_punch'], tz).isoformat(),
+        }
+        if group['entry_devices'] > 1:
+            found[('ENTREES_MULTIPLES', day, employee_id, biometric_id)] = {
+                **details, 'devices': sorted(devices[(biometric_id, day)]),
+            }
+        if not group['active_badge']:
+            kind = 'BADGE_INACTIF' if employee_id else 'BADGE_INCONNU'
+            found[(kind, day, employee_id, biometric_id)] = details
+    return found
+
+
+def scan_anomalies(date_from, date_to=None):
+    """
+    Analyse la période et synchronise AttendanceAnomaly : création des
+    nouvelles anomalies, mise à jour de leurs détails, suppression des
+    anomalies ouvertes qui ont disparu (données corrigées entre-temps).
+    """
+    date_to = date_to or date_from
+    found = detect_presence_anomalies(date_from, date_to)
+    found.update(detect_log_anomalies(date_from, date_to))
+
+    existing = {
+        (kind, day, employee_id, biometric_id): (anomaly_id, status, details)
+        for anomaly_id, kind, day, employee_id, biometric_id, status, details in
+        AttendanceAnomaly.objects.filter(date__gte=date_from, date__lte=date_to).values_list(
+            'id', 'kind', 'date', 'employee_id', 'biometric_id', 'status', 'details'
+        )
+    }
+    now = timezone.now()
+    to_create = [
+        AttendanceAnomaly(kind=kind, date=day, employee_id=employee_id,
+                          biometric_id=biometric_id, details=details)
+        for (kind, day, employee_id, biometric_id), details in found.items()
+        if (kind, day, employee_id, biometric_id) not in existing
+    ]
+    to_update = [
+        AttendanceAnomaly(id=anomaly_id, details=found[key], updated_at=now)
+        for key, (anomaly_id, status, details) in existing.items()
+        if status == 'OUVERTE' and key in found and found[key] != details
+    ]
+    to_delete = [
+        anomaly_id for key, (anomaly_id, status, _) in existing.items()
+        if status == 'OUVERTE' and key not in found
+    ]
+    with transaction.atomic():
+        # Anomalies créées entre-temps par une analyse simultanée : ignorées
+        AttendanceAnomaly.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        AttendanceAnomaly.objects.bulk_update(to_update, ['details', 'updated_at'], batch_size=500)
+        AttendanceAnomaly.objects.filter(id__in=to_delete).delete()
+    return {'created': len(to_create), 'updated': len(to_update), 'removed': len(to_delete),
+            'found': len(found)}
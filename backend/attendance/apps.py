@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
-    verbose_name = 'Gestion des présences' 
\ No newline at end of file
+    verbose_name = 'Gestion des présences'
+
+    def ready(self):
+        # Enregistrement des signaux du journal des modifications
+        from . import changes  # noqa: F401
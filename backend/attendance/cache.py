@@ -0,0 +1,55 @@
+"""
+Cache par processus pour des données dérivées de tables rarement modifiées
+(calendrier de travail, affectations d'horaires, ...).
+
+La donnée est reconstruite lorsque la « version » des tables sources change.
+La version (nombre de lignes et dernière date de modification de chaque
+table) n'est recalculée qu'au plus toutes les `ttl` secondes : les lectures
+courantes ne coûtent aucune requête. Les signaux de sauvegarde invalident
+immédiatement le cache du processus qui a fait la modification.
+"""
+import threading
+import time as clock
+
+from django.db.models import Count, Max
+from django.db.models.signals import post_save, post_delete
+
+
+class TableVersionCache:
+    def __init__(self, models, build, ttl=60):
+        self.models = models
+        self.build = build
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = None
+        for model in models:
+            post_save.connect(self._invalidate, sender=model, weak=False)
+            post_delete.connect(self._invalidate, sender=model, weak=False)
+
+    def version(self):
+        return tuple(
+            tuple(model.objects.aggregate(count=Count('id'), updated=Max('updated_at')).values())
+            for model in self.models
+        )
+
+    def get(self):
+        now = clock.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.ttl:
+            return self._value
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.ttl:
+                version = self.version()
+                if version != self._version or self._checked_at is None:
+                    self._value = self.build()
+                    self._version = version
+                self._checked_at = now
+        return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = None
+
+    def _invalidate(self, sender, **kwargs):
+        self.invalidate()
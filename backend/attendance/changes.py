@@ -0,0 +1,168 @@
+"""
+Flux de changements des présences, retards et absences.
+
+Les signaux enregistrent chaque sauvegarde et suppression unitaire dans
+AttendanceChange ; les traitements de masse (update(), bulk_create(), ...)
+contournent les signaux et doivent appeler record_changes() eux-mêmes.
+
+L'identifiant des lignes sert de curseur. Sous PostgreSQL, une transaction
+longue peut valider un identifiant plus petit qu'une transaction concurrente
+déjà validée : chaque écriture annonce donc, par un verrou consultatif tenu
+jusqu'à la fin de sa transaction, le dernier identifiant attribué avant elle,
+et les lecteurs s'arrêtent au plus petit de ces seuils (settled_changes).
+Sous SQLite, les transactions d'écriture sont sérialisées : les identifiants
+sont validés dans l'ordre.
+"""
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import Presence, Retard, Absence, AttendanceChange
+
+RESOURCES = {
+    'presence': Presence,
+    'retard': Retard,
+    'absence': Absence,
+}
+
+RESOURCE_BY_MODEL = {model: resource for resource, model in RESOURCES.items()}
+
+# Champs exportés pour chaque ressource
+FEED_FIELDS = {
+    'presence': ['id', 'employee_id', 'date', 'time_in', 'time_out', 'is_late',
+                 'delay_minutes', 'created_at', 'updated_at'],
+    'retard': ['id', 'employee_id', 'presence_id', 'date', 'expected_time', 'actual_time',
+               'delay_minutes', 'justification', 'justification_status', 'justified_at',
+               'validated_by_id', 'validated_at', 'created_at', 'updated_at'],
+    'absence': ['id', 'employee_id', 'date', 'justification', 'justification_status',
+                'justified_at', 'validated_by_id', 'validated_at', 'created_at', 'updated_at'],
+}
+
+# Taille maximale des listes d'IDs passées à une requête IN
+ID_CHUNK_SIZE = 500
+
+# Espace des verrous consultatifs PostgreSQL du journal (premier entier de la clé)
+FEED_LOCK_CLASS = 28_001
+_LAST_SEQUENCE_SQL = (
+    "COALESCE(pg_sequence_last_value(pg_get_serial_sequence(%s, 'id')::regclass), 0)"
+)
+
+
+def _hold_watermark():
+    """
+    Annonce aux lecteurs que la transaction en cours va écrire dans le
+    journal : ses identifiants seront supérieurs au seuil annoncé
+    """
+    if connection.vendor != 'postgresql':
+        return
+    # Le seuil est le second entier de la clé (int4), borné à sa valeur maximale
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT pg_advisory_xact_lock_shared(%s, LEAST({_LAST_SEQUENCE_SQL}, 2147483647)::int)",
+            [FEED_LOCK_CLASS, AttendanceChange._meta.db_table]
+        )
+
+
+def _sequence_bound():
+    """
+    Plus grand identifiant lisible sans risque d'en sauter un validé plus
+    tard (None : pas de limite). Calculé avant la lecture des lignes : les
+    écritures qui commencent ensuite reçoivent des identifiants plus grands.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT LEAST({_LAST_SEQUENCE_SQL}, ("
+            "SELECT min(objid::bigint) FROM pg_locks WHERE locktype = 'advisory' "
+            "AND classid = %s AND objsubid = 2 AND pid <> pg_backend_pid()))",
+            [AttendanceChange._meta.db_table, FEED_LOCK_CLASS]
+        )
+        return cursor.fetchone()[0]
+
+
+def record_changes(model, rows, operation='UPSERT'):
+    """
+    Enregistre des modifications en masse.
+    `rows` est un itérable de couples (id, employee_id), par exemple
+    queryset.values_list('id', 'employee_id').
+    """
+    resource = RESOURCE_BY_MODEL[model]
+    # Seuil et insertion dans la même transaction (le verrou tombe à sa fin)
+    with transaction.atomic(savepoint=False):
+        _hold_watermark()
+        AttendanceChange.objects.bulk_create(
+            [
+                AttendanceChange(resource=resource, object_id=object_id,
+                                 employee_id=employee_id, operation=operation)
+                for object_id, employee_id in rows
+            ],
+            batch_size=ID_CHUNK_SIZE
+        )
+
+
+def _on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_changes(sender, [(instance.pk, instance.employee_id)])
+
+
+def _on_delete(sender, instance, **kwargs):
+    record_changes(sender, [(instance.pk, instance.employee_id)], operation='DELETE')
+
+
+for _model in RESOURCES.values():
+    post_save.connect(_on_save, sender=_model, dispatch_uid=f'attendance_change_save_{_model.__name__}')
+    post_delete.connect(_on_delete, sender=_model, dispatch_uid=f'attendance_change_delete_{_model.__name__}')
+
+
+def latest_sequence():
+    """Dernier numéro de séquence lisible sans risque (voir settled_changes)"""
+    return settled_changes().values_list('id', flat=True).order_by('-id').first() or 0
+
+
+def settled_changes():
+    """
+    Modifications lisibles sans risque : sous PostgreSQL, celles qui précèdent
+    le seuil des transactions d'écriture encore en cours (voir _hold_watermark)
+    """
+    queryset = AttendanceChange.objects.all()
+    bound = _sequence_bound()
+    if bound is not None:
+        queryset = queryset.filter(id__lte=bound)
+    return queryset
+
+
+def collect_changes(since, resources=None, employee_id=None, limit=None):
+    """
+    Lit les modifications postérieures au curseur `since`.
+    Retourne (curseur_final, {ressource: {object_id: (seq, operation, employee_id)}})
+    en ne gardant que la dernière opération de chaque élément.
+    """
+    queryset = settled_changes().filter(id__gt=since).order_by('id')
+    if resources:
+        queryset = queryset.filter(resource__in=resources)
+    if employee_id is not None:
+        queryset = queryset.filter(employee_id=employee_id)
+    if limit:
+        queryset = queryset[:limit]
+
+    cursor = since
+    latest = {resource: {} for resource in (resources or RESOURCES)}
+    for seq, resource, object_id, operation, employee in queryset.values_list(
+            'id', 'resource', 'object_id', 'operation', 'employee_id').iterator():
+        latest[resource][object_id] = (seq, operation, employee)
+        cursor = seq
+    return cursor, latest
+
+
+def fetch_upserts(resource, object_ids, fields=None):
+    """Lignes actuelles (dictionnaires) des éléments créés ou modifiés"""
+    model = RESOURCES[resource]
+    fields = fields or FEED_FIELDS[resource]
+    object_ids = sorted(object_ids)
+    rows = {}
+    for start in range(0, len(object_ids), ID_CHUNK_SIZE):
+        chunk = object_ids[start:start + ID_CHUNK_SIZE]
+        for row in model.objects.filter(id__in=chunk).values(*fields):
+            rows[row['id']] = row
+    return rows
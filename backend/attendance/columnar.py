@@ -0,0 +1,267 @@
+"""
+Exports colonnes (Parquet / Arrow IPC) pour les outils d'analyse.
+
+Contrairement aux exports Excel, les colonnes sont typées (dates, heures,
+minutes entières, booléens, codes de statut encodés en dictionnaire). Les
+lignes sont lues par lots depuis un curseur côté serveur et chaque lot est
+écrit comme un row group, ce qui garde la mémoire bornée quel que soit le
+volume. pyarrow est une dépendance optionnelle.
+"""
+import os
+from datetime import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import Presence, Retard, Absence, BiometricLog
+
+ROW_GROUP_SIZE = 50000
+
+FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            "L'export colonnes nécessite pyarrow (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def _presence_status(time_in, time_out):
+    if not time_in:
+        return 'ABSENT'
+    if not time_out:
+        return 'EN_COURS'
+    return 'TERMINE'
+
+
+def _worked_minutes(day, time_in, time_out):
+    if not (time_in and time_out):
+        return None
+    delta = datetime.combine(day, time_out) - datetime.combine(day, time_in)
+    return max(int(delta.total_seconds() // 60), 0)
+
+
+def _month_of_date(value):
+    return value.strftime('%Y-%m')
+
+
+def _month_of_timestamp(value):
+    return timezone.localtime(value).strftime('%Y-%m')
+
+
+class Dataset:
+    """
+    Description d'un jeu de données exporté : champs lus en base et colonnes
+    produites (nom, type pyarrow, fonction calculant la valeur d'une ligne).
+    """
+    def __init__(self, model, fields, columns, partition_field, month_of):
+        self.model = model
+        self.fields = fields
+        self.columns = columns
+        self.partition_field = partition_field
+        self.month_of = month_of
+        self._index = {field: position for position, field in enumerate(fields)}
+
+    def get(self, row, field):
+        return row[self._index[field]]
+
+    def schema(self, pa):
+        return pa.schema([(name, type_(pa)) for name, type_, _ in self.columns])
+
+    def to_table(self, pa, rows):
+        arrays = []
+        for name, type_, extract in self.columns:
+            pa_type = type_(pa)
+            values = [extract(self, row) for row in rows]
+            if pa.types.is_dictionary(pa_type):
+                array = pa.array(values, type=pa_type.value_type).dictionary_encode()
+            else:
+                array = pa.array(values, type=pa_type)
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=self.schema(pa))
+
+
+def _field(name):
+    return lambda dataset, row: dataset.get(row, name)
+
+
+def _category(pa):
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def _timestamp(pa):
+    return pa.timestamp('us', tz='UTC')
+
+
+DATASETS = {
+    'presences': Dataset(
+        Presence,
+        ('id', 'employee_id', 'date', 'time_in', 'time_out', 'is_late', 'delay_minutes',
+         'created_at', 'updated_at'),
+        [
+            ('id', lambda pa: pa.int64(), _field('id')),
+            ('employee_id', lambda pa: pa.int64(), _field('employee_id')),
+            ('date', lambda pa: pa.date32(), _field('date')),
+            ('time_in', lambda pa: pa.time64('us'), _field('time_in')),
+            ('time_out', lambda pa: pa.time64('us'), _field('time_out')),
+            ('is_late', lambda pa: pa.bool_(), _field('is_late')),
+            ('delay_minutes', lambda pa: pa.int32(), _field('delay_minutes')),
+            ('worked_minutes', lambda pa: pa.int32(), lambda ds, row: _worked_minutes(
+                ds.get(row, 'date'), ds.get(row, 'time_in'), ds.get(row, 'time_out'))),
+            ('status', _category, lambda ds, row: _presence_status(
+                ds.get(row, 'time_in'), ds.get(row, 'time_out'))),
+            ('created_at', _timestamp, _field('created_at')),
+            ('updated_at', _timestamp, _field('updated_at')),
+        ],
+        'date', _month_of_date,
+    ),
+    'retards': Dataset(
+        Retard,
+        ('id', 'employee_id', 'presence_id', 'date', 'expected_time', 'actual_time',
+         'delay_minutes', 'justification_status', 'justified_at', 'validated_by_id',
+         'validated_at', 'created_at'),
+        [
+            ('id', lambda pa: pa.int64(), _field('id')),
+            ('employee_id', lambda pa: pa.int64(), _field('employee_id')),
+            ('presence_id', lambda pa: pa.int64(), _field('presence_id')),
+            ('date', lambda pa: pa.date32(), _field('date')),
+            ('expected_time', lambda pa: pa.time64('us'), _field('expected_time')),
+            ('actual_time', lambda pa: pa.time64('us'), _field('actual_time')),
+            ('delay_minutes', lambda pa: pa.int32(), _field('delay_minutes')),
+            ('justification_status', _category, _field('justification_status')),
+            ('justified_at', _timestamp, _field('justified_at')),
+            ('validated_by_id', lambda pa: pa.int64(), _field('validated_by_id')),
+            ('validated_at', _timestamp, _field('validated_at')),
+            ('created_at', _timestamp, _field('created_at')),
+        ],
+        'date', _month_of_date,
+    ),
+    'absences': Dataset(
+        Absence,
+        ('id', 'employee_id', 'date', 'justification_status', 'justified_at',
+         'validated_by_id', 'validated_at', 'created_at'),
+        [
+            ('id', lambda pa: pa.int64(), _field('id')),
+            ('employee_id', lambda pa: pa.int64(), _field('employee_id')),
+            ('date', lambda pa: pa.date32(), _field('date')),
+            ('justification_status', _category, _field('justification_status')),
+            ('justified_at', _timestamp, _field('justified_at')),
+            ('validated_by_id', lambda pa: pa.int64(), _field('validated_by_id')),
+            ('validated_at', _timestamp, _field('validated_at')),
+            ('created_at', _timestamp, _field('created_at')),
+        ],
+        'date', _month_of_date,
+    ),
+    'biometric_logs': Dataset(
+        BiometricLog,
+        ('id', 'biometric_id', 'employee_id', 'log_type', 'timestamp', 'device_id',
+         'processed', 'created_at'),
+        [
+            ('id', lambda pa: pa.int64(), _field('id')),
+            ('biometric_id', lambda pa: pa.string(), _field('biometric_id')),
+            ('employee_id', lambda pa: pa.int64(), _field('employee_id')),
+            ('log_type', _category, _field('log_type')),
+            ('timestamp', _timestamp, _field('timestamp')),
+            ('device_id', _category, _field('device_id')),
+            ('processed', lambda pa: pa.bool_(), _field('processed')),
+            ('created_at', _timestamp, _field('created_at')),
+        ],
+        'timestamp', _month_of_timestamp,
+    ),
+}
+
+
+class _Writer:
+    """Écrit des row groups dans un fichier Parquet ou Arrow IPC"""
+    def __init__(self, pa, path, schema, file_format):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.rows = 0
+        if file_format == 'parquet':
+            self._writer = pa.parquet.ParquetWriter(path, schema, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(path, schema)
+
+    def write(self, table):
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        self._writer.close()
+
+
+def export_dataset(name, output_dir, file_format='parquet', partition_by_month=False,
+                   date_from=None, date_to=None, row_group_size=ROW_GROUP_SIZE):
+    """
+    Exporte un jeu de données et retourne la liste des (chemin, nombre_de_lignes)
+    écrits. Avec partition_by_month, les fichiers sont rangés sous
+    <output_dir>/<name>/month=YYYY-MM/ (partitionnement de type Hive).
+    """
+    pa = _require_pyarrow()
+    dataset = DATASETS[name]
+    extension = FORMATS[file_format]
+    schema = dataset.schema(pa)
+
+    queryset = dataset.model.objects.all()
+    lookup = dataset.partition_field
+    if lookup == 'timestamp':
+        lookup = 'timestamp__date'
+    if date_from:
+        queryset = queryset.filter(**{f'{lookup}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{lookup}__lte': date_to})
+    rows = queryset.order_by(dataset.partition_field, 'id').values_list(*dataset.fields)
+
+    written = []
+    writer = None
+    month = None
+    batch = []
+
+    def flush():
+        if batch:
+            writer.write(dataset.to_table(pa, batch))
+            batch.clear()
+
+    def open_writer(partition):
+        if partition is None:
+            path = os.path.join(output_dir, f'{name}{extension}')
+        else:
+            path = os.path.join(output_dir, name, f'month={partition}', f'part-0{extension}')
+        return _Writer(pa, path, schema, file_format)
+
+    try:
+        for row in rows.iterator(chunk_size=row_group_size):
+            if partition_by_month:
+                row_month = dataset.month_of(dataset.get(row, dataset.partition_field))
+                if row_month != month:
+                    if writer:
+                        flush()
+                        writer.close()
+                        written.append((writer.path, writer.rows))
+                    month = row_month
+                    writer = open_writer(month)
+            elif writer is None:
+                writer = open_writer(None)
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                flush()
+        if writer is None and not partition_by_month:
+            writer = open_writer(None)
+        if writer:
+            flush()
+            writer.close()
+            written.append((writer.path, writer.rows))
+    except BaseException:
+        if writer:
+            writer.close()
+        raise
+    return written
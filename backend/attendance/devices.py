@@ -0,0 +1,142 @@
+"""
+Authentification des dispositifs de pointage par clé d'API.
+
+Le dispositif envoie `Authorization: Device <clé>` (ou l'en-tête
+`X-Device-Key`). L'empreinte de la clé est comparée à un cache en mémoire
+des dispositifs actifs, relu au plus toutes les DEVICE_KEY_CACHE_TTL
+secondes : pas de requête par pointage, pas de hachage de mot de passe ni de
+jeton à rafraîchir. La date de dernier passage est accumulée en mémoire et
+écrite par lots (au plus toutes les DEVICE_LAST_SEEN_FLUSH secondes).
+"""
+import threading
+import time as clock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from rest_framework import exceptions, permissions
+from rest_framework.authentication import BaseAuthentication
+
+from .models import Device
+
+AUTH_KEYWORD = 'Device'
+KEY_HEADER = 'HTTP_X_DEVICE_KEY'
+
+
+class AuthenticatedDevice:
+    """Dispositif authentifié (request.auth)"""
+
+    def __init__(self, pk, device_id):
+        self.pk = pk
+        self.device_id = device_id
+
+    def __repr__(self):
+        return f"<AuthenticatedDevice {self.device_id}>"
+
+
+class DeviceKeyCache:
+    """
+    Empreinte de clé -> dispositif actif, relu en une requête au plus toutes
+    les `ttl` secondes ; un dispositif modifié invalide le cache du processus
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._loaded_at = None
+        self._seen = {}
+        self._flushed_at = clock.monotonic()
+        post_save.connect(self._invalidate, sender=Device, weak=False)
+        post_delete.connect(self._invalidate, sender=Device, weak=False)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'DEVICE_KEY_CACHE_TTL', 30)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'DEVICE_LAST_SEEN_FLUSH', 60)
+
+    def get(self, key):
+        """Dispositif actif correspondant à la clé, ou None"""
+        now = clock.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.ttl:
+            with self._lock:
+                if self._loaded_at is None or now - self._loaded_at >= self.ttl:
+                    self._devices = {
+                        key_hash: AuthenticatedDevice(pk, device_id)
+                        for pk, device_id, key_hash in Device.objects.filter(is_active=True)
+                        .exclude(key_hash='').values_list('id', 'device_id', 'key_hash')
+                    }
+                    self._loaded_at = now
+        return self._devices.get(Device.hash_key(key))
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _invalidate(self, sender, **kwargs):
+        self.invalidate()
+
+    def seen(self, device):
+        """Noter le passage du dispositif ; écriture groupée"""
+        with self._lock:
+            self._seen[device.pk] = timezone.now()
+            due = clock.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Écrire les dates de dernier passage accumulées (une requête)"""
+        with self._lock:
+            seen, self._seen = self._seen, {}
+            self._flushed_at = clock.monotonic()
+        if seen:
+            # bulk_update : pas de signal post_save, le cache des clés reste valide
+            Device.objects.bulk_update(
+                [Device(pk=pk, last_seen_at=seen_at) for pk, seen_at in seen.items()],
+                ['last_seen_at']
+            )
+
+
+device_keys = DeviceKeyCache()
+
+
+class DeviceKeyAuthentication(BaseAuthentication):
+    """
+    Clé d'API d'un dispositif. request.user reste anonyme, request.auth est
+    le dispositif (AuthenticatedDevice). Sans clé, la main passe aux autres
+    authentifications de la vue.
+    """
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        device = device_keys.get(key)
+        if device is None:
+            raise exceptions.AuthenticationFailed('Clé de dispositif invalide ou dispositif désactivé.')
+        device_keys.seen(device)
+        return AnonymousUser(), device
+
+    def get_key(self, request):
+        key = request.META.get(KEY_HEADER)
+        if key:
+            return key
+        parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(parts) == 2 and parts[0] == AUTH_KEYWORD:
+            return parts[1]
+        return None
+
+    def authenticate_header(self, request):
+        return AUTH_KEYWORD
+
+
+class IsDeviceOrAuthenticated(permissions.BasePermission):
+    """Dispositif authentifié par sa clé, ou utilisateur connecté (JWT)"""
+
+    def has_permission(self, request, view):
+        return isinstance(request.auth, AuthenticatedDevice) or bool(
+            request.user and request.user.is_authenticated
+        )
@@ -0,0 +1,414 @@
+"""
+Lecture rapide des listes de présences, retards, absences et logs.
+
+Les sérialiseurs DRF instancient chaque objet (et ses relations) puis
+appellent un champ Python par attribut. Pour les actions de liste, les
+lignes sont ici lues par values() avec les champs calculés (statut,
+libellés, formats d'affichage) produits directement en SQL, puis rendues
+en dictionnaires de même forme que les sérialiseurs.
+
+Chaque champ de sortie décrit les colonnes qu'il lit et sa fonction de
+rendu : une liste n'interroge que les colonnes des champs demandés
+(`?fields=`, `?expand=`, voir shapes.py).
+"""
+from django.db import connections
+from django.db.models import Case, CharField, F, IntegerField, TimeField, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Substr
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import Retard, Absence, BiometricLog
+from .serializers import presence_total_hours
+from .shapes import ShapedViewMixin
+
+
+class RenderContext:
+    """Données communes à toutes les lignes d'une page (fuseau lu une seule fois)"""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.tz = timezone.get_current_timezone()
+
+
+# Conversions identiques à celles des champs DRF correspondants (format ISO 8601)
+
+def _iso(value, context):
+    return None if value is None else value.isoformat()
+
+
+def _datetime(value, context):
+    """Comme serializers.DateTimeField : heure locale, suffixe Z pour UTC"""
+    if value is None:
+        return None
+    value = value.astimezone(context.tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _date_display(value, context):
+    """JJ/MM/AAAA"""
+    return f'{value.day:02d}/{value.month:02d}/{value.year}'
+
+
+# Expressions SQL des champs calculés. Seules des fonctions évaluées nativement
+# par toutes les bases sont utilisées (sous SQLite, Extract/LPad sont des
+# fonctions Python appelées pour chaque ligne : le format JJ/MM/AAAA est donc
+# produit à partir de la date lue).
+
+def time_display(path):
+    """HH:MM"""
+    return Substr(Cast(path, CharField()), 1, 5)
+
+
+def choice_label(path, choices):
+    """Libellé d'un champ à choix"""
+    return Case(*[When(**{path: value}, then=Value(label)) for value, label in choices],
+                default=Value(''), output_field=CharField())
+
+
+def full_name(prefix):
+    return Concat(F(f'{prefix}first_name'), Value(' '), F(f'{prefix}last_name'), output_field=CharField())
+
+
+class Field:
+    """Champ de sortie : colonnes lues (chemins ou annotations SQL) et rendu d'une ligne"""
+
+    children = None
+
+    def __init__(self, render, columns=(), annotations=None):
+        self.render = render
+        self.columns = tuple(columns)
+        self.annotations = annotations or {}
+
+
+def column(path, convert=None):
+    if convert is None:
+        return Field(lambda row, context: row[path], columns=[path])
+    return Field(lambda row, context: convert(row[path], context), columns=[path])
+
+
+def annotation(alias, expression):
+    return Field(lambda row, context: row[alias], annotations={alias: expression})
+
+
+def file_url(path, model, field_name):
+    """URL du fichier, absolue si la requête est connue (comme serializers.FileField)"""
+    storage = model._meta.get_field(field_name).storage
+
+    def render(row, context):
+        name = row[path]
+        if not name:
+            return None
+        url = storage.url(name)
+        return context.request.build_absolute_uri(url) if context.request is not None else url
+    return Field(render, columns=[path])
+
+
+def nested(fields, pk=None):
+    """Objet imbriqué ; `pk` : colonne rendue à la place si la relation n'est pas développée"""
+    columns = []
+    annotations = {}
+    for field in fields.values():
+        columns.extend(field.columns)
+        annotations.update(field.annotations)
+    renders = [(name, field.render) for name, field in fields.items()]
+
+    def render(row, context):
+        return {name: field_render(row, context) for name, field_render in renders}
+    field = Field(render, columns=columns, annotations=annotations)
+    field.children, field.pk = fields, pk
+    return field
+
+
+def shaped(fields, shape):
+    """Champs retenus par la forme demandée, relations non développées réduites à leur id"""
+    shape.check(fields, [name for name, field in fields.items() if field.children is not None])
+    result = {}
+    for name, field in fields.items():
+        if not shape.includes(name):
+            continue
+        if field.children is not None:
+            if shape.expands(name):
+                field = nested(shaped(field.children, shape.child(name)), pk=field.pk)
+            else:
+                field = column(field.pk)
+        result[name] = field
+    return result
+
+
+def _alias(prefix, name):
+    """Nom d'annotation sans '__' (réservé aux chemins de relations)"""
+    return 'fp_' + (prefix + name).replace('__', '_')
+
+
+# Champs de chaque ressource, avec le préfixe de la relation quand ils sont imbriqués
+
+def user_fields(prefix=''):
+    """Même forme que UserSerializer"""
+    return {
+        'id': column(f'{prefix}id'),
+        'first_name': column(f'{prefix}first_name'),
+        'last_name': column(f'{prefix}last_name'),
+        'email': column(f'{prefix}email'),
+        'full_name': annotation(_alias(prefix, 'full_name'), full_name(prefix)),
+        'biometric_id': column(f'{prefix}biometric_id'),
+    }
+
+
+def presence_fields(prefix=''):
+    """Même forme que PresenceSerializer"""
+    date, time_in, time_out = f'{prefix}date', f'{prefix}time_in', f'{prefix}time_out'
+
+    def total_hours(row, context):
+        return presence_total_hours(row[date], row[time_in], row[time_out])
+
+    return {
+        'id': column(f'{prefix}id'),
+        'employee': nested(user_fields(f'{prefix}employee__'), pk=f'{prefix}employee'),
+        'date': column(date, _iso),
+        'date_display': column(date, _date_display),
+        'time_in': column(time_in, _iso),
+        'time_in_display': annotation(_alias(prefix, 'time_in_display'),
+                                      Coalesce(time_display(time_in), Value('-'))),
+        'time_out': column(time_out, _iso),
+        'time_out_display': annotation(_alias(prefix, 'time_out_display'),
+                                       Coalesce(time_display(time_out), Value('-'))),
+        'is_late': column(f'{prefix}is_late'),
+        'delay_minutes': column(f'{prefix}delay_minutes'),
+        'status': annotation(_alias(prefix, 'status'), Case(
+            When(**{f'{time_in}__isnull': True}, then=Value('ABSENT')),
+            When(**{f'{time_out}__isnull': True}, then=Value('EN_COURS')),
+            default=Value('TERMINE'), output_field=CharField()
+        )),
+        'total_hours': Field(total_hours, columns=[date, time_in, time_out]),
+        'auto_closed': column(f'{prefix}auto_closed'),
+        'created_at': column(f'{prefix}created_at', _datetime),
+        'updated_at': column(f'{prefix}updated_at', _datetime),
+    }
+
+
+def _justification_fields(model):
+    """Champs communs aux retards et aux absences"""
+    validated_by_name = Case(
+        When(validated_by__isnull=True, then=Value(None)),
+        default=full_name('validated_by__'), output_field=CharField()
+    )
+    return {
+        'justification': column('justification'),
+        'justification_file': file_url('justification_file', model, 'justification_file'),
+        'justification_status': column('justification_status'),
+        'status_display': annotation('fp_status_display',
+                                     choice_label('justification_status', model.STATUS_CHOICES)),
+        'justified_at': column('justified_at', _datetime),
+        'validated_by': column('validated_by'),
+        'validated_by_name': annotation('fp_validated_by_name', validated_by_name),
+        'validated_at': column('validated_at', _datetime),
+        'created_at': column('created_at', _datetime),
+        'updated_at': column('updated_at', _datetime),
+    }
+
+
+def retard_fields():
+    """Même forme que RetardSerializer"""
+    justification = _justification_fields(Retard)
+    return {
+        'id': column('id'),
+        'employee': nested(user_fields('employee__'), pk='employee'),
+        'presence': nested(presence_fields('presence__'), pk='presence'),
+        'date': column('date', _iso),
+        'date_display': column('date', _date_display),
+        'expected_time': column('expected_time', _iso),
+        'expected_time_display': annotation('fp_expected_time_display', time_display('expected_time')),
+        'actual_time': column('actual_time', _iso),
+        'actual_time_display': annotation('fp_actual_time_display', time_display('actual_time')),
+        'delay_minutes': column('delay_minutes'),
+        'justification': justification['justification'],
+        'justification_file': justification['justification_file'],
+        'justification_status': justification['justification_status'],
+        'status_display': justification['status_display'],
+        'justified_at': justification['justified_at'],
+        'validated_by': justification['validated_by'],
+        'validated_by_name': justification['validated_by_name'],
+        'validated_at': justification['validated_at'],
+        'created_at': justification['created_at'],
+        'updated_at': justification['updated_at'],
+    }
+
+
+def absence_fields():
+    """Même forme que AbsenceSerializer"""
+    justification = _justification_fields(Absence)
+    return {
+        'id': column('id'),
+        'employee': nested(user_fields('employee__'), pk='employee'),
+        'date': column('date', _iso),
+        'date_display': column('date', _date_display),
+        'justification': justification['justification'],
+        'justification_file': justification['justification_file'],
+        'justification_status': justification['justification_status'],
+        'status_display': justification['status_display'],
+        'justified_at': justification['justified_at'],
+        'validated_by': justification['validated_by'],
+        'validated_by_name': justification['validated_by_name'],
+        'validated_at': justification['validated_at'],
+        'created_at': justification['created_at'],
+        'updated_at': justification['updated_at'],
+    }
+
+
+def biometric_log_fields():
+    """Même forme que BiometricLogSerializer"""
+    def timestamp_display(row, context):
+        # Comme le sérialiseur : horodatage tel que stocké (UTC)
+        return row['timestamp'].strftime('%d/%m/%Y %H:%M:%S')
+
+    return {
+        'id': column('id'),
+        'biometric_id': column('biometric_id'),
+        'log_type': column('log_type'),
+        'log_type_display': annotation('fp_log_type_display',
+                                       choice_label('log_type', BiometricLog.LOG_TYPES)),
+        'timestamp': column('timestamp', _datetime),
+        'timestamp_display': Field(timestamp_display, columns=['timestamp']),
+        'device_id': column('device_id'),
+        'raw_data': column('raw_data'),
+        'processed': column('processed'),
+        'employee': column('employee'),
+        'employee_name': annotation('fp_employee_name', Case(
+            When(employee__isnull=True, then=Value('Employé non trouvé')),
+            default=full_name('employee__'), output_field=CharField()
+        )),
+        'created_at': column('created_at', _datetime),
+    }
+
+
+class RowSpec:
+    """Projection values() et rendu des lignes pour un ensemble de champs"""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.root = nested(fields)
+
+    def shaped(self, shape):
+        """Spécification réduite à la forme demandée"""
+        if shape.is_full:
+            return self
+        return RowSpec(shaped(self.fields, shape))
+
+    def project(self, queryset, extra=()):
+        """`extra` : colonnes lues en plus des champs (clé de pagination)"""
+        return queryset.values(*dict.fromkeys(self.root.columns + tuple(extra)), **self.root.annotations)
+
+    def render(self, rows, request=None):
+        render = self.root.render
+        context = RenderContext(request)
+        return [render(row, context) for row in rows]
+
+    def serialize(self, queryset, request=None):
+        return self.render(self.project(queryset), request)
+
+
+PRESENCE_SPEC = RowSpec(presence_fields())
+RETARD_SPEC = RowSpec(retard_fields())
+ABSENCE_SPEC = RowSpec(absence_fields())
+BIOMETRIC_LOG_SPEC = RowSpec(biometric_log_fields())
+
+
+# Historique fusionné absences + retards : les deux branches d'un UNION ALL
+# doivent lire les mêmes colonnes dans le même ordre. Les champs propres aux
+# retards sont donc des annotations des deux côtés (NULL pour les absences).
+
+TIMELINE_ORDERING = ('-date', '-fp_type', '-id')
+
+
+def timeline_fields(model):
+    """Ligne d'historique, de même forme pour une absence et pour un retard"""
+    justification = _justification_fields(model)
+    retard = model is Retard
+
+    def retard_only(name, output_field):
+        """Colonne du retard, NULL pour une absence"""
+        return F(name) if retard else Value(None, output_field=output_field)
+
+    def time_of_day(alias, name):
+        return Field(lambda row, context: _iso(row[alias], context),
+                     annotations={alias: retard_only(name, TimeField())})
+
+    return {
+        'type': annotation('fp_type', Value('RETARD' if retard else 'ABSENCE')),
+        'id': column('id'),
+        'date': column('date', _iso),
+        'date_display': column('date', _date_display),
+        'expected_time': time_of_day('fp_expected_time', 'expected_time'),
+        'actual_time': time_of_day('fp_actual_time', 'actual_time'),
+        'delay_minutes': annotation('fp_delay_minutes', retard_only('delay_minutes', IntegerField())),
+        'presence': annotation('fp_presence', retard_only('presence', IntegerField())),
+        **justification,
+    }
+
+
+TIMELINE_ABSENCE_SPEC = RowSpec(timeline_fields(Absence))
+TIMELINE_RETARD_SPEC = RowSpec(timeline_fields(Retard))
+
+
+class UnionQuery:
+    """
+    Querysets values() réunis par UNION ALL, avec l'interface utilisée par
+    les paginations (filter, order_by, count, tranches) : les filtres sont
+    appliqués dans chaque branche, où ils profitent des index
+    """
+
+    def __init__(self, branches, ordering=()):
+        self.branches = branches
+        self.ordering = tuple(ordering)
+        self.model = branches[0].model
+
+    def filter(self, *args, **kwargs):
+        return UnionQuery([branch.filter(*args, **kwargs) for branch in self.branches], self.ordering)
+
+    def order_by(self, *ordering):
+        return UnionQuery(self.branches, ordering)
+
+    def union(self, branches):
+        first, *others = [branch.order_by() for branch in branches]
+        return first.union(*others, all=True)
+
+    def count(self):
+        return self.union(self.branches).count()
+
+    def __getitem__(self, item):
+        branches = self.branches
+        db = branches[0].db
+        if (isinstance(item, slice) and not item.start and item.stop is not None and self.ordering
+                and connections[db].features.supports_slicing_ordering_in_compound):
+            # Chaque branche ne lit que ses `stop` premières lignes dans l'ordre final
+            branches = [branch.order_by(*self.ordering)[:item.stop] for branch in branches]
+            first, *others = branches
+            return first.union(*others, all=True).order_by(*self.ordering)[item]
+        return self.union(branches).order_by(*self.ordering)[item]
+
+
+def timeline(absences, retards):
+    """Historique absences + retards, trié par date (plus récent d'abord)"""
+    return UnionQuery([TIMELINE_ABSENCE_SPEC.project(absences),
+                       TIMELINE_RETARD_SPEC.project(retards)], TIMELINE_ORDERING)
+
+
+class FastListMixin(ShapedViewMixin):
+    """
+    Action list servie par values() + RowSpec au lieu du sérialiseur.
+    `?fast=0` force le sérialiseur (comparaison, débogage).
+    """
+    list_spec = None
+
+    def list(self, request, *args, **kwargs):
+        if self.list_spec is None or request.query_params.get('fast') == '0':
+            return super().list(request, *args, **kwargs)
+        spec = self.list_spec.shaped(self.get_shape())
+        keyset = [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+        rows = spec.project(self.filter_queryset(self.get_queryset()), extra=keyset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(spec.render(page, request))
+        return Response(spec.render(rows, request))
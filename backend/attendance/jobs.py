@@ -0,0 +1,453 @@
+"""
+Traitements de masse sur les présences (absences automatiques, ...).
+
+Ces fonctions travaillent par requêtes ensemblistes et par lots afin de
+rester rapides et de consommer peu de mémoire, quelle que soit la taille
+de l'effectif ou de la période traitée.
+"""
+import os
+import time as clock
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .anomalies import scan_anomalies
+from .changes import record_changes
+from .models import Presence, Retard, Absence, BiometricLog, AttendanceAnomaly
+from .scheduler import scheduled
+from .shifts import shift_resolver
+from .workcalendar import work_calendar
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+
+
+def daterange(date_from, date_to):
+    """Jours de date_from à date_to inclus"""
+    day = date_from
+    while day <= date_to:
+        yield day
+        day += timedelta(days=1)
+
+
+def employees_without_record(day):
+    """Employés actifs n'ayant ni présence ni absence à cette date (anti-jointure)"""
+    return User.objects.filter(is_active=True, role='EMPLOYE').filter(
+        ~Exists(Presence.objects.filter(employee=OuterRef('pk'), date=day)),
+        ~Exists(Absence.objects.filter(employee=OuterRef('pk'), date=day)),
+    )
+
+
+def create_absences(date_from, date_to=None, chunk_size=CHUNK_SIZE):
+    """
+    Crée les absences des employés qui n'ont pas pointé, pour chaque jour
+    travaillé de la période. Retourne {date: nombre d'absences créées}.
+    """
+    date_to = date_to or date_from
+    created = {}
+    for day in daterange(date_from, date_to):
+        created[day] = 0
+        # Pas d'absence les jours de repos, fériés ou de fermeture du site
+        if not work_calendar.is_working_day(day):
+            continue
+        last_id = 0
+        while True:
+            # Pagination par clé : chaque lot est une nouvelle requête, on ne
+            # garde jamais plus de chunk_size identifiants en mémoire
+            batch = list(
+                employees_without_record(day)
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                # Employés du lot verrouillés, puis anti-jointure (présences et
+                # absences) refaite sous le verrou : une exécution simultanée
+                # ou un pointage enregistré entre-temps est pris en compte.
+                # PostgreSQL : FOR UPDATE bloque aussi les insertions de
+                # présences de ces employés (verrou de clé étrangère) jusqu'à
+                # la validation. SQLite ignore FOR UPDATE, mais preslog.sqlite
+                # ouvre la transaction en BEGIN IMMEDIATE : les écritures sont
+                # sérialisées et la relecture ci-dessous est exacte.
+                list(User.objects.select_for_update().filter(id__in=batch).values_list('id', flat=True))
+                missing = list(
+                    employees_without_record(day).filter(id__in=batch).values_list('id', flat=True)
+                )
+                Absence.objects.bulk_create(
+                    [Absence(employee_id=employee_id, date=day) for employee_id in missing],
+                    ignore_conflicts=True
+                )
+                record_changes(Absence, Absence.objects.filter(
+                    date=day, employee_id__in=missing
+                ).values_list('id', 'employee_id'))
+            created[day] += len(missing)
+            last_id = batch[-1]
+    return created
+
+
+def _grouped_update(queryset, groups, now):
+    """Une requête UPDATE par jeu de valeurs : {(champ, valeur), ...: [ids]}"""
+    for values, ids in groups.items():
+        queryset.filter(id__in=ids).update(updated_at=now, **dict(values))
+
+
+def recompute_lateness(date_from=None, date_to=None, employee_ids=None, presence_ids=None,
+                       chunk_size=CHUNK_SIZE):
+    """
+    Recalcule is_late / delay_minutes des présences (après un changement
+    d'horaire ou de calendrier) et aligne les retards : création des retards
+    manquants, mise à jour des retards existants, suppression des retards
+    qui n'en sont plus. Un retard qui n'en est plus mais porte une
+    justification ou une décision RH est conservé tel quel et compté dans
+    `retards_kept`. Aucun objet n'est chargé : lecture de tuples par lots
+    et requêtes UPDATE groupées par valeur.
+    Retourne le nombre de lignes examinées et modifiées.
+    """
+    shift_resolver.invalidate()
+    work_calendar.invalidate()
+    stats = {
+        'presences_scanned': 0, 'presences_updated': 0,
+        'retards_created': 0, 'retards_updated': 0, 'retards_deleted': 0, 'retards_kept': 0,
+    }
+    presences = Presence.objects.all()
+    if date_from:
+        presences = presences.filter(date__gte=date_from)
+    if date_to:
+        presences = presences.filter(date__lte=date_to)
+    if employee_ids is not None:
+        presences = presences.filter(employee_id__in=employee_ids)
+    if presence_ids is not None:
+        presences = presences.filter(id__in=presence_ids)
+
+    last_id = 0
+    while True:
+        rows = list(
+            presences.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'employee_id', 'date', 'time_in', 'is_late', 'delay_minutes'
+            )[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        stats['presences_scanned'] += len(rows)
+
+        presence_groups = defaultdict(list)
+        changed_presences = []
+        # Retard attendu pour chaque présence : (heure attendue, heure réelle, minutes)
+        expected_retards = {}
+        for presence_id, employee_id, day, time_in, is_late, delay in rows:
+            new_late, new_delay, expected_start = shift_resolver.lateness(employee_id, day, time_in)
+            if (new_late, new_delay) != (is_late, delay):
+                presence_groups[(('is_late', new_late), ('delay_minutes', new_delay))].append(presence_id)
+                changed_presences.append((presence_id, employee_id))
+            if new_late and new_delay > 0:
+                expected_retards[presence_id] = (employee_id, day, expected_start, time_in, new_delay)
+
+        existing = {
+            presence_id: (retard_id, employee_id, (expected_time, actual_time, delay),
+                          status == 'EN_ATTENTE' and not justification and not justification_file)
+            for retard_id, presence_id, employee_id, expected_time, actual_time, delay,
+            status, justification, justification_file in
+            Retard.objects.filter(presence_id__in=[row[0] for row in rows]).values_list(
+                'id', 'presence_id', 'employee_id', 'expected_time', 'actual_time', 'delay_minutes',
+                'justification_status', 'justification', 'justification_file'
+            )
+        }
+        retard_groups = defaultdict(list)
+        changed_retards = []
+        deleted_retards = []
+        for presence_id, (retard_id, employee_id, current, unjustified) in existing.items():
+            expected = expected_retards.pop(presence_id, None)
+            if expected is None:
+                if unjustified:
+                    deleted_retards.append(retard_id)
+                else:
+                    # Justification ou décision RH : rien n'est perdu, la RH tranche
+                    stats['retards_kept'] += 1
+            elif expected[2:] != current:
+                retard_groups[(('expected_time', expected[2]), ('actual_time', expected[3]),
+                               ('delay_minutes', expected[4]))].append(retard_id)
+                changed_retards.append((retard_id, employee_id))
+
+        now = timezone.now()
+        with transaction.atomic():
+            _grouped_update(Presence.objects, presence_groups, now)
+            record_changes(Presence, changed_presences)
+            _grouped_update(Retard.objects, retard_groups, now)
+            record_changes(Retard, changed_retards)
+            if deleted_retards:
+                # Retards encore sans justification ; journal alimenté par les signaux
+                Retard.objects.filter(id__in=deleted_retards).delete()
+            if expected_retards:
+                Retard.objects.bulk_create([
+                    Retard(employee_id=employee_id, presence_id=presence_id, date=day,
+                           expected_time=expected_start, actual_time=time_in, delay_minutes=delay)
+                    for presence_id, (employee_id, day, expected_start, time_in, delay)
+                    in expected_retards.items()
+                ])
+                record_changes(Retard, Retard.objects.filter(
+                    presence_id__in=list(expected_retards)
+                ).values_list('id', 'employee_id'))
+
+        stats['presences_updated'] += len(changed_presences)
+        stats['retards_updated'] += len(changed_retards)
+        stats['retards_deleted'] += len(deleted_retards)
+        stats['retards_created'] += len(expected_retards)
+    return stats
+
+
+def apply_manual_punches(punches, chunk_size=CHUNK_SIZE):
+    """
+    Corrections de pointage en masse (RH). `punches` : liste de dictionnaires
+    {employee_id, date, time_in, time_out} pour des employés actifs, sans
+    doublon (employé, date) ; une heure absente est conservée, None l'efface.
+    Les présences sont créées ou modifiées par lots, les retards recalculés
+    ensemblistement et les absences encore en attente et sans justification
+    des journées pointées supprimées (une absence justifiée est conservée et
+    comptée dans `absences_kept`), le tout dans une transaction.
+    Retourne ([(résultat, id de présence)] dans l'ordre de `punches`, stats) ;
+    résultat : 'created', 'updated' ou 'unchanged'.
+    """
+    keys = [(punch['employee_id'], punch['date']) for punch in punches]
+    employee_ids = {employee_id for employee_id, _ in keys}
+    days = {day for _, day in keys}
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'absences_removed': 0, 'absences_kept': 0}
+    now = timezone.now()
+
+    with transaction.atomic():
+        existing = {
+            (employee_id, day): (presence_id, time_in, time_out, auto_closed)
+            for presence_id, employee_id, day, time_in, time_out, auto_closed in
+            Presence.objects.select_for_update().filter(
+                employee_id__in=employee_ids, date__in=days
+            ).values_list('id', 'employee_id', 'date', 'time_in', 'time_out', 'auto_closed')
+        }
+        created, updated, outcomes = [], [], []
+        for key, punch in zip(keys, punches):
+            current = existing.get(key)
+            if current is None:
+                created.append(Presence(employee_id=key[0], date=key[1],
+                                        time_in=punch.get('time_in'), time_out=punch.get('time_out')))
+                outcomes.append('created')
+                continue
+            presence_id, time_in, time_out, auto_closed = current
+            new = (
+                punch.get('time_in', time_in),
+                punch.get('time_out', time_out),
+                # Une sortie saisie remplace la clôture automatique
+                auto_closed and 'time_out' not in punch,
+            )
+            if new == (time_in, time_out, auto_closed):
+                outcomes.append('unchanged')
+                continue
+            updated.append(Presence(id=presence_id, time_in=new[0], time_out=new[1],
+                                    auto_closed=new[2], updated_at=now))
+            outcomes.append('updated')
+
+        Presence.objects.bulk_create(created, batch_size=chunk_size)
+        Presence.objects.bulk_update(updated, ['time_in', 'time_out', 'auto_closed', 'updated_at'],
+                                     batch_size=chunk_size)
+
+        presences = {
+            (employee_id, day): (presence_id, time_in)
+            for presence_id, employee_id, day, time_in in Presence.objects.filter(
+                employee_id__in=employee_ids, date__in=days
+            ).values_list('id', 'employee_id', 'date', 'time_in')
+        }
+        touched = [(presences[key][0], key[0]) for key, outcome in zip(keys, outcomes) if outcome != 'unchanged']
+        record_changes(Presence, touched)
+        if touched:
+            stats.update(recompute_lateness(presence_ids=[presence_id for presence_id, _ in touched],
+                                            chunk_size=chunk_size))
+
+        # Journées désormais pointées : l'absence créée automatiquement n'a plus lieu d'être
+        punched = {key for key, outcome in zip(keys, outcomes)
+                   if outcome != 'unchanged' and presences[key][1] is not None}
+        absences = []
+        for absence_id, employee_id, day, justification, justification_file in Absence.objects.filter(
+                employee_id__in=employee_ids, date__in=days, justification_status='EN_ATTENTE'
+        ).values_list('id', 'employee_id', 'date', 'justification', 'justification_file'):
+            if (employee_id, day) not in punched:
+                continue
+            if justification or justification_file:
+                # Justification déposée par l'employé : conservée, la RH tranche
+                stats['absences_kept'] += 1
+            else:
+                absences.append(absence_id)
+        if absences:
+            # Journal des changements alimenté par les signaux
+            Absence.objects.filter(id__in=absences).delete()
+        stats['absences_removed'] = len(absences)
+
+    for outcome in outcomes:
+        stats[outcome] += 1
+    return [(outcome, presences[key][0]) for key, outcome in zip(keys, outcomes)], stats
+
+
+def validate_justifications(queryset, status, validated_by):
+    """
+    Approuve ou refuse (`status` : APPROUVEE / REFUSEE) les justifications des
+    retards ou absences de `queryset` par une seule requête UPDATE.
+    Les éléments déjà dans ce statut gardent leur validation d'origine.
+    Retourne {id: 'updated' | 'unchanged'}.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values_list('id', 'employee_id', 'justification_status'))
+        changed = [(object_id, employee_id) for object_id, employee_id, current in rows if current != status]
+        if changed:
+            queryset.exclude(justification_status=status).update(
+                justification_status=status, validated_by=validated_by, validated_at=now, updated_at=now
+            )
+            record_changes(queryset.model, changed)
+    results = {object_id: 'unchanged' for object_id, _, _ in rows}
+    results.update((object_id, 'updated') for object_id, _ in changed)
+    return results
+
+
+AUTO_CLOSE_POLICIES = ('shift_end', 'cap', 'flag')
+
+
+def auto_close_time(policy, employee_id, day, time_in):
+    """Heure de sortie retenue pour une présence restée ouverte (None : ne pas clôturer)"""
+    if policy == 'cap':
+        cap = datetime.combine(day, time_in) + timedelta(hours=settings.PRESENCE_AUTO_CLOSE_CAP_HOURS)
+        return cap.time() if cap.date() == day else time(23, 59)
+    start, end = shift_resolver.resolve(employee_id, day)
+    # Horaire de nuit : la sortie a lieu le lendemain, la présence n'est pas clôturée
+    if end < start:
+        return None
+    return max(end, time_in)
+
+
+def close_open_presences(date_from, date_to=None, policy=None, chunk_size=CHUNK_SIZE):
+    """
+    Clôture les présences restées sans sortie des jours écoulés (jamais
+    aujourd'hui) selon la politique PRESENCE_AUTO_CLOSE_POLICY :
+    - 'shift_end' : sortie à l'heure de fin de l'horaire de l'employé ;
+    - 'cap' : sortie à l'entrée + PRESENCE_AUTO_CLOSE_CAP_HOURS ;
+    - 'flag' : présence laissée ouverte et signalée en anomalie.
+    Les présences clôturées sont marquées auto_closed ; chaque lot est mis à
+    jour et inscrit au journal des changements dans une même transaction.
+    """
+    policy = policy or settings.PRESENCE_AUTO_CLOSE_POLICY
+    if policy not in AUTO_CLOSE_POLICIES:
+        raise ValueError(f"Politique de clôture inconnue : {policy}")
+    date_to = min(date_to or date_from, timezone.localdate() - timedelta(days=1))
+    stats = {'closed': 0, 'skipped': 0, 'flagged': 0}
+    if date_to < date_from:
+        return stats
+    open_presences = Presence.objects.filter(
+        date__gte=date_from, date__lte=date_to, time_in__isnull=False, time_out__isnull=True
+    )
+    if policy == 'flag':
+        scan_anomalies(date_from, date_to)
+        stats['flagged'] = AttendanceAnomaly.objects.filter(
+            kind='ENTREE_SANS_SORTIE', status='OUVERTE', date__gte=date_from, date__lte=date_to
+        ).count()
+        return stats
+
+    last_id = 0
+    while True:
+        rows = list(
+            open_presences.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'employee_id', 'date', 'time_in'
+            )[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        groups = defaultdict(list)
+        closed = []
+        for presence_id, employee_id, day, time_in in rows:
+            time_out = auto_close_time(policy, employee_id, day, time_in)
+            if time_out is None:
+                stats['skipped'] += 1
+                continue
+            groups[(('time_out', time_out), ('auto_closed', True))].append(presence_id)
+            closed.append((presence_id, employee_id))
+        with transaction.atomic():
+            _grouped_update(Presence.objects.filter(time_out__isnull=True), groups, timezone.now())
+            record_changes(Presence, closed)
+        stats['closed'] += len(closed)
+    return stats
+
+
+# Tâches périodiques exécutées par la commande runscheduler
+
+# Nombre maximal de jours rattrapés par une exécution (create_absences, scan_anomalies)
+CATCH_UP_DAYS = 31
+
+
+@scheduled('create_absences', interval=timedelta(hours=1), jitter=timedelta(minutes=5))
+def scheduled_create_absences(since, until):
+    """Absences des jours écoulés depuis la dernière exécution réussie"""
+    yesterday = timezone.localdate(until) - timedelta(days=1)
+    date_from = timezone.localdate(since) if since else yesterday
+    date_from = max(date_from, yesterday - timedelta(days=CATCH_UP_DAYS - 1))
+    if date_from > yesterday:
+        return "Rien à rattraper"
+    created = create_absences(date_from, yesterday)
+    return f"{sum(created.values())} absence(s) créée(s) du {date_from} au {yesterday}"
+
+
+@scheduled('close_open_presences', interval=timedelta(hours=1), jitter=timedelta(minutes=5))
+def scheduled_close_open_presences(since, until):
+    """Clôture des présences restées ouvertes des jours écoulés"""
+    yesterday = timezone.localdate(until) - timedelta(days=1)
+    date_from = timezone.localdate(since) - timedelta(days=1) if since else yesterday
+    date_from = max(date_from, yesterday - timedelta(days=CATCH_UP_DAYS - 1))
+    if date_from > yesterday:
+        return "Rien à clôturer"
+    stats = close_open_presences(date_from, yesterday)
+    return (f"{stats['closed']} présence(s) clôturée(s), {stats['flagged']} signalée(s), "
+            f"{stats['skipped']} ignorée(s) (horaire de nuit) du {date_from} au {yesterday}")
+
+
+@scheduled('scan_anomalies', interval=timedelta(days=1), jitter=timedelta(minutes=30))
+def scheduled_scan_anomalies(since, until):
+    """Analyse des anomalies des jours complets écoulés depuis la dernière exécution"""
+    yesterday = timezone.localdate(until) - timedelta(days=1)
+    date_from = timezone.localdate(since) - timedelta(days=1) if since else yesterday
+    date_from = max(date_from, yesterday - timedelta(days=CATCH_UP_DAYS - 1))
+    if date_from > yesterday:
+        return "Rien à analyser"
+    result = scan_anomalies(date_from, yesterday)
+    return f"{result['found']} anomalie(s) du {date_from} au {yesterday} ({result['created']} nouvelle(s))"
+
+
+@scheduled('process_biometric_logs', interval=timedelta(minutes=5), jitter=timedelta(seconds=30))
+def scheduled_process_biometric_logs(since, until, limit=1000):
+    """Retraite les logs biométriques restés non traités"""
+    processed = 0
+    pending = BiometricLog.objects.filter(processed=False, created_at__lte=until).order_by('timestamp')
+    for log in pending[:limit]:
+        if log.process_log():
+            processed += 1
+    return f"{processed} log(s) traité(s)"
+
+
+@scheduled('cleanup_exports', interval=timedelta(days=1), jitter=timedelta(minutes=30))
+def scheduled_cleanup_exports(since, until):
+    """Supprime les exports plus anciens que EXPORTS_RETENTION_DAYS"""
+    root = settings.EXPORTS_ROOT
+    limit = clock.time() - settings.EXPORTS_RETENTION_DAYS * 86400
+    removed = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            # Les fichiers cachés (curseurs des exports incrémentaux) sont conservés
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(directory, filename)
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+                removed += 1
+    return f"{removed} fichier(s) supprimé(s)"
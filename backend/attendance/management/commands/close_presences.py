@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.jobs import AUTO_CLOSE_POLICIES, close_open_presences
+from attendance.management.utils import parse_date
+
+
+class Command(BaseCommand):
+    help = "Clôture les présences restées sans sortie (par défaut : hier)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Date de début (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Date de fin (YYYY-MM-DD)")
+        parser.add_argument('--policy', choices=AUTO_CLOSE_POLICIES,
+                            help="Politique de clôture (défaut : PRESENCE_AUTO_CLOSE_POLICY)")
+
+    def handle(self, *args, **options):
+        yesterday = date.today() - timedelta(days=1)
+        date_from = parse_date(options['date_from']) if options['date_from'] else yesterday
+        date_to = parse_date(options['date_to']) if options['date_to'] else date_from
+        if date_to < date_from:
+            raise CommandError("--date-to doit être postérieure à --date-from")
+
+        stats = close_open_presences(date_from, date_to, policy=options['policy'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['closed']} présence(s) clôturée(s), {stats['flagged']} signalée(s), "
+            f"{stats['skipped']} ignorée(s) (horaire de nuit)"
+        ))
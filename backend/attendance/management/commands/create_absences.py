@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.jobs import create_absences
+from attendance.management.utils import parse_date
+
+
+class Command(BaseCommand):
+    help = "Crée les absences des employés qui n'ont pas pointé (par défaut : hier)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Date de début (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Date de fin (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        yesterday = date.today() - timedelta(days=1)
+        date_from = parse_date(options['date_from']) if options['date_from'] else yesterday
+        date_to = parse_date(options['date_to']) if options['date_to'] else date_from
+        if date_to < date_from:
+            raise CommandError("--date-to doit être postérieure à --date-from")
+
+        created = create_absences(date_from, date_to)
+        for day, count in created.items():
+            self.stdout.write(f"{day} : {count} absence(s) créée(s)")
+        self.stdout.write(self.style.SUCCESS(f"Total : {sum(created.values())} absence(s) créée(s)"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from attendance.models import Device
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère la clé d'API d'un dispositif de pointage (créé s'il n'existe pas) ; "
+        "l'ancienne clé cesse de fonctionner"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('device_id', help="ID du dispositif (champ device_id des pointages)")
+        parser.add_argument('--name', help="Emplacement ou description")
+
+    def handle(self, *args, **options):
+        device, created = Device.objects.get_or_create(device_id=options['device_id'])
+        if options['name']:
+            device.name = options['name']
+        key = device.set_key()
+        device.save()
+        self.stdout.write(f"Dispositif {device.device_id} {'créé' if created else 'mis à jour'}")
+        self.stdout.write(self.style.SUCCESS(f"Clé (affichée une seule fois) : {key}"))
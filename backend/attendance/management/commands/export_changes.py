@@ -0,0 +1,91 @@
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from attendance.changes import FEED_FIELDS, RESOURCES, collect_changes, fetch_upserts
+
+CURSOR_FILE = '.cursor_{resource}'
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte les présences, retards et absences modifiés depuis un curseur "
+        "(fichiers CSV/JSONL déposés dans un répertoire, suppressions incluses)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Répertoire de dépôt (défaut : EXPORTS_ROOT/paie)")
+        parser.add_argument('--since', type=int, default=None,
+                            help="Curseur de départ (défaut : curseur enregistré dans le répertoire)")
+        parser.add_argument('--format', default='csv', choices=['csv', 'jsonl'])
+        parser.add_argument('resources', nargs='*',
+                            help=f"Ressources parmi {', '.join(RESOURCES)} (défaut : toutes)")
+
+    def handle(self, *args, **options):
+        output = options['output'] or os.path.join(settings.EXPORTS_ROOT, 'paie')
+        resources = options['resources'] or list(RESOURCES)
+        unknown = set(resources) - set(RESOURCES)
+        if unknown:
+            raise CommandError(f"Ressource(s) inconnue(s) : {', '.join(sorted(unknown))}")
+        os.makedirs(output, exist_ok=True)
+
+        for resource in resources:
+            since = options['since']
+            if since is None:
+                since = self._read_cursor(output, resource)
+            cursor, latest = collect_changes(since, resources=[resource])
+            if cursor == since:
+                self.stdout.write(f"{resource} : aucune modification depuis le curseur {since}")
+                continue
+
+            changes = latest[resource]
+            upserts = fetch_upserts(
+                resource, [object_id for object_id, (_, op, _) in changes.items() if op == 'UPSERT']
+            )
+            records = []
+            for object_id, (seq, operation, employee_id) in sorted(changes.items(), key=lambda c: c[1][0]):
+                if operation == 'UPSERT' and object_id in upserts:
+                    row = upserts[object_id]
+                else:
+                    # Supprimé entre-temps : on exporte une pierre tombale
+                    operation = 'DELETE'
+                    row = {'id': object_id, 'employee_id': employee_id}
+                records.append({'change_seq': seq, 'operation': operation, **row})
+
+            path = os.path.join(output, f"{resource}_{since + 1}_{cursor}.{options['format']}")
+            self._write(path, resource, records, options['format'])
+            self._write_cursor(output, resource, cursor)
+            self.stdout.write(self.style.SUCCESS(
+                f"{resource} : {len(records)} ligne(s) -> {path} (curseur {since} -> {cursor})"
+            ))
+
+    def _write(self, path, resource, records, file_format):
+        """Écriture atomique : le fichier n'apparaît qu'une fois complet"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            if file_format == 'csv':
+                writer = csv.DictWriter(f, fieldnames=['change_seq', 'operation'] + FEED_FIELDS[resource])
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                for record in records:
+                    f.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False))
+                    f.write('\n')
+        os.replace(tmp_path, path)
+
+    def _read_cursor(self, output, resource):
+        try:
+            with open(os.path.join(output, CURSOR_FILE.format(resource=resource))) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_cursor(self, output, resource, cursor):
+        path = os.path.join(output, CURSOR_FILE.format(resource=resource))
+        with open(path + '.tmp', 'w') as f:
+            f.write(str(cursor))
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,49 @@
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.columnar import DATASETS, FORMATS, ROW_GROUP_SIZE, export_dataset
+from preslog.replicas import use_replica
+
+
+class Command(BaseCommand):
+    help = "Exporte les présences, retards, absences et logs au format Parquet ou Arrow IPC"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'datasets', nargs='*',
+            help=f"Jeux de données à exporter parmi {', '.join(sorted(DATASETS))} (défaut : tous)"
+        )
+        parser.add_argument('--format', default='parquet', choices=sorted(FORMATS))
+        parser.add_argument('--output', help="Répertoire de sortie (défaut : EXPORTS_ROOT/analytics)")
+        parser.add_argument('--partition-by-month', action='store_true',
+                            help="Un fichier par mois (month=YYYY-MM)")
+        parser.add_argument('--date-from', help="Date de début (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Date de fin (YYYY-MM-DD)")
+        parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE)
+
+    def handle(self, *args, **options):
+        output = options['output'] or os.path.join(settings.EXPORTS_ROOT, 'analytics')
+        unknown = set(options['datasets']) - set(DATASETS)
+        if unknown:
+            raise CommandError(f"Jeu(x) de données inconnu(s) : {', '.join(sorted(unknown))}")
+        # Lecture sur la réplique si elle est configurée (voir preslog/replicas.py)
+        with use_replica():
+            for name in options['datasets'] or sorted(DATASETS):
+                try:
+                    written = export_dataset(
+                        name, output,
+                        file_format=options['format'],
+                        partition_by_month=options['partition_by_month'],
+                        date_from=options['date_from'],
+                        date_to=options['date_to'],
+                        row_group_size=options['row_group_size'],
+                    )
+                except ImproperlyConfigured as e:
+                    raise CommandError(str(e))
+                total = sum(rows for _, rows in written)
+                self.stdout.write(self.style.SUCCESS(
+                    f"{name} : {total} lignes dans {len(written)} fichier(s)"
+                ))
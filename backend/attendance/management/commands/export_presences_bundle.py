@@ -0,0 +1,58 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance.models import Presence
+from attendance.reports import (
+    PRESENCE_BUNDLE_COLUMNS, period_label, build_presence_jobs,
+    default_bundle_workers, iter_zip_bundle
+)
+from preslog.replicas import use_replica
+
+
+class Command(BaseCommand):
+    help = "Génère une archive ZIP contenant un PDF de présences par employé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Date de début (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Date de fin (YYYY-MM-DD)")
+        parser.add_argument('--workers', type=int, default=None, help="Nombre de processus de rendu")
+        parser.add_argument('--output', help="Chemin de l'archive (défaut : EXPORTS_ROOT)")
+
+    def handle(self, *args, **options):
+        date_from = options['date_from']
+        date_to = options['date_to']
+        workers = options['workers'] or default_bundle_workers()
+        output = options['output'] or os.path.join(
+            settings.EXPORTS_ROOT,
+            f"presences_employes_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.zip"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+        queryset = Presence.objects.all()
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        rows = queryset.order_by('employee_id', 'date').values_list(*PRESENCE_BUNDLE_COLUMNS)
+        # Lecture sur la réplique si elle est configurée (voir preslog/replicas.py) ;
+        # les lignes sont lues au fil de l'écriture de l'archive : base fixée ici
+        with use_replica():
+            rows = rows.using(rows.db)
+        exported = 0
+
+        def jobs():
+            # Un job par employé, générés au fil du rendu (jamais tous en mémoire)
+            nonlocal exported
+            for job in build_presence_jobs(rows.iterator(), period_label(date_from, date_to)):
+                exported += 1
+                yield job
+
+        with open(output, 'wb') as archive:
+            for chunk in iter_zip_bundle(jobs(), workers):
+                archive.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"{exported} PDF générés avec {workers} processus : {output}"
+        ))
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.jobs import recompute_lateness
+from attendance.management.utils import parse_date
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les retards des présences d'une période (après un changement "
+        "d'horaire ou de calendrier) et crée/supprime les retards correspondants"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Date de début (YYYY-MM-DD, défaut : toutes les présences)")
+        parser.add_argument('--date-to', help="Date de fin (YYYY-MM-DD, défaut : aujourd'hui)")
+        parser.add_argument('--employee', type=int, action='append', dest='employee_ids',
+                            help="Limiter à un employé (ID, option répétable)")
+
+    def handle(self, *args, **options):
+        date_from = parse_date(options['date_from']) if options['date_from'] else None
+        date_to = parse_date(options['date_to']) if options['date_to'] else date.today()
+        if date_from and date_to < date_from:
+            raise CommandError("--date-to doit être postérieure à --date-from")
+
+        stats = recompute_lateness(date_from, date_to, employee_ids=options['employee_ids'])
+        self.stdout.write(
+            f"{stats['presences_scanned']} présence(s) examinée(s), "
+            f"{stats['presences_updated']} mise(s) à jour"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Retards : {stats['retards_created']} créé(s), {stats['retards_updated']} mis à jour, "
+            f"{stats['retards_deleted']} supprimé(s)"
+        ))
+        if stats['retards_kept']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['retards_kept']} retard(s) justifié(s) ou déjà traité(s) conservé(s) "
+                f"bien que la présence ne soit plus en retard : à revoir par la RH"
+            ))
@@ -0,0 +1,55 @@
+import time as clock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from attendance import jobs  # noqa: F401  (enregistre les tâches)
+from attendance.models import ScheduledJob, JobRun
+from attendance.scheduler import REGISTRY, node_name, run_pending, seconds_until_next
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches périodiques (absences automatiques, logs non traités, "
+        "anomalies de pointage, nettoyage des exports). Peut tourner sur plusieurs serveurs à la fois."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Exécuter les tâches échues une seule fois puis quitter")
+        parser.add_argument('--list', action='store_true',
+                            help="Afficher les tâches et leur dernière exécution")
+        parser.add_argument('--tick', type=float, default=30,
+                            help="Attente maximale entre deux passages (secondes)")
+        parser.add_argument('jobs', nargs='*', help="Limiter à certaines tâches")
+
+    def handle(self, *args, **options):
+        unknown = set(options['jobs']) - set(REGISTRY)
+        if unknown:
+            raise CommandError(f"Tâche(s) inconnue(s) : {', '.join(sorted(unknown))}")
+        if options['list']:
+            return self._list()
+
+        node = node_name()
+        self.stdout.write(f"Planificateur démarré sur {node} ({len(REGISTRY)} tâches)")
+        while True:
+            close_old_connections()
+            for run in run_pending(node, names=options['jobs']):
+                style = self.style.SUCCESS if run.status == 'SUCCES' else self.style.ERROR
+                self.stdout.write(style(
+                    f"{run.job_name} : {run.status} en {run.duration_seconds:.2f} s - {run.message.strip()}"
+                ))
+            if options['once']:
+                return
+            clock.sleep(seconds_until_next(options['tick']))
+
+    def _list(self):
+        states = {state.name: state for state in ScheduledJob.objects.filter(name__in=list(REGISTRY))}
+        for name, job in sorted(REGISTRY.items()):
+            state = states.get(name)
+            last = JobRun.objects.filter(job_name=name).first()
+            self.stdout.write(
+                f"{name} : toutes les {job.interval} | prochaine : "
+                f"{state.next_run_at if state else 'immédiate'} | dernière : "
+                f"{f'{last.status} le {last.started_at} ({last.duration_seconds} s)' if last else '-'}"
+            )
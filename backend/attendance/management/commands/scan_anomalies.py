@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.anomalies import scan_anomalies
+from attendance.management.utils import parse_date
+
+
+class Command(BaseCommand):
+    help = (
+        "Détecte les anomalies de pointage (entrée sans sortie, sortie avant l'entrée, "
+        "entrées multiples, badges désactivés ou inconnus) sur une période (par défaut : hier)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Date de début (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Date de fin (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        yesterday = date.today() - timedelta(days=1)
+        date_from = parse_date(options['date_from']) if options['date_from'] else yesterday
+        date_to = parse_date(options['date_to']) if options['date_to'] else date_from
+        if date_to < date_from:
+            raise CommandError("--date-to doit être postérieure à --date-from")
+
+        result = scan_anomalies(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['found']} anomalie(s) détectée(s) du {date_from} au {date_to} : "
+            f"{result['created']} nouvelle(s), {result['updated']} mise(s) à jour, "
+            f"{result['removed']} disparue(s)"
+        ))
@@ -0,0 +1,174 @@
+import time as clock
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from attendance.changes import latest_sequence
+from attendance.models import Absence, Presence, Retard
+from attendance.workcalendar import work_calendar
+
+User = get_user_model()
+
+PREFIX = 'verify-hot-paths'
+
+
+class Rollback(Exception):
+    """Annule les écritures de la vérification"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Vérifie les chemins critiques du pointage (réception, corrections et validations "
+        "en masse, créations d'absences, recalculs, agrégats, listes, synchronisation) "
+        "sur la base configurée (DB_PROFILE), dans une transaction annulée à la fin"
+    )
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f"Base : {connection.vendor} {settings_dict['NAME']} "
+            f"(CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}, "
+            f"CONN_HEALTH_CHECKS={settings_dict['CONN_HEALTH_CHECKS']})"
+        )
+        self.failures = []
+        try:
+            with transaction.atomic():
+                self.run_checks()
+                raise Rollback
+        except Rollback:
+            pass
+        if self.failures:
+            raise CommandError(f"{len(self.failures)} vérification(s) en échec : {', '.join(self.failures)}")
+        self.stdout.write(self.style.SUCCESS("Tous les chemins critiques sont vérifiés"))
+
+    def verify(self, name, func):
+        """Exécuter une vérification : `func` lève AssertionError en cas d'écart"""
+        start = clock.monotonic()
+        with CaptureQueriesContext(connection) as queries:
+            try:
+                with transaction.atomic():
+                    detail = func()
+            except Exception as exc:
+                self.failures.append(name)
+                self.stdout.write(self.style.ERROR(f"ÉCHEC {name} : {type(exc).__name__} {exc}"))
+                return
+        elapsed = (clock.monotonic() - start) * 1000
+        self.stdout.write(
+            f"OK    {name} ({len(queries)} requêtes, {elapsed:.0f} ms)" + (f" - {detail}" if detail else '')
+        )
+
+    def expect(self, response, status_code=200):
+        assert response.status_code == status_code, f"HTTP {response.status_code} : {response.content[:300]!r}"
+        return response
+
+    def run_checks(self):
+        cursor = latest_sequence()
+        # Jeu d'essai propre à la vérification (annulé avec le reste)
+        rh = User.objects.create_user(username=f'{PREFIX}-rh', role='RH')
+        employees = [
+            User.objects.create_user(
+                username=f'{PREFIX}-{index}', first_name='Vérif', last_name=str(index),
+                role='EMPLOYE', biometric_id=f'{PREFIX}-{index}'
+            )
+            for index in range(3)
+        ]
+        day = date.today() + timedelta(days=400)
+        while not work_calendar.is_working_day(day):
+            day += timedelta(days=1)
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(rh)
+        api = '/api/attendance'
+
+        def punch(employee, log_type, at):
+            return self.expect(client.post(f'{api}/biometric-logs/receive_punch/', {
+                'biometric_id': employee.biometric_id, 'log_type': log_type,
+                'timestamp': f'{day.isoformat()}T{at}:00+01:00', 'device_id': PREFIX,
+            }, format='json'), 201)
+
+        def ingest():
+            punch(employees[0], 'ENTREE', '09:30')
+            punch(employees[0], 'SORTIE', '17:45')
+            presence = Presence.objects.get(employee=employees[0], date=day)
+            assert presence.time_in == time(9, 30) and presence.time_out == time(17, 45), presence
+            assert Retard.objects.filter(presence=presence).exists(), "retard non créé"
+            return f"retard de {presence.delay_minutes} min"
+        self.verify("réception de pointages (upsert présence + retard)", ingest)
+
+        def bulk_punch():
+            response = self.expect(client.post(f'{api}/presences/bulk-manual-punch/', {'punches': [
+                {'employee_id': employees[0].id, 'date': day.isoformat(), 'time_in': '08:00'},
+                {'employee_id': employees[1].id, 'date': day.isoformat(), 'time_in': '08:45', 'time_out': '17:00'},
+            ]}, format='json'))
+            outcomes = [row['outcome'] for row in response.data['results']]
+            assert outcomes == ['updated', 'created'], outcomes
+            assert not Retard.objects.filter(employee=employees[0], date=day).exists(), "retard non supprimé"
+            assert Retard.objects.filter(employee=employees[1], date=day).exists(), "retard non créé"
+            return ', '.join(outcomes)
+        self.verify("corrections de pointage en masse (bulk_create/bulk_update)", bulk_punch)
+
+        def absences():
+            response = self.expect(client.post(f'{api}/biometric-logs/create_absences/', {
+                'date': day.isoformat()
+            }, format='json'))
+            again = self.expect(client.post(f'{api}/biometric-logs/create_absences/', {
+                'date': day.isoformat()
+            }, format='json'))
+            assert Absence.objects.filter(employee=employees[2], date=day).exists(), "absence non créée"
+            assert not Absence.objects.filter(employee__in=employees[:2], date=day).exists(), "absence en trop"
+            assert again.data['absences_created'] == 0, "doublons à la seconde exécution"
+            return f"{response.data['absences_created']} absence(s)"
+        self.verify("création d'absences (insertion par lots, conflits ignorés)", absences)
+
+        def validations():
+            ids = list(Absence.objects.filter(date=day).values_list('id', flat=True)[:50])
+            response = self.expect(client.post(f'{api}/absences/bulk-validate/', {
+                'status': 'APPROUVEE', 'ids': ids
+            }, format='json'))
+            assert Absence.objects.filter(id__in=ids, justification_status='APPROUVEE').count() == len(ids)
+            retard = Retard.objects.get(employee=employees[1], date=day)
+            self.expect(client.post(f'{api}/retards/bulk-validate/', {
+                'status': 'REFUSEE', 'ids': [retard.id]
+            }, format='json'))
+            return f"{response.data['updated']} absence(s) validée(s)"
+        self.verify("validations en masse (select_for_update + UPDATE)", validations)
+
+        def recompute():
+            self.expect(client.post(f'{api}/presences/recompute-lateness/', {
+                'date_from': day.isoformat(), 'date_to': day.isoformat()
+            }, format='json'))
+            assert Retard.objects.filter(employee=employees[1], date=day).exists(), "retard perdu"
+        self.verify("recalcul des retards (UPDATE groupés)", recompute)
+
+        def aggregates():
+            period = f'start_date={day.isoformat()}&end_date={day.isoformat()}'
+            stats = self.expect(client.get(f'{api}/presences/statistics/?{period}')).data['statistics']
+            assert stats['total_presences'] >= 2 and stats['total_retards'] >= 1, stats
+            self.expect(client.get(f'{api}/presences/rh-dashboard/'))
+            return f"{stats['total_presences']} présences, taux {stats['attendance_rate']} %"
+        self.verify("agrégats (statistiques, tableau de bord RH)", aggregates)
+
+        def lists():
+            for resource in ('presences', 'retards', 'absences', 'biometric-logs'):
+                url = f'{api}/{resource}/?page_size=2'
+                fast = self.expect(client.get(url)).data
+                slow = self.expect(client.get(url + '&fast=0')).data
+                assert fast['results'] == slow['results'], f"{resource} : projection != sérialiseur"
+                if fast['next']:
+                    self.expect(client.get(fast['next']))
+            timeline = self.expect(client.get(
+                f'{api}/absences/timeline/?employee_id={employees[2].id}&date_from={day}&date_to={day}'
+            )).data['results']
+            assert [row['type'] for row in timeline] == ['ABSENCE'], timeline
+        self.verify("listes par curseur et historique (UNION ALL)", lists)
+
+        def sync():
+            data = self.expect(client.get(f'{api}/presences/sync/?since={cursor}')).data
+            ids = {row['id'] for row in data['upserts']}
+            expected = set(Presence.objects.filter(date=day).values_list('id', flat=True))
+            assert ids == expected and not data['has_more'], f"flux : {sorted(ids)} au lieu de {sorted(expected)}"
+            return f"{len(ids)} présence(s) depuis le curseur {cursor}"
+        self.verify("synchronisation (journal des modifications)", sync)
@@ -0,0 +1,12 @@
+"""Outils communs aux commandes de gestion de l'application attendance"""
+from datetime import datetime
+
+from django.core.management.base import CommandError
+
+
+def parse_date(value):
+    """Date d'une option de commande (YYYY-MM-DD) ; CommandError si invalide"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Date invalide : {value} (format attendu : YYYY-MM-DD)")
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_absence_justification_file_retard_justification_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('presence', 'Présence'), ('retard', 'Retard'), ('absence', 'Absence')], max_length=20)),
+                ('object_id', models.BigIntegerField(help_text="ID de l'élément modifié")),
+                ('employee_id', models.BigIntegerField(blank=True, help_text="ID de l'employé concerné", null=True)),
+                ('operation', models.CharField(choices=[('UPSERT', 'Création / modification'), ('DELETE', 'Suppression')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Modification',
+                'verbose_name_plural': 'Journal des modifications',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='attendancechange',
+            index=models.Index(fields=['resource', 'id'], name='attendance__resourc_b6b94a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancechange',
+            index=models.Index(fields=['employee_id', 'id'], name='attendance__employe_5f35a4_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_name', models.CharField(max_length=100)),
+                ('node', models.CharField(help_text='Nœud ayant exécuté la tâche', max_length=255)),
+                ('status', models.CharField(choices=[('EN_COURS', 'En cours'), ('SUCCES', 'Succès'), ('ECHEC', 'Échec')], default='EN_COURS', max_length=20)),
+                ('window_start', models.DateTimeField(blank=True, help_text='Début de la période rattrapée', null=True)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('message', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Exécution de tâche',
+                'verbose_name_plural': 'Exécutions de tâches',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduledJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('next_run_at', models.DateTimeField(blank=True, help_text='Prochaine exécution prévue', null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, help_text='Début de la dernière exécution réussie', null=True)),
+                ('locked_by', models.CharField(blank=True, help_text="Nœud en cours d'exécution", max_length=255, null=True)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Expiration du verrou', null=True)),
+            ],
+            options={
+                'verbose_name': 'Tâche planifiée',
+                'verbose_name_plural': 'Tâches planifiées',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['job_name', '-started_at'], name='attendance__job_nam_2f267f_idx'),
+        ),
+    ]
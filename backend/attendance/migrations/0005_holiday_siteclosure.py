@@ -0,0 +1,45 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_scheduledjob_jobrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Date du jour férié')),
+                ('label', models.CharField(help_text='Libellé', max_length=100)),
+                ('recurring', models.BooleanField(default=False, help_text='Se répète chaque année à la même date')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Jour férié',
+                'verbose_name_plural': 'Jours fériés',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SiteClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('label', models.CharField(help_text='Motif de la fermeture', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Fermeture du site',
+                'verbose_name_plural': 'Fermetures du site',
+                'ordering': ['-start_date'],
+            },
+        ),
+    ]
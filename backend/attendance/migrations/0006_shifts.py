@@ -0,0 +1,85 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0005_holiday_siteclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('start_time', models.TimeField(help_text="Heure normale d'entrée")),
+                ('end_time', models.TimeField(help_text='Heure normale de sortie')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Horaire',
+                'verbose_name_plural': 'Horaires',
+                'ordering': ['start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShiftRotation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rotation',
+                'verbose_name_plural': 'Rotations',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShiftRotationStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('days', models.PositiveIntegerField(default=1, help_text='Nombre de jours consécutifs')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rotation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='attendance.shiftrotation')),
+                ('shift', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='rotation_steps', to='attendance.shift')),
+            ],
+            options={
+                'verbose_name': 'Étape de rotation',
+                'verbose_name_plural': 'Étapes de rotation',
+                'ordering': ['rotation', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShiftAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, help_text='Vide = sans date de fin', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shift_assignments', to=settings.AUTH_USER_MODEL)),
+                ('rotation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='assignments', to='attendance.shiftrotation')),
+                ('shift', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='assignments', to='attendance.shift')),
+            ],
+            options={
+                'verbose_name': "Affectation d'horaire",
+                'verbose_name_plural': "Affectations d'horaires",
+                'ordering': ['employee', '-start_date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shiftassignment',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('rotation__isnull', True), ('shift__isnull', False)), models.Q(('rotation__isnull', False), ('shift__isnull', True)), _connector='OR'), name='shiftassignment_shift_xor_rotation'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0006_shifts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ENTREE_SANS_SORTIE', 'Entrée sans sortie'), ('SORTIE_AVANT_ENTREE', "Sortie avant l'entrée"), ('ENTREES_MULTIPLES', 'Entrées depuis plusieurs dispositifs'), ('BADGE_INACTIF', 'Pointage avec un badge désactivé'), ('BADGE_INCONNU', 'Pointage avec un badge inconnu')], max_length=30)),
+                ('date', models.DateField()),
+                ('biometric_id', models.CharField(blank=True, default='', max_length=50)),
+                ('details', models.JSONField(default=dict, help_text='Heures, dispositifs et nombre de pointages concernés')),
+                ('status', models.CharField(choices=[('OUVERTE', 'Ouverte'), ('RESOLUE', 'Résolue')], default='OUVERTE', max_length=20)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Anomalie de pointage',
+                'verbose_name_plural': 'Anomalies de pointage',
+                'ordering': ['-date', 'kind', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='biometriclog',
+            index=models.Index(fields=['timestamp'], name='attendance__timesta_5b0a03_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='biometriclog',
+            index=models.Index(fields=['biometric_id', 'timestamp'], name='attendance__biometr_0affab_idx'),
+        ),
+        migrations.AddField(
+            model_name='attendanceanomaly',
+            name='employee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_anomalies', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='attendanceanomaly',
+            name='resolved_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_anomalies', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='attendanceanomaly',
+            index=models.Index(fields=['date', 'kind'], name='attendance__date_4bec46_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendanceanomaly',
+            index=models.Index(fields=['status', 'date'], name='attendance__status_82a6e3_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-19 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_attendanceanomaly'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presence',
+            name='auto_closed',
+            field=models.BooleanField(default=False, help_text='Sortie renseignée automatiquement en fin de journée'),
+        ),
+        migrations.AddIndex(
+            model_name='presence',
+            index=models.Index(fields=['auto_closed', 'date'], name='attendance__auto_cl_9b1e50_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_presence_auto_closed'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='biometriclog',
+            name='attendance__timesta_5b0a03_idx',
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['date', 'id'], name='attendance__date_b50df3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='biometriclog',
+            index=models.Index(fields=['timestamp', 'id'], name='attendance__timesta_e14373_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presence',
+            index=models.Index(fields=['date', 'id'], name='attendance__date_a03440_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retard',
+            index=models.Index(fields=['date', 'id'], name='attendance__date_60589f_idx'),
+        ),
+    ]
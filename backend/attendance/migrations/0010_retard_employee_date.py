@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='retard',
+            index=models.Index(fields=['employee', 'date', 'id'], name='attendance__employe_eb3bbd_idx'),
+        ),
+    ]
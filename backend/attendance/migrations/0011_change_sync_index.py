@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_retard_employee_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancechange',
+            index=models.Index(fields=['resource', 'employee_id', 'id'], name='attendance__resourc_a66211_idx'),
+        ),
+    ]
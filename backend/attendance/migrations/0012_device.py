@@ -0,0 +1,32 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_change_sync_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Device',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(help_text='ID du dispositif (champ device_id des logs)', max_length=50, unique=True)),
+                ('name', models.CharField(blank=True, default='', help_text='Emplacement ou description', max_length=100)),
+                ('key_prefix', models.CharField(blank=True, default='', help_text='Début de la clé (identification)', max_length=8)),
+                ('key_hash', models.CharField(blank=True, db_index=True, default='', help_text='Empreinte SHA-256 de la clé', max_length=64)),
+                ('is_active', models.BooleanField(default=True, help_text='Un dispositif désactivé ne peut plus envoyer de pointages')),
+                ('last_seen_at', models.DateTimeField(blank=True, help_text='Dernier pointage reçu (mis à jour par lots)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dispositif de pointage',
+                'verbose_name_plural': 'Dispositifs de pointage',
+                'ordering': ['device_id'],
+            },
+        ),
+    ]
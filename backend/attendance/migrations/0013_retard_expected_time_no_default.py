@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_device'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='retard',
+            name='expected_time',
+            field=models.TimeField(help_text="Heure d'entrée prévue par l'horaire"),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.13 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+
+def remove_open_duplicates(apps, schema_editor):
+    """Garde la plus ancienne des anomalies ouvertes en double (analyses simultanées)"""
+    AttendanceAnomaly = apps.get_model('attendance', 'AttendanceAnomaly')
+    seen = set()
+    duplicates = []
+    for anomaly_id, employee_id, biometric_id, day, kind in AttendanceAnomaly.objects.filter(
+            status='OUVERTE').order_by('id').values_list('id', 'employee_id', 'biometric_id', 'date', 'kind'):
+        key = (employee_id, biometric_id if employee_id is None else None, day, kind)
+        if key in seen:
+            duplicates.append(anomaly_id)
+        else:
+            seen.add(key)
+    AttendanceAnomaly.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0013_retard_expected_time_no_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_open_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendanceanomaly',
+            constraint=models.UniqueConstraint(condition=models.Q(('employee__isnull', False), ('status', 'OUVERTE')), fields=('employee', 'date', 'kind'), name='attendanceanomaly_open_employee_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendanceanomaly',
+            constraint=models.UniqueConstraint(condition=models.Q(('employee__isnull', True), ('status', 'OUVERTE')), fields=('biometric_id', 'date', 'kind'), name='attendanceanomaly_open_badge_unique'),
+        ),
+    ]
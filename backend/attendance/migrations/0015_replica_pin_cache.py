@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    """Tables des caches en base (épinglage des lectures sur la réplique, voir preslog/replicas.py)"""
+    command = CreateCacheTable()
+    command.verbosity = 0
+    for cache in settings.CACHES.values():
+        if cache['BACKEND'] == 'django.core.cache.backends.db.DatabaseCache':
+            # Table déjà présente : ignorée
+            command.create_table(schema_editor.connection.alias, cache['LOCATION'], dry_run=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0014_anomaly_open_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from datetime import datetime, time
+import hashlib
+import secrets
 
 User = get_user_model()
 
@@ -16,12 +17,19 @@ class Presence(models.Model):
     time_out = models.TimeField(null=True, blank=True, help_text="Heure de sortie")
     is_late = models.BooleanField(default=False, help_text="Si l'employé est arrivé en retard")
     delay_minutes = models.IntegerField(default=0, help_text="Nombre de minutes de retard")
+    auto_closed = models.BooleanField(
+        default=False, help_text="Sortie renseignée automatiquement en fin de journée"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['employee', 'date']
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['auto_closed', 'date']),
+            models.Index(fields=['date', 'id']),
+        ]
         verbose_name = "Présence"
         verbose_name_plural = "Présences"
     
@@ -29,19 +37,13 @@ class Presence(models.Model):
         return f"{self.employee.get_full_name()} - {self.date}"
     
     def save(self, *args, **kwargs):
-        # Calculer automatiquement si l'employé est en retard
+        # Calculer automatiquement si l'employé est en retard, par rapport à
+        # l'heure d'entrée de son horaire (pas de retard un jour non travaillé)
         if self.time_in:
-            # Heure normale d'entrée : 8h00
-            normal_time = time(8, 0)
-            if self.time_in > normal_time:
-                self.is_late = True
-                # Calculer les minutes de retard
-                delay_seconds = (datetime.combine(self.date, self.time_in) - 
-                               datetime.combine(self.date, normal_time)).total_seconds()
-                self.delay_minutes = int(delay_seconds / 60)
-            else:
-                self.is_late = False
-                self.delay_minutes = 0
+            from .shifts import shift_resolver
+            self.is_late, self.delay_minutes, _ = shift_resolver.lateness(
+                self.employee_id, self.date, self.time_in
+            )
         
         super().save(*args, **kwargs)
 
@@ -59,7 +61,7 @@ class Retard(models.Model):
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='retards')
     presence = models.ForeignKey(Presence, on_delete=models.CASCADE, related_name='retards')
     date = models.DateField()
-    expected_time = models.TimeField(default=time(8, 0), help_text="Heure normale d'entrée")
+    expected_time = models.TimeField(help_text="Heure d'entrée prévue par l'horaire")
     actual_time = models.TimeField(help_text="Heure réelle d'entrée")
     delay_minutes = models.IntegerField(help_text="Nombre de minutes de retard")
     justification = models.TextField(null=True, blank=True, help_text="Justification du retard")
@@ -83,6 +85,10 @@ class Retard(models.Model):
     
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['employee', 'date', 'id']),
+        ]
         verbose_name = "Retard"
         verbose_name_plural = "Retards"
     
@@ -130,6 +136,9 @@ class Absence(models.Model):
     class Meta:
         unique_together = ['employee', 'date']
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['date', 'id']),
+        ]
         verbose_name = "Absence"
         verbose_name_plural = "Absences"
     
@@ -171,6 +180,10 @@ class BiometricLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['biometric_id', 'timestamp']),
+        ]
         verbose_name = "Log biométrique"
         verbose_name_plural = "Logs biométriques"
     
@@ -196,13 +209,17 @@ class BiometricLog(models.Model):
             # Mettre à jour les heures selon le type de log
             if self.log_type == 'ENTREE':
                 presence.time_in = self.timestamp.time()
-                # Créer un retard si nécessaire
+                presence.save()
+                # Créer un retard si nécessaire (is_late est calculé par save())
                 if presence.is_late and presence.delay_minutes > 0:
+                    from .shifts import shift_resolver
+                    _, _, expected_start = shift_resolver.lateness(employee.id, presence.date, presence.time_in)
                     Retard.objects.get_or_create(
                         employee=employee,
                         presence=presence,
                         date=self.timestamp.date(),
                         defaults={
+                            'expected_time': expected_start,
                             'actual_time': self.timestamp.time(),
                             'delay_minutes': presence.delay_minutes
                         }
@@ -210,8 +227,9 @@ class BiometricLog(models.Model):
             
             elif self.log_type == 'SORTIE':
                 presence.time_out = self.timestamp.time()
+                presence.auto_closed = False
+                presence.save()
             
-            presence.save()
             self.processed = True
             self.save()
             
@@ -225,4 +243,310 @@ class BiometricLog(models.Model):
         except Exception as e:
             # Erreur lors du traitement
             print(f"Erreur lors du traitement du log biométrique: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+
+class AttendanceChange(models.Model):
+    """
+    Journal des modifications des présences, retards et absences
+    Chaque création, modification ou suppression ajoute une ligne ; l'identifiant
+    auto-incrémenté sert de curseur monotone pour les exports incrémentaux
+    """
+    RESOURCE_CHOICES = [
+        ('presence', 'Présence'),
+        ('retard', 'Retard'),
+        ('absence', 'Absence'),
+    ]
+    OPERATION_CHOICES = [
+        ('UPSERT', 'Création / modification'),
+        ('DELETE', 'Suppression'),
+    ]
+
+    resource = models.CharField(max_length=20, choices=RESOURCE_CHOICES)
+    object_id = models.BigIntegerField(help_text="ID de l'élément modifié")
+    # Pas de clé étrangère : les suppressions doivent survivre à l'employé
+    employee_id = models.BigIntegerField(null=True, blank=True, help_text="ID de l'employé concerné")
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['resource', 'id']),
+            models.Index(fields=['employee_id', 'id']),
+            # Synchronisation d'un employé (ressource, employé, curseur)
+            models.Index(fields=['resource', 'employee_id', 'id']),
+        ]
+        verbose_name = "Modification"
+        verbose_name_plural = "Journal des modifications"
+
+    def __str__(self):
+        return f"#{self.id} {self.operation} {self.resource} {self.object_id}"
+
+class ScheduledJob(models.Model):
+    """
+    État d'une tâche périodique (une ligne par tâche)
+    La ligne sert aussi de verrou : un nœud ne lance la tâche qu'après l'avoir
+    réservée par une mise à jour conditionnelle, ce qui évite les exécutions
+    simultanées quand plusieurs serveurs font tourner le planificateur
+    """
+    name = models.CharField(max_length=100, unique=True)
+    next_run_at = models.DateTimeField(null=True, blank=True, help_text="Prochaine exécution prévue")
+    last_success_at = models.DateTimeField(null=True, blank=True, help_text="Début de la dernière exécution réussie")
+    locked_by = models.CharField(max_length=255, null=True, blank=True, help_text="Nœud en cours d'exécution")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Expiration du verrou")
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Tâche planifiée"
+        verbose_name_plural = "Tâches planifiées"
+
+    def __str__(self):
+        return self.name
+
+class JobRun(models.Model):
+    """
+    Historique des exécutions des tâches planifiées
+    """
+    STATUS_CHOICES = [
+        ('EN_COURS', 'En cours'),
+        ('SUCCES', 'Succès'),
+        ('ECHEC', 'Échec'),
+    ]
+
+    job_name = models.CharField(max_length=100)
+    node = models.CharField(max_length=255, help_text="Nœud ayant exécuté la tâche")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='EN_COURS')
+    window_start = models.DateTimeField(null=True, blank=True, help_text="Début de la période rattrapée")
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    message = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job_name', '-started_at']),
+        ]
+        verbose_name = "Exécution de tâche"
+        verbose_name_plural = "Exécutions de tâches"
+
+    def __str__(self):
+        return f"{self.job_name} - {self.started_at} ({self.status})"
+
+class Holiday(models.Model):
+    """
+    Jour férié (non travaillé)
+    Un jour férié récurrent (ex. 1er janvier, 20 mai) s'applique chaque année
+    """
+    date = models.DateField(help_text="Date du jour férié")
+    label = models.CharField(max_length=100, help_text="Libellé")
+    recurring = models.BooleanField(default=False, help_text="Se répète chaque année à la même date")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name = "Jour férié"
+        verbose_name_plural = "Jours fériés"
+
+    def __str__(self):
+        return f"{self.label} - {self.date}"
+
+class SiteClosure(models.Model):
+    """
+    Fermeture exceptionnelle du site (congés collectifs, inventaire, ...)
+    """
+    start_date = models.DateField()
+    end_date = models.DateField()
+    label = models.CharField(max_length=100, help_text="Motif de la fermeture")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-start_date']
+        verbose_name = "Fermeture du site"
+        verbose_name_plural = "Fermetures du site"
+
+    def __str__(self):
+        return f"{self.label} - du {self.start_date} au {self.end_date}"
+
+class Shift(models.Model):
+    """
+    Horaire de travail (ex. journée 08:00-18:00, nuit 22:00-06:00)
+    Une heure de fin inférieure à l'heure de début indique un horaire de nuit
+    """
+    name = models.CharField(max_length=100, unique=True)
+    start_time = models.TimeField(help_text="Heure normale d'entrée")
+    end_time = models.TimeField(help_text="Heure normale de sortie")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start_time']
+        verbose_name = "Horaire"
+        verbose_name_plural = "Horaires"
+
+    def __str__(self):
+        return f"{self.name} ({self.start_time:%H:%M}-{self.end_time:%H:%M})"
+
+class ShiftRotation(models.Model):
+    """
+    Rotation d'horaires : les étapes s'enchaînent en cycle à partir de la date
+    de début de l'affectation (ex. 5 jours de matin puis 5 jours de nuit)
+    """
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Rotation"
+        verbose_name_plural = "Rotations"
+
+    def __str__(self):
+        return self.name
+
+class ShiftRotationStep(models.Model):
+    """Étape d'une rotation : un horaire appliqué pendant un nombre de jours"""
+    rotation = models.ForeignKey(ShiftRotation, on_delete=models.CASCADE, related_name='steps')
+    position = models.PositiveIntegerField(default=0)
+    shift = models.ForeignKey(Shift, on_delete=models.PROTECT, related_name='rotation_steps')
+    days = models.PositiveIntegerField(default=1, help_text="Nombre de jours consécutifs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['rotation', 'position']
+        verbose_name = "Étape de rotation"
+        verbose_name_plural = "Étapes de rotation"
+
+    def __str__(self):
+        return f"{self.rotation} #{self.position} : {self.shift} x{self.days}"
+
+class ShiftAssignment(models.Model):
+    """
+    Affectation d'un employé à un horaire fixe ou à une rotation sur une période
+    Sans affectation, l'horaire par défaut (WORK_DEFAULT_SHIFT) s'applique
+    """
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shift_assignments')
+    shift = models.ForeignKey(Shift, on_delete=models.PROTECT, null=True, blank=True, related_name='assignments')
+    rotation = models.ForeignKey(ShiftRotation, on_delete=models.PROTECT, null=True, blank=True, related_name='assignments')
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True, help_text="Vide = sans date de fin")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['employee', '-start_date']
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(shift__isnull=False, rotation__isnull=True) |
+                    models.Q(shift__isnull=True, rotation__isnull=False)
+                ),
+                name='shiftassignment_shift_xor_rotation',
+            ),
+        ]
+        verbose_name = "Affectation d'horaire"
+        verbose_name_plural = "Affectations d'horaires"
+
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.shift or self.rotation} (à partir du {self.start_date})"
+
+class AttendanceAnomaly(models.Model):
+    """
+    Incohérence détectée dans les pointages d'une journée (analyse nocturne)
+    Une anomalie ouverte disparaît d'elle-même si une nouvelle analyse ne la
+    retrouve plus ; une anomalie résolue est conservée
+    """
+    KIND_CHOICES = [
+        ('ENTREE_SANS_SORTIE', 'Entrée sans sortie'),
+        ('SORTIE_AVANT_ENTREE', "Sortie avant l'entrée"),
+        ('ENTREES_MULTIPLES', 'Entrées depuis plusieurs dispositifs'),
+        ('BADGE_INACTIF', 'Pointage avec un badge désactivé'),
+        ('BADGE_INCONNU', 'Pointage avec un badge inconnu'),
+    ]
+    STATUS_CHOICES = [
+        ('OUVERTE', 'Ouverte'),
+        ('RESOLUE', 'Résolue'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    date = models.DateField()
+    employee = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance_anomalies'
+    )
+    biometric_id = models.CharField(max_length=50, blank=True, default='')
+    details = models.JSONField(default=dict, help_text="Heures, dispositifs et nombre de pointages concernés")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OUVERTE')
+    resolved_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_anomalies'
+    )
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date', 'kind', 'id']
+        indexes = [
+            models.Index(fields=['date', 'kind']),
+            models.Index(fields=['status', 'date']),
+        ]
+        constraints = [
+            # Une seule anomalie ouverte par employé (ou badge inconnu), jour et type :
+            # deux analyses simultanées ne créent pas de doublons
+            models.UniqueConstraint(
+                fields=['employee', 'date', 'kind'],
+                condition=models.Q(status='OUVERTE', employee__isnull=False),
+                name='attendanceanomaly_open_employee_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['biometric_id', 'date', 'kind'],
+                condition=models.Q(status='OUVERTE', employee__isnull=True),
+                name='attendanceanomaly_open_badge_unique',
+            ),
+        ]
+        verbose_name = "Anomalie de pointage"
+        verbose_name_plural = "Anomalies de pointage"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.employee or self.biometric_id} - {self.date}"
+
+
+class Device(models.Model):
+    """
+    Dispositif de pointage autorisé à envoyer des logs biométriques
+    Le dispositif s'authentifie par une clé d'API dont seule l'empreinte
+    SHA-256 est conservée (la clé n'est affichée qu'à sa génération)
+    """
+    device_id = models.CharField(max_length=50, unique=True, help_text="ID du dispositif (champ device_id des logs)")
+    name = models.CharField(max_length=100, blank=True, default='', help_text="Emplacement ou description")
+    key_prefix = models.CharField(max_length=8, blank=True, default='', help_text="Début de la clé (identification)")
+    key_hash = models.CharField(max_length=64, blank=True, default='', db_index=True, help_text="Empreinte SHA-256 de la clé")
+    is_active = models.BooleanField(default=True, help_text="Un dispositif désactivé ne peut plus envoyer de pointages")
+    last_seen_at = models.DateTimeField(null=True, blank=True, help_text="Dernier pointage reçu (mis à jour par lots)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['device_id']
+        verbose_name = "Dispositif de pointage"
+        verbose_name_plural = "Dispositifs de pointage"
+
+    def __str__(self):
+        return f"{self.device_id} - {self.name}" if self.name else self.device_id
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def set_key(self):
+        """
+        Générer une nouvelle clé (l'ancienne cesse de fonctionner) et la
+        renvoyer ; à enregistrer avec save()
+        """
+        key = secrets.token_urlsafe(32)
+        self.key_prefix = key[:8]
+        self.key_hash = self.hash_key(key)
+        return key
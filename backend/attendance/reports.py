@@ -0,0 +1,190 @@
+"""
+Rendu des rapports PDF de présences.
+
+Ce module ne dépend pas de l'ORM : les fonctions de rendu reçoivent des
+tuples déjà extraits de la base, ce qui permet de les exécuter dans des
+processus séparés pour générer des lots de PDF en parallèle.
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from io import BytesIO
+from itertools import groupby
+
+from django.utils.text import slugify
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+# Colonnes extraites pour chaque ligne du rapport de présences
+PRESENCE_REPORT_COLUMNS = ('date', 'time_in', 'time_out', 'is_late', 'delay_minutes')
+
+# Colonnes nécessaires pour construire un lot (employé + lignes du rapport)
+PRESENCE_BUNDLE_COLUMNS = (
+    'employee_id', 'employee__first_name', 'employee__last_name',
+    'employee__email', 'employee__matricule',
+) + PRESENCE_REPORT_COLUMNS
+
+
+def period_label(date_from=None, date_to=None):
+    """Libellé de la période affiché en tête des rapports"""
+    if date_from and date_to:
+        return f"Période : du {date_from} au {date_to}"
+    if date_from:
+        return f"Période : à partir du {date_from}"
+    if date_to:
+        return f"Période : jusqu'au {date_to}"
+    return "Période : toutes les données disponibles"
+
+
+def draw_presences_report(p, employee_label, period, rows):
+    """
+    Dessine le rapport de présences sur un canvas ReportLab.
+    `rows` est un itérable de tuples (date, time_in, time_out, is_late, delay_minutes).
+    """
+    width, height = A4
+    y = height - 2*cm
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(2*cm, y, "Rapport de présences")
+    y -= 1*cm
+    p.setFont("Helvetica", 10)
+    p.drawString(2*cm, y, f"Employé : {employee_label}")
+    y -= 0.7*cm
+    p.drawString(2*cm, y, period)
+    y -= 0.7*cm
+    p.drawString(2*cm, y, f"Date d'export : {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+    y -= 0.7*cm
+    # Note explicative
+    p.setFont("Helvetica-Oblique", 9)
+    p.drawString(2*cm, y, "Ce rapport présente l'ensemble de vos présences enregistrées sur la période sélectionnée. Pour toute question, contactez le service RH.")
+    y -= 1*cm
+    # En-tête du tableau
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(2*cm, y, "Date")
+    p.drawString(5*cm, y, "Entrée")
+    p.drawString(8*cm, y, "Sortie")
+    p.drawString(11*cm, y, "Retard")
+    p.drawString(14*cm, y, "Total h")
+    p.drawString(17*cm, y, "Statut")
+    y -= 0.5*cm
+    p.setFont("Helvetica", 10)
+    for day, time_in, time_out, is_late, delay_minutes in rows:
+        if y < 2*cm:
+            p.showPage()
+            y = height - 2*cm
+        p.drawString(2*cm, y, day.strftime('%d/%m/%Y'))
+        p.drawString(5*cm, y, time_in.strftime('%H:%M') if time_in else '-')
+        p.drawString(8*cm, y, time_out.strftime('%H:%M') if time_out else '-')
+        p.drawString(11*cm, y, f"{delay_minutes} min" if is_late else '-')
+        # Calcul total heures
+        if time_in and time_out:
+            start = datetime.combine(day, time_in)
+            end = datetime.combine(day, time_out)
+            hours = round((end - start).total_seconds() / 3600, 2)
+            p.drawString(14*cm, y, f"{hours}h")
+        else:
+            p.drawString(14*cm, y, '-')
+        # Statut
+        if not time_in:
+            statut = 'ABSENT'
+        elif not time_out:
+            statut = 'EN COURS'
+        else:
+            statut = 'TERMINÉ'
+        p.drawString(17*cm, y, statut)
+        y -= 0.5*cm
+    p.showPage()
+    p.save()
+
+
+def render_presences_pdf(job):
+    """
+    Rendu d'un PDF individuel (exécuté dans un processus de travail).
+    `job` est un tuple (nom_fichier, libellé_employé, période, lignes) ;
+    retourne (nom_fichier, contenu_pdf).
+    """
+    filename, employee_label, period, rows = job
+    buffer = BytesIO()
+    draw_presences_report(canvas.Canvas(buffer, pagesize=A4), employee_label, period, rows)
+    return filename, buffer.getvalue()
+
+
+def build_presence_jobs(rows, period):
+    """
+    Regroupe par employé des lignes extraites avec PRESENCE_BUNDLE_COLUMNS
+    (triées par employé) et produit un job de rendu par employé.
+    """
+    for employee_id, employee_rows in groupby(rows, key=lambda row: row[0]):
+        employee_rows = list(employee_rows)
+        _, first_name, last_name, email, matricule = employee_rows[0][:5]
+        label = f"{first_name} {last_name} ({email})"
+        slug = slugify(f"{last_name} {first_name}") or 'employe'
+        filename = f"presences_{matricule or employee_id}_{slug}.pdf"
+        yield filename, label, period, [row[5:] for row in employee_rows]
+
+
+def default_bundle_workers():
+    """Nombre de processus de rendu par défaut (réglage PDF_BUNDLE_WORKERS)"""
+    from django.conf import settings
+    return getattr(settings, 'PDF_BUNDLE_WORKERS', None) or os.cpu_count() or 1
+
+
+def render_jobs(jobs, workers):
+    """
+    Rend les jobs et produit les couples (nom_fichier, contenu) au fil de
+    leur achèvement. Le nombre de jobs en vol est borné pour ne pas garder
+    tous les PDF en mémoire.
+    """
+    if workers <= 1:
+        yield from map(render_presences_pdf, jobs)
+        return
+    jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for job in jobs:
+            pending.add(pool.submit(render_presences_pdf, job))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+class _ZipStream:
+    """
+    Flux en écriture seule pour zipfile : sans seek(), zipfile écrit des
+    descripteurs de données et l'archive peut être envoyée au fil de l'eau.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_bundle(jobs, workers):
+    """Génère les morceaux d'une archive ZIP contenant les PDF rendus"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, content in render_jobs(jobs, workers):
+            archive.writestr(filename, content)
+            chunk = stream.drain()
+            if chunk:
+                yield chunk
+    yield stream.drain()
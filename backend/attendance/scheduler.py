@@ -0,0 +1,122 @@
+"""
+Planificateur intégré pour les tâches récurrentes (commande runscheduler).
+
+Chaque tâche est enregistrée avec un intervalle et une gigue. Avant de
+l'exécuter, un nœud la réserve par un UPDATE conditionnel sur sa ligne
+ScheduledJob (échue et non verrouillée) : un seul nœud gagne, même si
+plusieurs serveurs font tourner le planificateur. La tâche reçoit la date
+de sa dernière exécution réussie, ce qui lui permet de rattraper les
+exécutions manquées (serveur arrêté, erreur, ...).
+"""
+import os
+import random
+import socket
+import time as clock
+import traceback
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ScheduledJob, JobRun
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter, timeout):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def next_run_after(self, moment):
+        jitter = random.uniform(0, self.jitter.total_seconds()) if self.jitter else 0
+        return moment + self.interval + timedelta(seconds=jitter)
+
+
+REGISTRY = {}
+
+
+def scheduled(name, interval, jitter=timedelta(0), timeout=timedelta(hours=1)):
+    """
+    Enregistre une tâche périodique. La fonction décorée est appelée avec
+    `since` (début de la dernière exécution réussie, ou None) et `until`
+    (début de l'exécution courante) et retourne un message de compte rendu.
+    """
+    def decorator(func):
+        REGISTRY[name] = Job(name, func, interval, jitter, timeout)
+        return func
+    return decorator
+
+
+def node_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire(job, node):
+    """Réserve la tâche si elle est échue et libre ; retourne la ligne ou None"""
+    now = timezone.now()
+    ScheduledJob.objects.get_or_create(name=job.name)
+    acquired = ScheduledJob.objects.filter(name=job.name).filter(
+        Q(next_run_at__isnull=True) | Q(next_run_at__lte=now),
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+    ).update(locked_by=node, locked_until=now + job.timeout)
+    if not acquired:
+        return None
+    return ScheduledJob.objects.get(name=job.name)
+
+
+def run_job(job, node):
+    """Exécute une tâche réservée et enregistre son historique"""
+    state = acquire(job, node)
+    if state is None:
+        return None
+
+    started_at = timezone.now()
+    run = JobRun.objects.create(
+        job_name=job.name, node=node, started_at=started_at, window_start=state.last_success_at
+    )
+    began = clock.monotonic()
+    try:
+        message = job.func(since=state.last_success_at, until=started_at)
+        run.status = 'SUCCES'
+        run.message = message or ''
+    except Exception:
+        run.status = 'ECHEC'
+        run.message = traceback.format_exc()
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(clock.monotonic() - began, 3)
+    run.save()
+
+    update = {
+        'next_run_at': job.next_run_after(started_at),
+        'locked_by': None,
+        'locked_until': None,
+    }
+    if run.status == 'SUCCES':
+        update['last_success_at'] = started_at
+    ScheduledJob.objects.filter(name=job.name, locked_by=node).update(**update)
+    return run
+
+
+def run_pending(node=None, names=None):
+    """Exécute une fois toutes les tâches échues ; retourne les exécutions"""
+    node = node or node_name()
+    runs = []
+    for name, job in sorted(REGISTRY.items()):
+        if names and name not in names:
+            continue
+        run = run_job(job, node)
+        if run is not None:
+            runs.append(run)
+    return runs
+
+
+def seconds_until_next(default):
+    """Délai avant la prochaine tâche échue, borné par `default`"""
+    next_run = ScheduledJob.objects.filter(
+        name__in=list(REGISTRY), next_run_at__isnull=False
+    ).order_by('next_run_at').values_list('next_run_at', flat=True).first()
+    if next_run is None or ScheduledJob.objects.filter(name__in=list(REGISTRY)).count() < len(REGISTRY):
+        return 1.0
+    return max(1.0, min(default, (next_run - timezone.now()).total_seconds()))
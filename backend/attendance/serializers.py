@@ -1,11 +1,26 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Presence, Retard, Absence, BiometricLog
+from .models import Presence, Retard, Absence, BiometricLog, AttendanceAnomaly
 from datetime import datetime, time
+from .shapes import DynamicFieldsMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+def presence_total_hours(day, time_in, time_out):
+    """Total des heures travaillées d'une présence (ne compte pas après 18h00)"""
+    if time_in and time_out:
+        start = datetime.combine(day, time_in)
+        limit = time(18, 0)
+        end_time = time_out if time_out <= limit else limit
+        end = datetime.combine(day, end_time)
+        if end < start:
+            return 0
+        diff = end - start
+        hours = diff.total_seconds() / 3600
+        return round(hours, 2)
+    return 0
+
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Sérialiseur pour les informations utilisateur dans les présences"""
     full_name = serializers.SerializerMethodField()
     
@@ -16,7 +31,7 @@ class UserSerializer(serializers.ModelSerializer):
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}"
 
-class PresenceSerializer(serializers.ModelSerializer):
+class PresenceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Sérialiseur pour les présences avec calculs automatiques"""
     employee = UserSerializer(read_only=True)
     employee_id = serializers.IntegerField(write_only=True)
@@ -31,10 +46,10 @@ class PresenceSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'employee', 'employee_id', 'date', 'date_display',
             'time_in', 'time_in_display', 'time_out', 'time_out_display',
-            'is_late', 'delay_minutes', 'status', 'total_hours',
+            'is_late', 'delay_minutes', 'status', 'total_hours', 'auto_closed',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['is_late', 'delay_minutes', 'created_at', 'updated_at']
+        read_only_fields = ['is_late', 'delay_minutes', 'auto_closed', 'created_at', 'updated_at']
     
     def get_date_display(self, obj):
         """Format français de la date"""
@@ -59,18 +74,7 @@ class PresenceSerializer(serializers.ModelSerializer):
     
     def get_total_hours(self, obj):
         """Calculer le total des heures travaillées (ne compte pas après 18h00)"""
-        if obj.time_in and obj.time_out:
-            from datetime import datetime, time
-            start = datetime.combine(obj.date, obj.time_in)
-            limit = time(18, 0)
-            end_time = obj.time_out if obj.time_out <= limit else limit
-            end = datetime.combine(obj.date, end_time)
-            if end < start:
-                return 0
-            diff = end - start
-            hours = diff.total_seconds() / 3600
-            return round(hours, 2)
-        return 0
+        return presence_total_hours(obj.date, obj.time_in, obj.time_out)
     
     def validate(self, data):
         """Validation des données de présence"""
@@ -92,8 +96,14 @@ class PresenceSerializer(serializers.ModelSerializer):
         employee_id = validated_data.pop('employee_id')
         employee = User.objects.get(id=employee_id)
         return Presence.objects.create(employee=employee, **validated_data)
+    
+    def update(self, instance, validated_data):
+        """Une sortie saisie remplace la clôture automatique"""
+        if 'time_out' in validated_data:
+            instance.auto_closed = False
+        return super().update(instance, validated_data)
 
-class RetardSerializer(serializers.ModelSerializer):
+class RetardSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Sérialiseur pour les retards avec justifications"""
     employee = UserSerializer(read_only=True)
     presence = PresenceSerializer(read_only=True)
@@ -151,6 +161,41 @@ class RetardJustificationSerializer(serializers.Serializer):
         instance.save()
         return instance
 
+class ManualPunchRowSerializer(serializers.Serializer):
+    """Une correction de pointage : heure absente conservée, null pour l'effacer"""
+    employee_id = serializers.IntegerField()
+    date = serializers.DateField()
+    time_in = serializers.TimeField(required=False, allow_null=True)
+    time_out = serializers.TimeField(required=False, allow_null=True)
+    
+    def validate(self, data):
+        if 'time_in' not in data and 'time_out' not in data:
+            raise serializers.ValidationError("Préciser time_in et/ou time_out")
+        return data
+
+class BulkValidationFilterSerializer(serializers.Serializer):
+    """Sélection des éléments à valider en masse"""
+    status = serializers.ChoiceField(choices=Retard.STATUS_CHOICES, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    employee_id = serializers.IntegerField(required=False)
+
+class BulkValidationSerializer(serializers.Serializer):
+    """Validation en masse : liste d'IDs ou filtre, et statut à appliquer"""
+    status = serializers.ChoiceField(choices=['APPROUVEE', 'REFUSEE'])
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=5000)
+    filter = BulkValidationFilterSerializer(required=False)
+    
+    def validate_filter(self, value):
+        if not value:
+            raise serializers.ValidationError("Le filtre ne peut pas être vide")
+        return value
+    
+    def validate(self, data):
+        if 'ids' not in data and 'filter' not in data:
+            raise serializers.ValidationError("Préciser `ids` ou `filter`")
+        return data
+
 class RetardValidationSerializer(serializers.Serializer):
     """Sérialiseur pour valider/refuser une justification de retard"""
     status = serializers.ChoiceField(choices=['APPROUVEE', 'REFUSEE'])
@@ -163,7 +208,7 @@ class RetardValidationSerializer(serializers.Serializer):
         instance.save()
         return instance
 
-class AbsenceSerializer(serializers.ModelSerializer):
+class AbsenceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Sérialiseur pour les absences avec justifications"""
     employee = UserSerializer(read_only=True)
     date_display = serializers.SerializerMethodField()
@@ -222,7 +267,7 @@ class AbsenceValidationSerializer(serializers.Serializer):
         instance.save()
         return instance
 
-class BiometricLogSerializer(serializers.ModelSerializer):
+class BiometricLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Sérialiseur pour les logs biométriques"""
     timestamp_display = serializers.SerializerMethodField()
     log_type_display = serializers.SerializerMethodField()
@@ -280,4 +325,29 @@ class BiometricLogCreateSerializer(serializers.Serializer):
         """Créer et traiter un log biométrique"""
         log = BiometricLog.objects.create(**validated_data)
         log.process_log()
-        return log 
\ No newline at end of file
+        return log 
+
+class AttendanceAnomalySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Sérialiseur pour les anomalies de pointage (lecture RH)"""
+    employee = UserSerializer(read_only=True)
+    date_display = serializers.SerializerMethodField()
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    resolved_by_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AttendanceAnomaly
+        fields = [
+            'id', 'kind', 'kind_display', 'date', 'date_display', 'employee', 'biometric_id',
+            'details', 'status', 'status_display', 'resolved_by', 'resolved_by_name', 'resolved_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_date_display(self, obj):
+        return obj.date.strftime('%d/%m/%Y')
+    
+    def get_resolved_by_name(self, obj):
+        if obj.resolved_by:
+            return f"{obj.resolved_by.first_name} {obj.resolved_by.last_name}"
+        return None
@@ -0,0 +1,165 @@
+"""
+Forme des réponses demandée par le client : `?fields=` et `?expand=`.
+
+- `fields=date,time_in,status` ne renvoie que ces champs ; un chemin pointé
+  (`employee.full_name`) choisit les champs d'une relation imbriquée.
+- `expand=presence,presence.employee` liste les relations rendues en objet ;
+  dès que `expand` est passé, les autres relations sont rendues par leur id
+  (sans jointure). Sans `expand`, toutes les relations restent imbriquées.
+
+Les champs non demandés ne sont ni calculés ni lus, et les vues ne chargent
+(select_related) que les relations rendues.
+"""
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+
+
+def _parse(value, expand=False):
+    """
+    'a,b.c,b.d' -> {'a': None, 'b': {'c': None, 'd': None}} pour `fields`
+    (None : relation ou champ entier), {'a': {}, ...} pour `expand`
+    """
+    tree = {}
+    for path in value.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                # Relation déjà demandée en entier
+                break
+            node = node.setdefault(name, {})
+        else:
+            if not expand:
+                node[names[-1]] = None
+            else:
+                node.setdefault(names[-1], {})
+    return tree
+
+
+def _implied_expansion(fields, expand):
+    """Choisir des champs d'une relation implique de la développer"""
+    for name, children in fields.items():
+        if children is not None:
+            _implied_expansion(children, expand.setdefault(name, {}))
+
+
+class FieldShape:
+    """
+    Champs retenus (arbre, None = tous) et relations développées
+    (arbre, None = toutes) à un niveau de la réponse
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        fields = _parse(params['fields']) if 'fields' in params else None
+        expand = _parse(params['expand'], expand=True) if 'expand' in params else None
+        if fields is not None and expand is not None:
+            _implied_expansion(fields, expand)
+        return cls(fields, expand)
+
+    @property
+    def is_full(self):
+        return self.fields is None and self.expand is None
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.includes(name) and (self.expand is None or name in self.expand)
+
+    def child(self, name):
+        fields = None if self.fields is None else self.fields.get(name)
+        expand = None if self.expand is None else self.expand.get(name, {})
+        return FieldShape(fields, expand)
+
+    def wants(self, path, expanded=False):
+        """Le chemin pointé est-il rendu (et développé si `expanded`) ?"""
+        *parents, leaf = path.split('.')
+        shape = self
+        for name in parents:
+            if not shape.expands(name):
+                return False
+            shape = shape.child(name)
+        return shape.expands(leaf) if expanded else shape.includes(leaf)
+
+    def select_related(self, queryset, relations, computed=None):
+        """
+        select_related limité aux relations rendues : `relations` associe les
+        relations imbriquées (chemin pointé) à leur chemin ORM, `computed` fait
+        de même pour les champs calculés qui lisent une relation
+        """
+        paths = [path for name, path in relations.items() if self.wants(name, expanded=True)]
+        paths += [path for name, path in (computed or {}).items() if self.wants(name)]
+        # select_related() sans argument suivrait toutes les relations
+        return queryset.select_related(*paths) if paths else queryset
+
+    def check(self, available, relations):
+        """Rejeter les champs inconnus et le développement d'un champ qui n'est pas une relation"""
+        unknown = [name for name in self.fields or () if name not in available]
+        if unknown:
+            raise ValidationError({'fields': [f"Champ inconnu : {name}" for name in unknown]})
+        scalar = [name for name in self.expand or () if name not in relations]
+        if scalar:
+            raise ValidationError({'expand': [f"Relation inconnue : {name}" for name in scalar]})
+
+
+FULL_SHAPE = FieldShape()
+
+
+class DynamicFieldsMixin:
+    """
+    Sérialiseur qui ne garde que les champs de sa forme (`shape=`) : les
+    relations imbriquées non développées deviennent leur clé primaire
+    (lue sur la colonne *_id, sans requête)
+    """
+
+    def __init__(self, *args, shape=None, **kwargs):
+        self.shape = shape
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        shape = self.shape
+        if shape is None or shape.is_full:
+            return fields
+        readable = {name: field for name, field in fields.items() if not field.write_only}
+        shape.check(readable, [name for name, field in readable.items()
+                               if isinstance(field, DynamicFieldsMixin)])
+        shaped = {}
+        for name, field in readable.items():
+            if not shape.includes(name):
+                continue
+            if isinstance(field, DynamicFieldsMixin):
+                if shape.expands(name):
+                    field.shape = shape.child(name)
+                else:
+                    field = serializers.PrimaryKeyRelatedField(read_only=True, source=field.source)
+            shaped[name] = field
+        return shaped
+
+
+class ShapedViewMixin:
+    """
+    Applique `?fields=` / `?expand=` aux lectures. Les écritures renvoient
+    toujours la forme complète.
+    """
+
+    def get_shape(self):
+        if not hasattr(self, '_shape'):
+            if self.request.method in permissions.SAFE_METHODS:
+                self._shape = FieldShape.from_request(self.request)
+            else:
+                self._shape = FULL_SHAPE
+        return self._shape
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), DynamicFieldsMixin):
+            kwargs.setdefault('shape', self.get_shape())
+        return super().get_serializer(*args, **kwargs)
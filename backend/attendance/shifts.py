@@ -0,0 +1,98 @@
+"""
+Résolution des horaires de travail : heure d'entrée et de sortie attendues
+pour un employé à une date donnée, et calcul du retard.
+
+Toutes les affectations sont chargées en une fois dans un cache par
+processus, reconstruit quand les horaires, rotations ou affectations
+changent : le traitement d'un pointage ne coûte aucune requête.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+
+from .cache import TableVersionCache
+from .models import Shift, ShiftRotation, ShiftRotationStep, ShiftAssignment
+from .workcalendar import work_calendar
+
+
+def default_shift():
+    """Horaire appliqué aux employés sans affectation"""
+    start, end = getattr(settings, 'WORK_DEFAULT_SHIFT', (time(8, 0), time(18, 0)))
+    return start, end
+
+
+def _load_assignments():
+    """
+    {employee_id: [(start_date, end_date, horaires)]}, la plus récente en tête.
+    `horaires` est une liste de (début, fin) : un seul élément pour un horaire
+    fixe, un élément par jour du cycle pour une rotation.
+    """
+    shifts = {
+        shift_id: (start, end)
+        for shift_id, start, end in Shift.objects.values_list('id', 'start_time', 'end_time')
+    }
+    cycles = defaultdict(list)
+    for rotation_id, shift_id, days in ShiftRotationStep.objects.order_by(
+            'rotation_id', 'position', 'id').values_list('rotation_id', 'shift_id', 'days'):
+        cycles[rotation_id].extend([shifts[shift_id]] * days)
+
+    assignments = defaultdict(list)
+    for employee_id, shift_id, rotation_id, start_date, end_date in ShiftAssignment.objects.order_by(
+            'employee_id', '-start_date', '-id').values_list(
+            'employee_id', 'shift_id', 'rotation_id', 'start_date', 'end_date'):
+        pattern = [shifts[shift_id]] if shift_id else cycles.get(rotation_id)
+        if pattern:
+            assignments[employee_id].append((start_date, end_date, pattern))
+    return dict(assignments)
+
+
+class ShiftResolver:
+    def __init__(self):
+        self._cache = TableVersionCache(
+            [Shift, ShiftRotation, ShiftRotationStep, ShiftAssignment], _load_assignments
+        )
+
+    def resolve(self, employee_id, day):
+        """(heure d'entrée, heure de sortie) attendues pour l'employé ce jour-là"""
+        for start_date, end_date, pattern in self._cache.get().get(employee_id, ()):
+            if start_date <= day and (end_date is None or day <= end_date):
+                if len(pattern) == 1:
+                    return pattern[0]
+                return pattern[(day - start_date).days % len(pattern)]
+        return default_shift()
+
+    def invalidate(self):
+        """Force la relecture des affectations au prochain appel"""
+        self._cache.invalidate()
+
+    def lateness(self, employee_id, day, time_in):
+        """
+        (en retard, minutes de retard, heure attendue) pour une heure d'entrée.
+        Une entrée après minuit, avant la fin d'un horaire de nuit commencé la
+        veille, est comptée en retard sur l'heure de début de la veille si
+        l'horaire du jour est aussi de nuit, ou si elle est plus proche du
+        début de la veille que de celui du jour (sinon, c'est une arrivée en
+        avance sur l'horaire du jour, ex. passage de la nuit au matin).
+        Aucun retard n'est compté un jour non travaillé.
+        """
+        expected_start, expected_end = self.resolve(employee_id, day)
+        if time_in is None:
+            return False, 0, expected_start
+        entry = datetime.combine(day, time_in)
+        shift_day = day
+        previous_start, previous_end = self.resolve(employee_id, day - timedelta(days=1))
+        if previous_end < previous_start and time_in < previous_end:
+            since_previous = entry - datetime.combine(shift_day - timedelta(days=1), previous_start)
+            until_today = datetime.combine(day, expected_start) - entry
+            if expected_end < expected_start or since_previous < until_today:
+                shift_day, expected_start = day - timedelta(days=1), previous_start
+        if shift_day == day and time_in <= expected_start:
+            return False, 0, expected_start
+        if not work_calendar.is_working_day(shift_day):
+            return False, 0, expected_start
+        delay_seconds = (entry - datetime.combine(shift_day, expected_start)).total_seconds()
+        return True, int(delay_seconds / 60), expected_start
+
+
+shift_resolver = ShiftResolver()
@@ -0,0 +1,77 @@
+"""
+Synchronisation incrémentale des listes pour les clients qui gardent un cache.
+
+Le journal des modifications (AttendanceChange, voir changes.py) sert de
+curseur : `GET .../sync/?since=<curseur>` renvoie les éléments créés ou
+modifiés depuis ce curseur (même forme que la liste) et les IDs supprimés,
+dans le périmètre du rôle de l'appelant.
+"""
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .changes import ID_CHUNK_SIZE, collect_changes, latest_sequence, settled_changes
+from .shapes import FieldShape
+
+
+class SyncMixin:
+    """
+    Action `sync` pour un ViewSet à liste rapide (FastListMixin).
+    `sync_resource` : ressource du journal des modifications.
+    """
+    sync_resource = None
+    sync_limit = 1000
+    max_sync_limit = 5000
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Modifications depuis `since` (au plus `limit` entrées du journal).
+        Sans `since` : curseur courant, à utiliser après avoir chargé la liste.
+        """
+        if 'since' not in request.query_params:
+            return Response({'cursor': latest_sequence(), 'has_more': False, 'upserts': [], 'deletes': []})
+        try:
+            since = int(request.query_params['since'])
+            limit = int(request.query_params.get('limit', self.sync_limit))
+        except ValueError:
+            return Response(
+                {'error': 'since et limit doivent être des entiers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(max(limit, 1), self.max_sync_limit)
+
+        # Employé : uniquement ses propres éléments
+        employee_id = None if request.user.role in ['DG', 'RH'] else request.user.id
+        cursor, latest = collect_changes(
+            since, resources=[self.sync_resource], employee_id=employee_id, limit=limit
+        )
+        changes = sorted(latest[self.sync_resource].items(), key=lambda change: change[1][0])
+        rows = self.sync_rows([object_id for object_id, (_, operation, _) in changes if operation == 'UPSERT'])
+        # Supprimés, ou sortis du périmètre visible depuis leur modification
+        deletes = [object_id for object_id, _ in changes if object_id not in rows]
+
+        remaining = settled_changes().filter(id__gt=cursor, resource=self.sync_resource)
+        if employee_id is not None:
+            remaining = remaining.filter(employee_id=employee_id)
+        return Response({
+            'cursor': cursor,
+            'has_more': remaining.exists(),
+            'upserts': list(rows.values()),
+            'deletes': deletes,
+        })
+
+    def sync_rows(self, object_ids):
+        """Lignes actuelles et visibles, rendues comme la liste (id toujours inclus)"""
+        shape = self.get_shape()
+        if shape.fields is not None:
+            shape = FieldShape({'id': None, **shape.fields}, shape.expand)
+        spec = self.list_spec.shaped(shape)
+        queryset = self.get_queryset().order_by()
+        rendered = {}
+        for start in range(0, len(object_ids), ID_CHUNK_SIZE):
+            chunk = object_ids[start:start + ID_CHUNK_SIZE]
+            for row in spec.render(spec.project(queryset.filter(id__in=chunk)), self.request):
+                rendered[row['id']] = row
+        # Ordre du journal
+        return {object_id: rendered[object_id] for object_id in object_ids if object_id in rendered}
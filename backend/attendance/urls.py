@@ -4,7 +4,8 @@ from .views import (
     PresenceViewSet, 
     RetardViewSet, 
     AbsenceViewSet, 
-    BiometricLogViewSet
+    BiometricLogViewSet,
+    AttendanceAnomalyViewSet
 )
 
 # Configuration du routeur pour les ViewSets
@@ -13,6 +14,7 @@ router.register(r'presences', PresenceViewSet, basename='presence')
 router.register(r'retards', RetardViewSet, basename='retard')
 router.register(r'absences', AbsenceViewSet, basename='absence')
 router.register(r'biometric-logs', BiometricLogViewSet, basename='biometric-log')
+router.register(r'anomalies', AttendanceAnomalyViewSet, basename='anomaly')
 
 # URLs de l'application
 urlpatterns = [
@@ -41,9 +43,10 @@ urlpatterns = [
              PresenceViewSet.as_view({'post': 'employee_punch_out'}), 
              name='employee-punch-out'),
         
-        # Réception des données biométriques
+        # Réception des données biométriques (authentification propre à l'action :
+        # clé de dispositif ou JWT)
         path('biometric/receive-punch/', 
-             BiometricLogViewSet.as_view({'post': 'receive_punch'}), 
+             BiometricLogViewSet.as_view({'post': 'receive_punch'}, **BiometricLogViewSet.receive_punch.kwargs), 
              name='receive-biometric-punch'),
         
         # Création automatique des absences
@@ -85,26 +88,40 @@ PRÉSENCES :
 - DELETE /api/presences/{id}/ - Supprimer une présence
 - GET /api/presences/statistics/ - Statistiques de présence
 - POST /api/presences/manual-punch/ - Pointage manuel (RH)
+- POST /api/presences/bulk-manual-punch/ - Corrections de pointage en masse (RH)
 
 RETARDS :
 - GET /api/retards/ - Liste des retards
 - GET /api/retards/{id}/ - Détail d'un retard
 - PATCH /api/retards/{id}/justify/ - Justifier un retard
 - PATCH /api/retards/{id}/validate/ - Valider justification (RH)
+- POST /api/retards/bulk-validate/ - Valider/refuser en masse (RH)
 
 ABSENCES :
 - GET /api/absences/ - Liste des absences
 - GET /api/absences/{id}/ - Détail d'une absence
+- GET /api/absences/timeline/ - Historique absences + retards paginé (curseur)
 - PATCH /api/absences/{id}/justify/ - Justifier une absence
 - PATCH /api/absences/{id}/validate/ - Valider justification (RH)
+- POST /api/absences/bulk-validate/ - Valider/refuser en masse (RH)
 
 LOGS BIOMÉTRIQUES :
 - GET /api/biometric-logs/ - Liste des logs
 - POST /api/biometric-logs/ - Créer un log
 - GET /api/biometric-logs/{id}/ - Détail d'un log
-- POST /api/biometric/receive-punch/ - Réception pointage biométrique
+- POST /api/biometric/receive-punch/ - Réception pointage biométrique (clé de dispositif ou JWT)
 - POST /api/biometric/create-absences/ - Créer absences automatiques (RH)
 
+ANOMALIES DE POINTAGE (RH) :
+- GET /api/anomalies/ - Liste paginée (filtres : kind, status, date_from, date_to, employee_id)
+- GET /api/anomalies/{id}/ - Détail d'une anomalie
+- PATCH /api/anomalies/{id}/resolve/ - Marquer comme résolue
+
+SYNCHRONISATION INCRÉMENTALE :
+- GET /api/presences/sync/?since=<curseur> - Présences modifiées/supprimées depuis le curseur
+- GET /api/retards/sync/?since=<curseur> - Idem pour les retards
+- GET /api/absences/sync/?since=<curseur> - Idem pour les absences
+
 PARAMÈTRES DE FILTRAGE :
 - date_from : Date de début (YYYY-MM-DD)
 - date_to : Date de fin (YYYY-MM-DD)
@@ -1,18 +1,22 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db.models import Q, Count, Avg
 from datetime import datetime, date, timedelta
-from .models import Presence, Retard, Absence, BiometricLog
+from .models import Presence, Retard, Absence, BiometricLog, AttendanceAnomaly
+from . import jobs
+from .workcalendar import work_calendar
 from .serializers import (
     PresenceSerializer, RetardSerializer, AbsenceSerializer, BiometricLogSerializer,
     RetardJustificationSerializer, RetardValidationSerializer,
     AbsenceJustificationSerializer, AbsenceValidationSerializer,
-    BiometricLogCreateSerializer
+    BiometricLogCreateSerializer, AttendanceAnomalySerializer, BulkValidationSerializer,
+    ManualPunchRowSerializer
 )
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
@@ -20,6 +24,20 @@ import openpyxl
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 from io import BytesIO
+import os
+from .fastpath import (
+    FastListMixin, PRESENCE_SPEC, RETARD_SPEC, ABSENCE_SPEC, BIOMETRIC_LOG_SPEC,
+    TIMELINE_ORDERING, TIMELINE_ABSENCE_SPEC, timeline
+)
+from .shapes import ShapedViewMixin
+from .sync import SyncMixin
+from .devices import AuthenticatedDevice, DeviceKeyAuthentication, IsDeviceOrAuthenticated
+from preslog.throttling import IngestThrottleMixin
+from preslog.replicas import ReplicaReadMixin
+from .reports import (
+    PRESENCE_REPORT_COLUMNS, PRESENCE_BUNDLE_COLUMNS, draw_presences_report,
+    period_label, build_presence_jobs, default_bundle_workers, iter_zip_bundle
+)
 
 User = get_user_model()
 
@@ -41,6 +59,13 @@ class IsOwnerOrRH(permissions.BasePermission):
             return True
         return obj.employee == request.user
 
+class IsRH(permissions.BasePermission):
+    """
+    Permission : réservé à la RH et au DG (lecture comprise)
+    """
+    def has_permission(self, request, view):
+        return request.user.role in ['DG', 'RH']
+
 class IsEmployeOrRHOrReadOnly(permissions.BasePermission):
     """
     Permission : DG, RH et EMPLOYE peuvent faire POST (pour le pointage), autres lecture seule
@@ -50,11 +75,59 @@ class IsEmployeOrRHOrReadOnly(permissions.BasePermission):
             return True
         return request.user.role in ['DG', 'RH', 'EMPLOYE']
 
-class PresenceViewSet(viewsets.ModelViewSet):
+def bulk_validate(request, queryset):
+    """
+    Validation en masse des justifications (retards ou absences) : `ids` ou
+    `filter` et `status` dans le corps, résultat détaillé par ID
+    """
+    if request.user.role not in ['DG', 'RH']:
+        return Response(
+            {'error': 'Permission refusée'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    serializer = BulkValidationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    
+    ids = data.get('ids')
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    filters = data.get('filter', {})
+    if 'status' in filters:
+        queryset = queryset.filter(justification_status=filters['status'])
+    if 'date_from' in filters:
+        queryset = queryset.filter(date__gte=filters['date_from'])
+    if 'date_to' in filters:
+        queryset = queryset.filter(date__lte=filters['date_to'])
+    if 'employee_id' in filters:
+        queryset = queryset.filter(employee_id=filters['employee_id'])
+    
+    results = jobs.validate_justifications(queryset, data['status'], request.user)
+    if ids is not None:
+        for object_id in ids:
+            results.setdefault(object_id, 'not_found')
+    counts = {'updated': 0, 'unchanged': 0, 'not_found': 0}
+    for result in results.values():
+        counts[result] += 1
+    return Response({
+        'status': data['status'],
+        **counts,
+        'results': {str(object_id): result for object_id, result in results.items()},
+    })
+
+class PresenceViewSet(IngestThrottleMixin, ReplicaReadMixin, SyncMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet pour la gestion des présences
     """
     serializer_class = PresenceSerializer
+    list_spec = PRESENCE_SPEC
+    sync_resource = 'presence'
+    max_bulk_punches = 2000
+    ingest_actions = ('bulk_manual_punch',)
+    replica_actions = ('statistics', 'rh_dashboard', 'export_pdf', 'export_excel', 'export_bundle')
+    keyset_ordering = ('-date', '-id')
     permission_classes = [IsRHOrReadOnly]
     
     def get_queryset(self):
@@ -80,7 +153,9 @@ class PresenceViewSet(viewsets.ModelViewSet):
         if employee_id and user.role in ['DG', 'RH']:
             queryset = queryset.filter(employee_id=employee_id)
         
-        return queryset.select_related('employee').order_by('-date', '-created_at')
+        # Relations chargées selon la forme demandée (?fields=, ?expand=)
+        queryset = self.get_shape().select_related(queryset, {'employee': 'employee'})
+        return queryset.order_by(*self.keyset_ordering)
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
@@ -119,16 +194,29 @@ class PresenceViewSet(viewsets.ModelViewSet):
                 total_hours += hours
                 count_days += 1
         avg_hours = round(total_hours / count_days, 2) if count_days > 0 else 0
+        # Taux de présence rapporté aux jours travaillés (calendrier de travail)
+        working_days = work_calendar.working_days(start_date, end_date)
+        # Numérateur et dénominateur sur la même population : employés actifs ayant pointé
+        worked = presences.filter(time_in__isnull=False)
+        if user.role in ['DG', 'RH']:
+            expected = working_days * User.objects.filter(is_active=True, role='EMPLOYE').count()
+            worked = worked.filter(employee__role='EMPLOYE', employee__is_active=True)
+        else:
+            expected = working_days
+        worked = worked.exclude(date__in=work_calendar.non_working_days(start_date, end_date)).count()
+        attendance_rate = round(100 * worked / expected, 1) if expected > 0 else 0
         return Response({
             'period': {
                 'start_date': start_date,
-                'end_date': end_date
+                'end_date': end_date,
+                'working_days': working_days
             },
             'statistics': {
                 'total_presences': total_presences,
                 'total_absences': total_absences,
                 'total_retards': total_retards,
-                'avg_hours_per_day': avg_hours
+                'avg_hours_per_day': avg_hours,
+                'attendance_rate': attendance_rate
             }
         })
     
@@ -170,12 +258,82 @@ class PresenceViewSet(viewsets.ModelViewSet):
             presence.time_in = punch_datetime.time()
         elif punch_type == 'out':
             presence.time_out = punch_datetime.time()
+            presence.auto_closed = False
         
         presence.save()
         
         serializer = self.get_serializer(presence)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='bulk-manual-punch')
+    def bulk_manual_punch(self, request):
+        """
+        Corrections de pointage en masse (RH uniquement), par exemple après une
+        panne de dispositif : liste `punches` de {employee_id, date, time_in, time_out}.
+        Les lignes invalides sont signalées et les autres appliquées, sauf si
+        `all_or_nothing` est vrai.
+        """
+        if request.user.role not in ['DG', 'RH']:
+            return Response(
+                {'error': 'Permission refusée'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        punches = request.data.get('punches')
+        if not isinstance(punches, list) or not punches:
+            return Response(
+                {'error': '`punches` doit être une liste non vide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(punches) > self.max_bulk_punches:
+            return Response(
+                {'error': f'{self.max_bulk_punches} corrections au maximum par requête'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = [None] * len(punches)
+        valid = []
+        for index, punch in enumerate(punches):
+            serializer = ManualPunchRowSerializer(data=punch)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'outcome': 'error', 'errors': serializer.errors}
+        
+        # Employés actifs : une seule requête pour tout le lot
+        active = set(User.objects.filter(
+            id__in={data['employee_id'] for _, data in valid}, is_active=True
+        ).values_list('id', flat=True))
+        accepted = []
+        seen = set()
+        for index, data in valid:
+            key = (data['employee_id'], data['date'])
+            if data['employee_id'] not in active:
+                results[index] = {'index': index, 'outcome': 'error', 'errors': ['Employé non trouvé']}
+            elif key in seen:
+                results[index] = {'index': index, 'outcome': 'error',
+                                  'errors': ['Doublon (employé, date) dans la requête']}
+            else:
+                seen.add(key)
+                accepted.append((index, data))
+        
+        errors = len(punches) - len(accepted)
+        if errors and request.data.get('all_or_nothing'):
+            return Response(
+                {'errors': errors, 'results': [result for result in results if result]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = {}
+        if accepted:
+            outcomes, stats = jobs.apply_manual_punches([data for _, data in accepted])
+            for (index, data), (outcome, presence_id) in zip(accepted, outcomes):
+                results[index] = {
+                    'index': index, 'employee_id': data['employee_id'], 'date': data['date'],
+                    'outcome': outcome, 'presence_id': presence_id,
+                }
+        return Response({'errors': errors, 'stats': stats, 'results': results})
+
     @action(detail=False, methods=['post'], url_path='employee-punch', permission_classes=[IsEmployeOrRHOrReadOnly])
     def employee_punch(self, request):
         """
@@ -264,68 +422,13 @@ class PresenceViewSet(viewsets.ModelViewSet):
         # Préparation du PDF
         response = HttpResponse(content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="presences.pdf"'
-        p = canvas.Canvas(response, pagesize=A4)
-        width, height = A4
-        y = height - 2*cm
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(2*cm, y, "Rapport de présences")
-        y -= 1*cm
-        p.setFont("Helvetica", 10)
-        p.drawString(2*cm, y, f"Employé : {user.get_full_name()} ({user.email})")
-        y -= 0.7*cm
-        # Affichage de la période
-        if date_from and date_to:
-            p.drawString(2*cm, y, f"Période : du {date_from} au {date_to}")
-        elif date_from:
-            p.drawString(2*cm, y, f"Période : à partir du {date_from}")
-        elif date_to:
-            p.drawString(2*cm, y, f"Période : jusqu'au {date_to}")
-        else:
-            p.drawString(2*cm, y, "Période : toutes les données disponibles")
-        y -= 0.7*cm
-        p.drawString(2*cm, y, f"Date d'export : {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-        y -= 0.7*cm
-        # Note explicative
-        p.setFont("Helvetica-Oblique", 9)
-        p.drawString(2*cm, y, "Ce rapport présente l'ensemble de vos présences enregistrées sur la période sélectionnée. Pour toute question, contactez le service RH.")
-        y -= 1*cm
-        # En-tête du tableau
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(2*cm, y, "Date")
-        p.drawString(5*cm, y, "Entrée")
-        p.drawString(8*cm, y, "Sortie")
-        p.drawString(11*cm, y, "Retard")
-        p.drawString(14*cm, y, "Total h")
-        p.drawString(17*cm, y, "Statut")
-        y -= 0.5*cm
-        p.setFont("Helvetica", 10)
-        for presence in queryset:
-            if y < 2*cm:
-                p.showPage()
-                y = height - 2*cm
-            p.drawString(2*cm, y, presence.date.strftime('%d/%m/%Y'))
-            p.drawString(5*cm, y, presence.time_in.strftime('%H:%M') if presence.time_in else '-')
-            p.drawString(8*cm, y, presence.time_out.strftime('%H:%M') if presence.time_out else '-')
-            p.drawString(11*cm, y, f"{presence.delay_minutes} min" if presence.is_late else '-')
-            # Calcul total heures
-            if presence.time_in and presence.time_out:
-                start = datetime.combine(presence.date, presence.time_in)
-                end = datetime.combine(presence.date, presence.time_out)
-                hours = round((end - start).total_seconds() / 3600, 2)
-                p.drawString(14*cm, y, f"{hours}h")
-            else:
-                p.drawString(14*cm, y, '-')
-            # Statut
-            if not presence.time_in:
-                statut = 'ABSENT'
-            elif not presence.time_out:
-                statut = 'EN COURS'
-            else:
-                statut = 'TERMINÉ'
-            p.drawString(17*cm, y, statut)
-            y -= 0.5*cm
-        p.showPage()
-        p.save()
+        rows = queryset.values_list(*PRESENCE_REPORT_COLUMNS)
+        draw_presences_report(
+            canvas.Canvas(response, pagesize=A4),
+            f"{user.get_full_name()} ({user.email})",
+            period_label(date_from, date_to),
+            rows.iterator()
+        )
         return response
 
     @action(detail=False, methods=['get'], url_path='export-excel')
@@ -406,6 +509,31 @@ class PresenceViewSet(viewsets.ModelViewSet):
         response['Content-Disposition'] = 'attachment; filename="presences.xlsx"'
         return response
 
+    @action(detail=False, methods=['get'], url_path='export-bundle')
+    def export_bundle(self, request):
+        """
+        Génère une archive ZIP contenant un PDF de présences par employé (RH/DG uniquement).
+        Les PDF sont rendus en parallèle par un pool de processus et ajoutés à l'archive
+        au fur et à mesure ; le paramètre `workers` permet d'ajuster le nombre de processus.
+        """
+        if request.user.role not in ['DG', 'RH']:
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        try:
+            workers = int(request.query_params.get('workers', default_bundle_workers()))
+        except ValueError:
+            return Response({'error': 'Paramètre workers invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        workers = max(1, min(workers, os.cpu_count() or 1))
+        rows = self.get_queryset().order_by('employee_id', 'date').values_list(*PRESENCE_BUNDLE_COLUMNS)
+        # Lignes lues pendant l'envoi de l'archive, après la fin de la vue :
+        # la base (réplique éventuelle) est fixée dès maintenant
+        rows = rows.using(rows.db)
+        render_jobs = build_presence_jobs(rows.iterator(), period_label(date_from, date_to))
+        response = StreamingHttpResponse(iter_zip_bundle(render_jobs, workers), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="presences_employes.zip"'
+        return response
+
     @action(detail=False, methods=['get'], url_path='rh-dashboard')
     def rh_dashboard(self, request):
         """
@@ -436,6 +564,12 @@ class PresenceViewSet(viewsets.ModelViewSet):
                 total_hours += hours
                 count_days += 1
         avg_hours = round(total_hours / count_days, 2) if count_days > 0 else 0
+        working_days = work_calendar.working_days(start_date, end_date)
+        expected = working_days * total_employees
+        worked = presences.filter(
+            time_in__isnull=False, employee__role='EMPLOYE', employee__is_active=True
+        ).exclude(date__in=work_calendar.non_working_days(start_date, end_date)).count()
+        attendance_rate = round(100 * worked / expected, 1) if expected > 0 else 0
         return Response({
             'total_employees': total_employees,
             'absences_en_attente': absences_en_attente,
@@ -444,15 +578,65 @@ class PresenceViewSet(viewsets.ModelViewSet):
                 'total_presences': total_presences,
                 'total_absences': total_absences,
                 'total_retards': total_retards,
-                'avg_hours_per_day': avg_hours
+                'avg_hours_per_day': avg_hours,
+                'working_days': working_days,
+                'attendance_rate': attendance_rate
             }
         })
 
-class RetardViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['post'], url_path='recompute-lateness')
+    def recompute_lateness(self, request):
+        """
+        Recalculer les retards d'une période après un changement d'horaire ou
+        de calendrier (`date_from`, `date_to` par défaut aujourd'hui,
+        `employee_ids` optionnel)
+        """
+        if request.user.role not in ['DG', 'RH']:
+            return Response(
+                {'error': 'Permission refusée'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            date_from = datetime.strptime(request.data.get('date_from'), '%Y-%m-%d').date()
+            date_to = datetime.strptime(
+                request.data.get('date_to') or date.today().isoformat(), '%Y-%m-%d'
+            ).date()
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'date_from requise, format attendu : YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if date_to < date_from:
+            return Response(
+                {'error': 'date_to doit être postérieure à date_from'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        employee_ids = request.data.get('employee_ids')
+        if employee_ids is not None and (
+                not isinstance(employee_ids, list) or
+                not all(isinstance(employee_id, int) for employee_id in employee_ids)):
+            return Response(
+                {'error': 'employee_ids doit être une liste d\'identifiants'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = jobs.recompute_lateness(date_from, date_to, employee_ids=employee_ids)
+        return Response({
+            'success': True,
+            'message': f'{stats["presences_updated"]} présence(s) mise(s) à jour du {date_from} au {date_to}',
+            **stats
+        })
+
+class RetardViewSet(ReplicaReadMixin, SyncMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet pour la gestion des retards
     """
     serializer_class = RetardSerializer
+    list_spec = RETARD_SPEC
+    sync_resource = 'retard'
+    replica_actions = ('export_pdf', 'export_excel')
+    keyset_ordering = ('-date', '-id')
     permission_classes = [IsRHOrReadOnly]
     
     def get_queryset(self):
@@ -479,7 +663,13 @@ class RetardViewSet(viewsets.ReadOnlyModelViewSet):
         if employee_id and user.role in ['DG', 'RH']:
             queryset = queryset.filter(employee_id=employee_id)
         
-        return queryset.select_related('employee', 'presence', 'validated_by').order_by('-date', '-created_at')
+        # Relations chargées selon la forme demandée (?fields=, ?expand=)
+        queryset = self.get_shape().select_related(
+            queryset,
+            {'employee': 'employee', 'presence': 'presence', 'presence.employee': 'presence__employee'},
+            computed={'validated_by_name': 'validated_by'}
+        )
+        return queryset.order_by(*self.keyset_ordering)
     
     @action(detail=True, methods=['patch'])
     def justify(self, request, pk=None):
@@ -525,6 +715,11 @@ class RetardViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='bulk-validate')
+    def bulk_validate(self, request):
+        """Valider ou refuser en une fois les justifications de plusieurs retards (RH uniquement)"""
+        return bulk_validate(request, Retard.objects.all())
+
     @action(detail=False, methods=['get'], url_path='export')
     def export_pdf(self, request):
         """
@@ -655,11 +850,15 @@ class RetardViewSet(viewsets.ReadOnlyModelViewSet):
         response['Content-Disposition'] = 'attachment; filename="retards.xlsx"'
         return response
 
-class AbsenceViewSet(viewsets.ReadOnlyModelViewSet):
+class AbsenceViewSet(ReplicaReadMixin, SyncMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet pour la gestion des absences
     """
     serializer_class = AbsenceSerializer
+    list_spec = ABSENCE_SPEC
+    sync_resource = 'absence'
+    replica_actions = ('export_pdf', 'export_excel')
+    keyset_ordering = ('-date', '-id')
     permission_classes = [IsRHOrReadOnly]
     
     def get_queryset(self):
@@ -686,7 +885,11 @@ class AbsenceViewSet(viewsets.ReadOnlyModelViewSet):
         if employee_id and user.role in ['DG', 'RH']:
             queryset = queryset.filter(employee_id=employee_id)
         
-        return queryset.select_related('employee', 'validated_by').order_by('-date', '-created_at')
+        # Relations chargées selon la forme demandée (?fields=, ?expand=)
+        queryset = self.get_shape().select_related(
+            queryset, {'employee': 'employee'}, computed={'validated_by_name': 'validated_by'}
+        )
+        return queryset.order_by(*self.keyset_ordering)
     
     @action(detail=True, methods=['patch'])
     def justify(self, request, pk=None):
@@ -732,6 +935,11 @@ class AbsenceViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='bulk-validate')
+    def bulk_validate(self, request):
+        """Valider ou refuser en une fois les justifications de plusieurs absences (RH uniquement)"""
+        return bulk_validate(request, Absence.objects.all())
+
     @action(detail=False, methods=['get'], url_path='export')
     def export_pdf(self, request):
         """
@@ -866,8 +1074,8 @@ class AbsenceViewSet(viewsets.ReadOnlyModelViewSet):
         absences = Absence.objects.filter(employee=user).order_by('-date')
         retards = Retard.objects.filter(employee=user).order_by('-date')
 
-        absences_data = AbsenceSerializer(absences, many=True).data
-        retards_data = RetardSerializer(retards, many=True).data
+        absences_data = ABSENCE_SPEC.serialize(absences)
+        retards_data = RETARD_SPEC.serialize(retards)
 
         # On ajoute un champ 'type' pour différencier dans le front
         for a in absences_data:
@@ -881,11 +1089,45 @@ class AbsenceViewSet(viewsets.ReadOnlyModelViewSet):
 
         return Response(all_data)
 
-class BiometricLogViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def timeline(self, request):
+        """
+        Historique paginé des absences et des retards d'un employé (l'utilisateur
+        connecté, ou `employee_id` pour la RH) : un seul UNION ALL trié par date,
+        paginé par curseur
+        """
+        user = request.user
+        employee_id = request.query_params.get('employee_id')
+        if employee_id and user.role in ['DG', 'RH']:
+            absences = Absence.objects.filter(employee_id=employee_id)
+            retards = Retard.objects.filter(employee_id=employee_id)
+        else:
+            absences = Absence.objects.filter(employee=user)
+            retards = Retard.objects.filter(employee=user)
+        
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        if date_from:
+            absences, retards = absences.filter(date__gte=date_from), retards.filter(date__gte=date_from)
+        if date_to:
+            absences, retards = absences.filter(date__lte=date_to), retards.filter(date__lte=date_to)
+        
+        # Clé de pagination propre à cette action : (date, type, id)
+        self.keyset_ordering = TIMELINE_ORDERING
+        rows = timeline(absences, retards)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(TIMELINE_ABSENCE_SPEC.render(page, request))
+        return Response(TIMELINE_ABSENCE_SPEC.render(rows[:], request))
+
+class BiometricLogViewSet(IngestThrottleMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet pour la gestion des logs biométriques
     """
     serializer_class = BiometricLogSerializer
+    list_spec = BIOMETRIC_LOG_SPEC
+    ingest_actions = ('receive_punch', 'create')
+    keyset_ordering = ('-timestamp', '-id')
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
@@ -897,7 +1139,8 @@ class BiometricLogViewSet(viewsets.ModelViewSet):
         else:
             queryset = BiometricLog.objects.filter(employee=user)
         
-        return queryset.select_related('employee').order_by('-timestamp')
+        queryset = self.get_shape().select_related(queryset, {}, computed={'employee_name': 'employee'})
+        return queryset.order_by(*self.keyset_ordering)
     
     def get_serializer_class(self):
         """Utiliser un sérialiseur différent pour la création via API"""
@@ -905,11 +1148,16 @@ class BiometricLogViewSet(viewsets.ModelViewSet):
             return BiometricLogCreateSerializer
         return BiometricLogSerializer
     
-    @action(detail=False, methods=['post'])
+    @action(
+        detail=False, methods=['post'],
+        authentication_classes=[DeviceKeyAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+        permission_classes=[IsDeviceOrAuthenticated]
+    )
     def receive_punch(self, request):
         """
         Endpoint pour recevoir les données de pointage du dispositif biométrique
-        Format attendu :
+        Le dispositif s'authentifie par sa clé d'API (`Authorization: Device <clé>`) ;
+        un jeton JWT reste accepté. Format attendu :
         {
             "biometric_id": "12345",
             "log_type": "ENTREE",
@@ -917,8 +1165,17 @@ class BiometricLogViewSet(viewsets.ModelViewSet):
             "device_id": "DEVICE_001",
             "raw_data": {...}
         }
+        Avec une clé de dispositif, `device_id` est celui du dispositif authentifié.
         """
-        serializer = BiometricLogCreateSerializer(data=request.data)
+        data = request.data
+        if isinstance(request.auth, AuthenticatedDevice):
+            if data.get('device_id', request.auth.device_id) != request.auth.device_id:
+                return Response({
+                    'success': False,
+                    'error': 'device_id ne correspond pas au dispositif authentifié'
+                }, status=status.HTTP_403_FORBIDDEN)
+            data = {**data, 'device_id': request.auth.device_id}
+        serializer = BiometricLogCreateSerializer(data=data)
         
         if serializer.is_valid():
             try:
@@ -944,7 +1201,8 @@ class BiometricLogViewSet(viewsets.ModelViewSet):
     def create_absences(self, request):
         """
         Créer automatiquement les absences pour les employés qui n'ont pas pointé
-        Cette action peut être appelée manuellement ou via un cron job
+        Accepte une date (`date`) ou une période (`date_from`, `date_to`) pour rattraper
+        plusieurs jours en un appel. Cette action peut être appelée manuellement ou via un cron job
         """
         if request.user.role not in ['DG', 'RH']:
             return Response(
@@ -952,37 +1210,79 @@ class BiometricLogViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Date pour laquelle créer les absences (par défaut hier)
-        absence_date = request.data.get('date', (date.today() - timedelta(days=1)).isoformat())
-        
-        # Récupérer tous les employés actifs
-        employees = User.objects.filter(is_active=True, role='EMPLOYE')
-        
-        absences_created = 0
-        
-        for employee in employees:
-            # Vérifier s'il y a une présence pour cette date
-            presence_exists = Presence.objects.filter(
-                employee=employee, 
-                date=absence_date
-            ).exists()
-            
-            # Vérifier s'il y a déjà une absence pour cette date
-            absence_exists = Absence.objects.filter(
-                employee=employee, 
-                date=absence_date
-            ).exists()
-            
-            # Créer l'absence si pas de présence et pas d'absence
-            if not presence_exists and not absence_exists:
-                Absence.objects.create(
-                    employee=employee,
-                    date=absence_date
-                )
-                absences_created += 1
+        # Période pour laquelle créer les absences (par défaut hier)
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        try:
+            date_from = datetime.strptime(
+                request.data.get('date_from') or request.data.get('date') or yesterday, '%Y-%m-%d'
+            ).date()
+            date_to = datetime.strptime(
+                request.data.get('date_to') or date_from.isoformat(), '%Y-%m-%d'
+            ).date()
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Date invalide (format attendu : YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if date_to < date_from:
+            return Response(
+                {'error': 'date_to doit être postérieure à date_from'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        created = jobs.create_absences(date_from, date_to)
+        absences_created = sum(created.values())
+        
+        if date_from == date_to:
+            message = f'{absences_created} absences créées pour le {date_from}'
+        else:
+            message = f'{absences_created} absences créées du {date_from} au {date_to}'
         return Response({
             'success': True,
-            'message': f'{absences_created} absences créées pour le {absence_date}',
-            'absences_created': absences_created
-        })
\ No newline at end of file
+            'message': message,
+            'absences_created': absences_created,
+            'details': {day.isoformat(): count for day, count in created.items()}
+        })
+
+class AttendanceAnomalyViewSet(ShapedViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet pour les anomalies de pointage détectées par l'analyse nocturne (RH uniquement)
+    """
+    serializer_class = AttendanceAnomalySerializer
+    permission_classes = [permissions.IsAuthenticated, IsRH]
+    
+    def get_queryset(self):
+        queryset = AttendanceAnomaly.objects.all()
+        
+        # Filtres
+        kind = self.request.query_params.get('kind')
+        status_filter = self.request.query_params.get('status')
+        date_from = self.request.query_params.get('date_from')
+        date_to = self.request.query_params.get('date_to')
+        employee_id = self.request.query_params.get('employee_id')
+        
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        if employee_id:
+            queryset = queryset.filter(employee_id=employee_id)
+        
+        queryset = self.get_shape().select_related(
+            queryset, {'employee': 'employee'}, computed={'resolved_by_name': 'resolved_by'}
+        )
+        return queryset.order_by('-date', 'kind', 'id')
+    
+    @action(detail=True, methods=['patch'])
+    def resolve(self, request, pk=None):
+        """Marquer une anomalie comme résolue (elle ne sera plus supprimée par les analyses suivantes)"""
+        anomaly = self.get_object()
+        anomaly.status = 'RESOLUE'
+        anomaly.resolved_by = request.user
+        anomaly.resolved_at = timezone.now()
+        anomaly.save()
+        return Response(self.get_serializer(anomaly).data)
@@ -0,0 +1,93 @@
+"""
+Calendrier de travail : jours de repos hebdomadaires, jours fériés et
+fermetures du site.
+
+Le calendrier est compilé en un tableau d'octets par année (1 = jour
+travaillé) : savoir si un jour est travaillé ou compter les jours travaillés
+d'une période ne demande aucune requête. Les tableaux sont reconstruits
+quand les jours fériés ou les fermetures changent.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from .cache import TableVersionCache
+from .models import Holiday, SiteClosure
+
+
+def _load_exceptions():
+    """Jours fériés (ponctuels et récurrents) et fermetures du site"""
+    fixed = set()
+    recurring = set()
+    for day, is_recurring in Holiday.objects.values_list('date', 'recurring'):
+        if is_recurring:
+            recurring.add((day.month, day.day))
+        else:
+            fixed.add(day)
+    closures = list(SiteClosure.objects.values_list('start_date', 'end_date'))
+    return {'fixed': fixed, 'recurring': recurring, 'closures': closures, 'years': {}}
+
+
+class WorkCalendar:
+    def __init__(self):
+        self._cache = TableVersionCache([Holiday, SiteClosure], _load_exceptions)
+
+    @property
+    def rest_days(self):
+        return set(getattr(settings, 'WORK_WEEKLY_REST_DAYS', (6,)))
+
+    def _bitmap(self, year):
+        exceptions = self._cache.get()
+        bitmap = exceptions['years'].get(year)
+        if bitmap is not None:
+            return bitmap
+        first = date(year, 1, 1)
+        length = (date(year + 1, 1, 1) - first).days
+        rest_days = self.rest_days
+        bitmap = bytearray(
+            0 if (first + timedelta(days=i)).weekday() in rest_days else 1
+            for i in range(length)
+        )
+        for offset in range(length):
+            day = first + timedelta(days=offset)
+            if day in exceptions['fixed'] or (day.month, day.day) in exceptions['recurring']:
+                bitmap[offset] = 0
+        for start, end in exceptions['closures']:
+            start, end = max(start, first), min(end, date(year, 12, 31))
+            for offset in range((start - first).days, (end - first).days + 1):
+                bitmap[offset] = 0
+        bitmap = bytes(bitmap)
+        exceptions['years'][year] = bitmap
+        return bitmap
+
+    def is_working_day(self, day):
+        """Vrai si `day` est un jour travaillé"""
+        return self._bitmap(day.year)[day.timetuple().tm_yday - 1] == 1
+
+    def working_days(self, date_from, date_to):
+        """Nombre de jours travaillés de date_from à date_to inclus"""
+        total = 0
+        for year in range(date_from.year, date_to.year + 1):
+            start = date_from if year == date_from.year else date(year, 1, 1)
+            end = date_to if year == date_to.year else date(year, 12, 31)
+            if start > end:
+                continue
+            total += self._bitmap(year).count(1, start.timetuple().tm_yday - 1, end.timetuple().tm_yday)
+        return total
+
+    def non_working_days(self, date_from, date_to):
+        """Liste des jours non travaillés de date_from à date_to inclus"""
+        days = []
+        day = date_from
+        while day <= date_to:
+            if not self.is_working_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def invalidate(self):
+        """Force la relecture des jours fériés et fermetures au prochain appel"""
+        self._cache.invalidate()
+
+
+work_calendar = WorkCalendar()
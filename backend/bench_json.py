@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'encodage des réponses : JSONRenderer de DRF (json standard),
+FastJSONRenderer (orjson) et MessagePackRenderer (msgpack), sur des charges
+réelles lues dans la base configurée (pages de présences, logs biométriques,
+liste fusionnée mes-absences).
+
+Usage : python bench_json.py [répétitions]
+"""
+import os
+import sys
+import time as clock
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'preslog.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+
+from attendance.fastpath import PRESENCE_SPEC, RETARD_SPEC, ABSENCE_SPEC, BIOMETRIC_LOG_SPEC
+from attendance.models import Presence, Retard, Absence, BiometricLog
+from preslog import renderers
+
+
+def payloads():
+    """Charges représentatives des plus grosses réponses de l'API"""
+    presences = Presence.objects.order_by('-date', '-created_at')
+    logs = BiometricLog.objects.order_by('-timestamp')
+    pages = [
+        ('presences', PRESENCE_SPEC.serialize(presences[:20])),
+        ('presences', PRESENCE_SPEC.serialize(presences[:1000])),
+        ('logs', BIOMETRIC_LOG_SPEC.serialize(logs[:1000])),
+    ]
+    for name, rows in pages:
+        yield f'{name} ({len(rows)})', {'count': len(rows), 'next': None, 'previous': None, 'results': rows}
+    merged = (
+        [dict(row, type='ABSENCE') for row in ABSENCE_SPEC.serialize(Absence.objects.order_by('-date')[:250])] +
+        [dict(row, type='RETARD') for row in RETARD_SPEC.serialize(Retard.objects.order_by('-date')[:250])]
+    )
+    yield f'mes-absences ({len(merged)})', merged
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        started = clock.perf_counter()
+        result = func()
+        elapsed = clock.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    encoders = [('json (DRF)', JSONRenderer())]
+    if renderers.orjson is not None:
+        encoders.append(('orjson', renderers.FastJSONRenderer()))
+    else:
+        print("orjson non installé : FastJSONRenderer se replie sur json")
+    if renderers.msgpack is not None:
+        encoders.append(('msgpack', renderers.MessagePackRenderer()))
+    else:
+        print("msgpack non installé : format MessagePack ignoré")
+
+    for name, data in payloads():
+        print(f"\n{name}")
+        reference = None
+        for label, renderer in encoders:
+            elapsed, body = best_of(repeat, lambda: renderer.render(data))
+            reference = reference or elapsed
+            print(f"  {label:<12} {elapsed * 1000:>8.2f} ms  {len(body) / 1024:>8.1f} Kio  {reference / elapsed:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
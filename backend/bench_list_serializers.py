@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Benchmark des listes : sérialiseurs DRF contre lecture rapide (values() +
+champs calculés en SQL, voir attendance/fastpath.py).
+Utilise les données de la base configurée ; mesure le coût par ligne,
+requêtes comprises, et vérifie que les deux sorties sont identiques.
+
+Usage : python bench_list_serializers.py [nb_lignes] [répétitions]
+"""
+import json
+import os
+import sys
+import time as clock
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'preslog.settings')
+django.setup()
+
+from attendance.fastpath import PRESENCE_SPEC, RETARD_SPEC, ABSENCE_SPEC
+from attendance.models import Presence, Retard, Absence
+from attendance.serializers import PresenceSerializer, RetardSerializer, AbsenceSerializer
+
+CASES = [
+    ('presences', Presence.objects.select_related('employee').order_by('-date', '-created_at'),
+     PresenceSerializer, PRESENCE_SPEC),
+    ('retards', Retard.objects.select_related('employee', 'presence', 'validated_by').order_by('-date', '-created_at'),
+     RetardSerializer, RETARD_SPEC),
+    ('absences', Absence.objects.select_related('employee', 'validated_by').order_by('-date', '-created_at'),
+     AbsenceSerializer, ABSENCE_SPEC),
+]
+
+
+def best_of(repeat, func):
+    """Meilleure durée sur plusieurs exécutions"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = clock.perf_counter()
+        result = func()
+        elapsed = clock.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{'liste':<10} {'lignes':>7} {'sérialiseur':>14} {'rapide':>12} {'gain':>6}")
+    for name, queryset, serializer_class, spec in CASES:
+        page = queryset[:rows]
+        # .all() : nouvelle requête à chaque exécution (pas de cache du queryset)
+        slow, slow_data = best_of(repeat, lambda: serializer_class(page.all(), many=True).data)
+        fast, fast_data = best_of(repeat, lambda: spec.serialize(page.all()))
+        count = len(fast_data)
+        if not count:
+            print(f"{name:<10} {0:>7}   (aucune donnée)")
+            continue
+        if json.loads(json.dumps(slow_data)) != fast_data:
+            print(f"{name:<10} ATTENTION : sorties différentes")
+        print(
+            f"{name:<10} {count:>7} {slow / count * 1e6:>10.1f} µs/l {fast / count * 1e6:>8.1f} µs/l "
+            f"{slow / fast:>5.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Benchmark du rendu parallèle des lots de PDF de présences.
+Les lignes sont générées en mémoire (aucune base de données nécessaire) afin
+de mesurer uniquement le coût de rendu ReportLab et de l'archivage ZIP.
+
+Usage : python bench_pdf_bundle.py [nb_employes] [nb_jours]
+"""
+import os
+import sys
+import time as clock
+from datetime import date, time, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'preslog.settings')
+django.setup()
+
+from attendance.reports import iter_zip_bundle, period_label
+
+
+def make_jobs(employees, days):
+    """Construire des jobs de rendu synthétiques"""
+    start = date(2024, 1, 1)
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        late = offset % 4 == 0
+        rows.append((day, time(8, 17) if late else time(7, 55), time(17, 30), late, 17 if late else 0))
+    period = period_label(start, start + timedelta(days=days - 1))
+    return [
+        (f"presences_{i}.pdf", f"Employé {i} (employe{i}@secel.com)", period, rows)
+        for i in range(employees)
+    ]
+
+
+def bench(jobs, workers):
+    """Durée de génération de l'archive complète"""
+    started = clock.perf_counter()
+    size = sum(len(chunk) for chunk in iter_zip_bundle(jobs, workers))
+    return clock.perf_counter() - started, size
+
+
+if __name__ == '__main__':
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    jobs = make_jobs(employees, days)
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    print(f"Lot de {employees} PDF ({days} lignes chacun), {cores} cœurs disponibles")
+    baseline = None
+    for workers in counts:
+        elapsed, size = bench(jobs, workers)
+        baseline = baseline or elapsed
+        print(f"  {workers:>2} processus : {elapsed:6.2f} s  "
+              f"(accélération x{baseline / elapsed:4.2f}, archive {size / 1024:.0f} Ko)")
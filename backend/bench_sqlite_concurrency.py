@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Test de concurrence SQLite : plusieurs threads envoient en même temps des
+pointages (receive-punch, traités par process_log) et des corrections en
+masse (bulk-manual-punch, transaction qui lit puis écrit).
+
+Le test s'exécute sur une base temporaire (migrée au lancement) et compare :
+- le moteur configuré (preslog.sqlite : WAL, BEGIN IMMEDIATE, file d'écriture) ;
+- avec --stock, le moteur SQLite de Django sans réglage (mode de journal
+  par défaut, transactions différées).
+Chaque erreur « database is locked » et chaque pointage non traité est compté ;
+le code de retour est non nul en cas d'erreur.
+
+Usage : python bench_sqlite_concurrency.py [threads] [tours] [--stock]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time as clock
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'preslog.settings')
+
+from django.conf import settings
+
+STOCK = '--stock' in sys.argv
+ARGS = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+
+TMP_DIR = tempfile.mkdtemp(prefix='preslog-concurrency-')
+if STOCK:
+    settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}}
+settings.DATABASES['default']['NAME'] = os.path.join(TMP_DIR, 'db.sqlite3')
+# Mesure de la base seule : pas de limitation de débit ni de file de rapports
+settings.INGEST_THROTTLE_RATES = {'device': (10 ** 6, 10 ** 6), 'client': (10 ** 6, 10 ** 6)}
+settings.ALLOWED_HOSTS = ['*']
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APIClient
+
+from attendance.models import BiometricLog, Presence
+
+User = get_user_model()
+
+
+def worker(index, rounds, rh, employees, day, results):
+    client = APIClient()
+    client.force_authenticate(rh)
+    employee = employees[index]
+    try:
+        for round_ in range(rounds):
+            current = day + timedelta(days=round_)
+            for log_type, at in (('ENTREE', '08:20'), ('SORTIE', '17:10')):
+                started = clock.perf_counter()
+                response = client.post('/api/attendance/biometric-logs/receive_punch/', {
+                    'biometric_id': employee.biometric_id, 'log_type': log_type,
+                    'timestamp': f'{current.isoformat()}T{at}:00+01:00', 'device_id': 'BENCH',
+                }, format='json')
+                results.append(('receive-punch', response.status_code, response.content, clock.perf_counter() - started))
+            # Correction en masse de l'employé et de ses voisins (lignes partagées entre threads)
+            neighbours = [employees[(index + offset) % len(employees)] for offset in range(3)]
+            started = clock.perf_counter()
+            response = client.post('/api/attendance/presences/bulk-manual-punch/', {'punches': [
+                {'employee_id': other.id, 'date': current.isoformat(), 'time_out': '17:30'} for other in neighbours
+            ]}, format='json')
+            results.append(('bulk-manual-punch', response.status_code, response.content, clock.perf_counter() - started))
+    except Exception as exc:
+        results.append(('exception', 500, repr(exc).encode(), 0))
+    finally:
+        connection.close()
+
+
+def main():
+    threads = int(ARGS[0]) if ARGS else 8
+    rounds = int(ARGS[1]) if len(ARGS) > 1 else 5
+    call_command('migrate', verbosity=0)
+    with connection.cursor() as cursor:
+        journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+    engine = settings.DATABASES['default']['ENGINE']
+    print(f"Moteur : {engine} (journal {journal_mode}), {threads} threads x {rounds} tours")
+
+    rh = User.objects.create_user(username='bench-rh', role='RH')
+    employees = [
+        User.objects.create_user(username=f'bench-{index}', role='EMPLOYE', biometric_id=f'BENCH-{index}')
+        for index in range(threads)
+    ]
+    day = date.today() + timedelta(days=1)
+    connection.close()
+
+    results = []
+    pool = [threading.Thread(target=worker, args=(index, rounds, rh, employees, day, results))
+            for index in range(threads)]
+    started = clock.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = clock.perf_counter() - started
+
+    failed = [result for result in results if result[1] >= 400]
+    locked = [result for result in failed if b'locked' in result[2]]
+    unprocessed = BiometricLog.objects.filter(device_id='BENCH', processed=False).count()
+    closed = Presence.objects.filter(employee__in=employees, time_out__isnull=False).count()
+    latencies = sorted(result[3] for result in results if result[3])
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0
+    print(f"{len(results)} requêtes en {elapsed:.2f} s ({len(results) / elapsed:.0f}/s), p95 {p95:.0f} ms")
+    print(f"erreurs : {len(failed)} (dont « database is locked » : {len(locked)}), "
+          f"pointages non traités : {unprocessed}, présences clôturées : {closed}/{threads * rounds}")
+    for name, status_code, content, _ in failed[:5]:
+        print(f"  {name} HTTP {status_code} : {content[:200]!r}")
+    connection.close()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+    sys.exit(1 if failed or unprocessed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Files de priorité : séparer la réception des pointages des rapports lourds.
+
+Chaque requête est classée par son URL (et sa méthode) dans une file de
+REQUEST_LANES : `ingest` (pointages des dispositifs), `reporting` (exports,
+statistiques, traitements en masse) ou `interactive` (le reste). Une file peut
+limiter le nombre de requêtes traitées simultanément (`limit`) : au-delà, les
+requêtes attendent leur tour au plus `queue_timeout` secondes, dans une file
+d'au plus `max_queue` requêtes, puis reçoivent 503 avec `Retry-After`.
+
+En bornant `reporting` en dessous du nombre de threads d'un processus, des
+threads restent toujours libres pour `ingest`, dont la latence ne dépend plus
+des exports en cours. Les limites s'appliquent par processus (serveur à
+threads, ex. gunicorn --threads) ; les expressions de REQUEST_LANES peuvent
+aussi servir à router chaque file vers son propre pool au niveau du proxy.
+
+Les compteurs de chaque file (en cours, en attente, traitées, refusées,
+latences) sont exposés par `GET /api/metrics/lanes/` (RH/DG).
+"""
+import math
+import re
+import threading
+import time as clock
+from collections import deque
+
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+DEFAULT_LANE = 'interactive'
+# Durées conservées par file pour les percentiles
+LATENCY_SAMPLES = 500
+
+
+class Lane:
+    """File de requêtes à concurrence bornée (limit=None : sans limite)"""
+
+    def __init__(self, name, limit=None, queue_timeout=0, max_queue=0, routes=()):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.routes = [self._compile(route) for route in routes]
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @staticmethod
+    def _compile(route):
+        """'POST ^/api/...' (méthodes facultatives, séparées par des virgules) -> (méthodes, regex)"""
+        methods, _, pattern = route.rpartition(' ')
+        return {method.strip().upper() for method in methods.split(',') if method.strip()}, re.compile(pattern)
+
+    def matches(self, method, path):
+        return any((not methods or method in methods) and pattern.search(path) for methods, pattern in self.routes)
+
+    def acquire(self):
+        """Attendre une place ; renvoie l'attente (secondes), ou None si la requête est refusée"""
+        if self.limit is None:
+            with self._cond:
+                self.in_flight += 1
+            return 0.0
+        start = clock.monotonic()
+        with self._cond:
+            if self.in_flight >= self.limit:
+                if self.queued >= self.max_queue:
+                    self.rejected += 1
+                    return None
+                self.queued += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self.in_flight < self.limit, self.queue_timeout)
+                finally:
+                    self.queued -= 1
+                if not admitted:
+                    self.rejected += 1
+                    return None
+            self.in_flight += 1
+            waited = clock.monotonic() - start
+            self.total_wait += waited
+            return waited
+
+    def release(self, duration):
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            self.latencies.append(duration)
+            self._cond.notify()
+
+    def retry_after(self):
+        return max(1, math.ceil(self.queue_timeout or 1))
+
+    def snapshot(self):
+        with self._cond:
+            latencies = sorted(self.latencies)
+            completed, total_wait = self.completed, self.total_wait
+            data = {
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'completed': completed,
+                'rejected': self.rejected,
+            }
+
+        def percentile(ratio):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(ratio * len(latencies)))] * 1000, 1)
+
+        data.update({
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1)},
+            'avg_queue_wait_ms': round(total_wait / completed * 1000, 1) if completed else None,
+        })
+        return data
+
+
+class LaneRouter:
+    """Files construites depuis REQUEST_LANES ; la première qui correspond l'emporte"""
+
+    def __init__(self, config):
+        self.lanes = {name: Lane(name, **options) for name, options in config.items()}
+        if DEFAULT_LANE not in self.lanes:
+            self.lanes[DEFAULT_LANE] = Lane(DEFAULT_LANE)
+
+    def route(self, request):
+        for lane in self.lanes.values():
+            if lane.matches(request.method, request.path_info):
+                return lane
+        return self.lanes[DEFAULT_LANE]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LaneRouter(getattr(settings, 'REQUEST_LANES', {}))
+    return _router
+
+
+class PriorityLaneMiddleware:
+    """Classe la requête dans sa file, attend une place et la libère à la fin de la réponse"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        lane = get_router().route(request)
+        waited = lane.acquire()
+        if waited is None:
+            response = JsonResponse(
+                {'detail': "Serveur occupé, réessayez plus tard.", 'lane': lane.name},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = str(lane.retry_after())
+            response['X-Request-Lane'] = lane.name
+            return response
+
+        start = clock.monotonic()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            lane.release(clock.monotonic() - start)
+            raise
+        response['X-Request-Lane'] = lane.name
+        if response.streaming:
+            # Place gardée jusqu'à la fermeture de la réponse (archives, exports en flux)
+            response.streaming_content = _ReleasingContent(response.streaming_content, lane, start)
+        else:
+            lane.release(clock.monotonic() - start)
+        return response
+
+
+class _ReleasingContent:
+    """Contenu en flux qui libère la place de sa file à sa fermeture (une seule fois)"""
+
+    def __init__(self, content, lane, start):
+        self.content = content
+        self.lane = lane
+        self.start = start
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def close(self):
+        if hasattr(self.content, 'close'):
+            self.content.close()
+        if not self.released:
+            self.released = True
+            self.lane.release(clock.monotonic() - self.start)
+
+
+@api_view(['GET'])
+def lane_metrics(request):
+    """Compteurs des files de priorité de ce processus (RH/DG)"""
+    if request.user.role not in ['DG', 'RH']:
+        return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+    return Response({name: lane.snapshot() for name, lane in get_router().lanes.items()})
@@ -0,0 +1,160 @@
+"""
+Pagination par clé (curseur) pour les listes volumineuses.
+
+Une page est lue par « WHERE (date, id) < (dernière date, dernier id)
+ORDER BY date DESC, id DESC LIMIT n » sur un index composite : le coût est
+le même quelle que soit la profondeur, sans COUNT(*) ni OFFSET.
+
+Les vues déclarent leur clé de tri dans `keyset_ordering`, par exemple
+('-date', '-id'). Les vues sans clé, ou les requêtes qui passent `?page=`,
+gardent la pagination par numéro de page (avec `count`).
+"""
+import base64
+import json
+from urllib import parse
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide.'
+    fallback_class = PageNumberPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, 'keyset_ordering', None)
+        if not ordering or self.fallback_class.page_query_param in request.query_params:
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+        self.fallback = None
+
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+        self.model = queryset.model
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse, position = cursor if cursor else (False, None)
+
+        # Page précédente : on lit dans l'ordre inverse puis on retourne la page
+        order = [('-' if self.descending != reverse else '') + field for field in self.fields]
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, self.descending != reverse))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self.key(rows[-1]) if has_next and rows else None
+        self.previous_position = self.key(rows[0]) if has_previous and rows else None
+        return rows
+
+    def after(self, position, descending):
+        """Condition « strictement après `position` » dans l'ordre de lecture"""
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            clause = Q(**{f'{field}__{lookup}': position[index]})
+            for previous, value in zip(self.fields[:index], position[:index]):
+                clause &= Q(**{previous: value})
+            condition |= clause
+        # Borne redondante sur le premier champ : sans elle, le OR empêche la
+        # base de parcourir l'index à partir de la position (lecture complète)
+        return Q(**{f'{self.fields[0]}__{lookup}e': position[0]}) & condition
+
+    def key(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    # Curseur : liste JSON encodée en base64, [sens inverse, valeurs de la clé]
+
+    def encode_cursor(self, position, reverse):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        payload = json.dumps([int(reverse), values], separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(parse.unquote(encoded) + '=' * (-len(encoded) % 4))
+            reverse, values = json.loads(payload)
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [self.to_python(field, value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+    def to_python(self, field, value):
+        try:
+            model_field = self.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            # Annotation (discriminant d'un UNION, ...) : chaîne telle quelle
+            if not isinstance(value, str):
+                raise ValueError(field)
+            return value
+        return model_field.to_python(value)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def to_html(self):
+        if self.fallback is not None:
+            return self.fallback.to_html()
+        return ''
+
+    @property
+    def display_page_controls(self):
+        return self.fallback is not None and self.fallback.display_page_controls
@@ -0,0 +1,113 @@
+"""
+Rendus et analyseurs rapides pour l'API REST.
+
+- FastJSONRenderer / FastJSONParser : JSON encodé et décodé par orjson
+  (UUID et dictionnaires natifs, dates et heures formatées comme par DRF), avec repli
+  automatique sur l'implémentation standard de DRF si orjson n'est pas
+  installé ou si une indentation est demandée (API navigable, `indent=`).
+- MessagePackRenderer / MessagePackParser : type `application/msgpack` pour
+  les dispositifs et les clients de synchronisation (nécessite msgpack).
+
+Les autres types (Decimal, chaînes traduites paresseuses, querysets, ...) sont
+convertis comme le fait l'encodeur JSON de DRF.
+"""
+import datetime
+import decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    msgpack = None
+
+_drf_default = JSONEncoder().default
+
+if orjson is not None:
+    # Dates et heures confiées à l'encodeur de DRF (millisecondes, 'Z') : sortie identique
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Types non gérés nativement : même conversion que l'encodeur de DRF"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _drf_default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encodé par orjson (sortie compacte, UTF-8)"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        # Comme DRF : \u2028 et \u2029 échappés pour rester un sous-ensemble de JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser décodé par orjson (corps UTF-8)"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def _msgpack_default(obj):
+    """Dates et heures en ISO 8601, comme dans les réponses JSON"""
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    return _default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Réponses au format MessagePack (Accept: application/msgpack)"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Corps de requête au format MessagePack (Content-Type: application/msgpack)"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
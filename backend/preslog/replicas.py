@@ -0,0 +1,135 @@
+"""
+Lectures des rapports sur une réplique de la base.
+
+Les vues de rapport (statistiques, tableau de bord, exports) déclarent leurs
+actions dans `replica_actions` (ReplicaReadMixin) ; les commandes d'export
+utilisent `use_replica()`. Pendant ces lectures, ReplicaRouter envoie les
+requêtes de lecture vers l'alias REPLICA_DATABASE ; les écritures restent
+toujours sur `default`. Sans réplique configurée, tout reste sur `default`.
+
+Lecture de ses propres écritures : après une requête d'écriture réussie d'un
+utilisateur, ses rapports sont lus sur `default` pendant
+REPLICA_STICKY_SECONDS (délai de réplication toléré). L'épinglage est gardé
+dans le cache REPLICA_PIN_CACHE, qui doit être partagé entre les processus
+(base de données, Redis, Memcached) pour valoir quel que soit le processus
+qui traite la requête suivante.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import permissions
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+PIN_PREFIX = 'replica-pin:'
+
+
+def replica_alias():
+    """Alias de la réplique, ou None si elle n'est pas configurée"""
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Lectures du bloc sur la réplique (si elle est configurée)"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE]
+
+
+def check_pin_cache():
+    """Refuse un cache d'épinglage propre au processus lorsqu'une réplique est configurée"""
+    if replica_alias() and isinstance(_pin_cache(), (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f"REPLICA_PIN_CACHE ({settings.REPLICA_PIN_CACHE}) doit être partagé entre les "
+            "processus (DatabaseCache, Redis, Memcached) lorsqu'une réplique est configurée"
+        )
+
+
+def pin_to_primary(user_id):
+    """Lire les prochains rapports de l'utilisateur sur `default`"""
+    sticky = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    if sticky:
+        _pin_cache().set(f'{PIN_PREFIX}{user_id}', True, sticky)
+
+
+def is_pinned(user_id):
+    return bool(_pin_cache().get(f'{PIN_PREFIX}{user_id}'))
+
+
+class ReplicaRouter:
+    """Lectures sur la réplique dans un bloc use_replica(), écritures sur `default`"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicite : un objet lu sur la réplique est enregistré sur `default`
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données sur `default` et la réplique ; None : utilisateur construit
+        # sans base (voir users/authentication.py)
+        aliases = {DEFAULT_DB_ALIAS, replica_alias(), None}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma par réplication
+        return db != replica_alias()
+
+
+class ReplicaReadMixin:
+    """
+    Lit les actions listées dans `replica_actions` d'un ViewSet sur la
+    réplique, sauf juste après une écriture de l'utilisateur
+    """
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Sans réplique, rien à router (et le cache d'épinglage n'est pas lu)
+        if not replica_alias() or getattr(self, 'action', None) not in self.replica_actions:
+            return
+        if not is_pinned(request.user.pk):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """Après une écriture réussie d'un utilisateur, ses lectures de rapports restent sur `default`"""
+
+    def __init__(self, get_response):
+        check_pin_cache()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in permissions.SAFE_METHODS and response.status_code < 400 and replica_alias():
+            # request.user est renseigné par l'authentification DRF (JWT)
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
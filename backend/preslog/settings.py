@@ -3,7 +3,8 @@ Django settings for preslog project.
 """
 
 from pathlib import Path
-from datetime import timedelta
+from datetime import time, timedelta
+from importlib.util import find_spec
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,11 +34,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    # Files de priorité (ingestion / interactif / rapports), voir preslog/lanes.py
+    'preslog.lanes.PriorityLaneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Lecture de ses propres écritures : rapports lus sur `default` après une écriture
+    'preslog.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,11 +68,93 @@ TEMPLATES = [
 WSGI_APPLICATION = 'preslog.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE=sqlite (défaut, développement) ou postgres (production)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'preslog'),
+            'USER': os.environ.get('POSTGRES_USER', 'preslog'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Connexions persistantes (secondes), vérifiées avant réutilisation
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+                'application_name': 'preslog',
+                # Durée maximale d'une requête et d'une attente de verrou (ms)
+                'options': '-c statement_timeout={} -c lock_timeout={}'.format(
+                    int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000)),
+                    int(os.environ.get('DB_LOCK_TIMEOUT_MS', 5000)),
+                ),
+            },
+        }
+    }
+    if os.environ.get('DB_POOLER') == 'pgbouncer':
+        # PgBouncer en mode transaction : pas de curseurs serveur ni de paramètres
+        # de démarrage (délais à fixer sur le rôle : ALTER ROLE ... SET statement_timeout)
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+        del DATABASES['default']['OPTIONS']['options']
+else:
+    DATABASES = {
+        'default': {
+            # SQLite réglé pour les écritures concurrentes, voir preslog/sqlite/base.py
+            'ENGINE': 'preslog.sqlite',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Attente maximale du verrou d'écriture (secondes)
+                'timeout': 20,
+                # Journal WAL : les lectures ne bloquent plus les écritures
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY'
+                ),
+                'transaction_mode': 'IMMEDIATE',
+                # File d'écriture unique par processus (SQLITE_SERIALIZE_WRITES=0 pour la désactiver)
+                'serialize_writes': os.environ.get('SQLITE_SERIALIZE_WRITES', '1') == '1',
+            },
+        }
+    }
+
+# Réplique en lecture pour les rapports (preslog/replicas.py) : DB_REPLICA_HOST
+# (PostgreSQL) ou DB_REPLICA_NAME (SQLite : copie de la base, ouverte en lecture seule)
+DATABASE_ROUTERS = ['preslog.replicas.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+if DB_PROFILE == 'postgres' and os.environ.get('DB_REPLICA_HOST'):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif DB_PROFILE != 'postgres' and os.environ.get('DB_REPLICA_NAME'):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'NAME': f"file:{os.environ['DB_REPLICA_NAME']}?mode=ro",
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
     }
+# Après une écriture, les rapports de l'utilisateur sont lus sur `default` pendant ce délai
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+# Cache des épinglages, partagé entre processus : par défaut en base
+# (table créée par python manage.py migrate), ou un alias Redis / Memcached. Un cache
+# propre au processus (LocMemCache) est refusé lorsqu'une réplique est configurée.
+REPLICA_PIN_CACHE = os.environ.get('REPLICA_PIN_CACHE', 'replica-pins')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'replica-pins': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'replica_pin_cache',
+    },
 }
 
 # Password validation
@@ -100,21 +187,57 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Exports générés (archives de PDF, fichiers pour la paie, etc.)
+EXPORTS_ROOT = os.path.join(MEDIA_ROOT, 'exports')
+EXPORTS_RETENTION_DAYS = 30
+
+# Nombre de processus pour le rendu des lots de PDF (défaut : nombre de cœurs)
+PDF_BUNDLE_WORKERS = int(os.environ.get('PDF_BUNDLE_WORKERS', 0)) or os.cpu_count()
+
+# Jours de repos hebdomadaires (0 = lundi ... 6 = dimanche)
+WORK_WEEKLY_REST_DAYS = (6,)
+
+# Horaire (entrée, sortie) des employés sans affectation d'horaire
+WORK_DEFAULT_SHIFT = (time(8, 0), time(18, 0))
+
+# Clôture automatique des présences sans sortie en fin de journée :
+# 'shift_end' (heure de fin de l'horaire), 'cap' (entrée + PRESENCE_AUTO_CLOSE_CAP_HOURS)
+# ou 'flag' (présence laissée ouverte et signalée en anomalie)
+PRESENCE_AUTO_CLOSE_POLICY = os.environ.get('PRESENCE_AUTO_CLOSE_POLICY', 'shift_end')
+PRESENCE_AUTO_CLOSE_CAP_HOURS = 8
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Pagination par curseur pour les vues qui déclarent `keyset_ordering`,
+    # par numéro de page (?page=) pour les autres
+    'DEFAULT_PAGINATION_CLASS': 'preslog.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
+    # JSON encodé/décodé par orjson (repli sur json s'il n'est pas installé)
+    'DEFAULT_RENDERER_CLASSES': [
+        'preslog.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'preslog.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack (application/msgpack) pour les dispositifs et la synchronisation, si installé
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('preslog.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('preslog.renderers.MessagePackParser')
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=8),
@@ -134,6 +257,56 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
+}
+
+# Les jetons portent le rôle et l'identité : pas de lecture de l'utilisateur
+# par requête. L'état de chaque compte (actif, rôle) est relu au plus toutes
+# les JWT_USER_STATE_TTL secondes (archivage effectif sous ce délai).
+JWT_USER_STATE_TTL = 5
+
+# Dispositifs de pointage (clé d'API, voir attendance/devices.py) : les clés
+# actives sont relues au plus toutes les DEVICE_KEY_CACHE_TTL secondes (délai
+# d'effet d'une désactivation), la date de dernier passage est écrite au plus
+# toutes les DEVICE_LAST_SEEN_FLUSH secondes
+DEVICE_KEY_CACHE_TTL = 30
+DEVICE_LAST_SEEN_FLUSH = 60
+
+# Endpoints d'ingestion (pointages, corrections en masse), voir preslog/throttling.py :
+# seaux à jetons (capacité, jetons par seconde) par dispositif et par client
+INGEST_THROTTLE_RATES = {
+    'device': (30, 1.0),
+    'client': (60, 2.0),
+}
+# Alias de CACHES pour partager seaux et compteur entre processus (None : en mémoire)
+INGEST_THROTTLE_CACHE = os.environ.get('INGEST_THROTTLE_CACHE') or None
+# Requêtes d'ingestion en cours : au-delà du premier seuil, en-tête
+# X-Ingest-Slow-Down ; au-delà du second, refus (503 avec Retry-After)
+INGEST_BACKPRESSURE = (8, 16)
+
+# Files de priorité (preslog/lanes.py) : routes « [MÉTHODES ]regex » testées
+# dans l'ordre, `limit` requêtes simultanées par processus (None : sans limite),
+# attente d'au plus `queue_timeout` secondes pour `max_queue` requêtes, sinon 503.
+# Les rapports restent en dessous du nombre de threads pour garder l'ingestion fluide.
+REQUEST_LANES = {
+    'ingest': {
+        'routes': [
+            r'^/api/attendance/(api/)?biometric/receive-punch/$',
+            r'POST ^/api/attendance/biometric-logs/(receive_punch/)?$',
+        ],
+    },
+    'reporting': {
+        'limit': int(os.environ.get('REPORTING_LANE_LIMIT', 2)),
+        'queue_timeout': 30,
+        'max_queue': 10,
+        'routes': [
+            r'^/api/attendance/(api/)?(presences|retards|absences)/'
+            r'(export|export-excel|export-bundle|statistics|rh-dashboard|recompute-lateness)/$',
+            r'^/api/attendance/(api/)?biometric(-logs)?/create[-_]absences/$',
+        ],
+    },
+    'interactive': {},
 }
 
 # CORS settings
@@ -0,0 +1,80 @@
+"""
+Moteur SQLite adapté aux écritures concurrentes (petits sites sans PostgreSQL).
+
+Options supplémentaires de DATABASES['default']['OPTIONS'] (mêmes noms que
+le moteur SQLite de Django 5.1, qui pourra le remplacer) :
+- `init_command` : instructions exécutées à l'ouverture de chaque connexion
+  (PRAGMA journal_mode=WAL, synchronous, cache_size, ...) ;
+- `transaction_mode` : mode des transactions (`IMMEDIATE` : le verrou
+  d'écriture est pris dès le début de la transaction, en attendant au plus
+  `timeout` secondes, au lieu d'échouer avec « database is locked » quand une
+  transaction qui a lu veut ensuite écrire) ;
+- `serialize_writes` : les transactions d'un même processus attendent leur
+  tour dans une file (verrou) avant de demander le verrou de la base, plutôt
+  que de l'attendre par scrutation.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+# File des transactions d'écriture du processus (partagée par les connexions)
+WRITE_LOCK = threading.Lock()
+
+TRANSACTION_MODES = {'DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.init_command = kwargs.pop('init_command', None)
+        self.serialize_writes = kwargs.pop('serialize_writes', False)
+        self.write_wait = kwargs.get('timeout', 5)
+        mode = (kwargs.pop('transaction_mode', None) or 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode invalide : {mode} (valeurs possibles : {', '.join(sorted(TRANSACTION_MODES))})"
+            )
+        self.transaction_mode = mode
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in (self.init_command or '').split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.serialize_writes and not getattr(self, 'holds_write_lock', False):
+            # Sans place dans le délai : la base attendra elle-même (timeout)
+            self.holds_write_lock = WRITE_LOCK.acquire(timeout=self.write_wait)
+        try:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if getattr(self, 'holds_write_lock', False):
+            self.holds_write_lock = False
+            WRITE_LOCK.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,215 @@
+"""
+Limitation de débit et contre-pression des endpoints d'ingestion (pointages).
+
+- Seau à jetons par dispositif authentifié (clé d'API) et par client
+  (utilisateur ou adresse IP) : chaque requête consomme un jeton, les seaux
+  se remplissent à débit constant jusqu'à leur capacité
+  (INGEST_THROTTLE_RATES). Un seau vide renvoie 429 avec `Retry-After`
+  (secondes avant le prochain jeton).
+- Contre-pression : nombre de requêtes d'ingestion en cours. Au-delà du
+  premier seuil de INGEST_BACKPRESSURE, les réponses portent l'en-tête
+  `X-Ingest-Slow-Down` (secondes à attendre avant le prochain envoi) ; au-delà
+  du second, les requêtes sont refusées (503 avec `Retry-After`) avant de
+  toucher la base.
+
+Les seaux et le compteur sont en mémoire du processus, ou dans un cache
+Django partagé entre processus si INGEST_THROTTLE_CACHE désigne un alias de
+CACHES (mise à jour non atomique : quelques requêtes de plus peuvent passer
+lors d'accès simultanés au même seau).
+"""
+import math
+import threading
+import time as clock
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_RATES = {
+    'device': (30, 1.0),
+    'client': (60, 2.0),
+}
+DEFAULT_BACKPRESSURE = (8, 16)
+
+# Au-delà, les seaux pleins (inactifs) sont oubliés
+MAX_LOCAL_BUCKETS = 10000
+CACHE_PREFIX = 'ingest:'
+# Durée de vie du compteur partagé (un processus arrêté en cours de requête
+# ne le fausse que jusqu'à son expiration)
+INFLIGHT_CACHE_TIMEOUT = 60
+
+
+def _refill(state, capacity, rate, now):
+    tokens, stamp = state if state else (capacity, now)
+    return min(capacity, tokens + (now - stamp) * rate)
+
+
+class LocalStore:
+    """Seaux et compteur en mémoire du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._inflight = 0
+
+    def take(self, key, capacity, rate):
+        """Consommer un jeton ; renvoie l'attente (secondes) si le seau est vide, sinon 0"""
+        now = clock.time()
+        with self._lock:
+            tokens = _refill(self._buckets.get(key), capacity, rate, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > MAX_LOCAL_BUCKETS:
+                self._forget_idle(now, capacity, rate)
+        return 0
+
+    def _forget_idle(self, now, capacity, rate):
+        idle = capacity / rate
+        self._buckets = {key: state for key, state in self._buckets.items() if now - state[1] < idle}
+
+    def enter(self):
+        with self._lock:
+            self._inflight += 1
+            return self._inflight
+
+    def leave(self):
+        with self._lock:
+            self._inflight -= 1
+
+
+class CacheStore:
+    """Seaux et compteur dans un cache Django partagé"""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, rate):
+        now = clock.time()
+        key = CACHE_PREFIX + key
+        tokens = _refill(self.cache.get(key), capacity, rate, now)
+        timeout = math.ceil(capacity / rate) + 1
+        if tokens < 1:
+            self.cache.set(key, (tokens, now), timeout)
+            return (1 - tokens) / rate
+        self.cache.set(key, (tokens - 1, now), timeout)
+        return 0
+
+    def enter(self):
+        key = CACHE_PREFIX + 'inflight'
+        self.cache.add(key, 0, INFLIGHT_CACHE_TIMEOUT)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expiré entre add() et incr()
+            self.cache.add(key, 1, INFLIGHT_CACHE_TIMEOUT)
+            return 1
+
+    def leave(self):
+        try:
+            self.cache.decr(CACHE_PREFIX + 'inflight')
+        except ValueError:
+            pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                alias = getattr(settings, 'INGEST_THROTTLE_CACHE', None)
+                _store = CacheStore(alias) if alias else LocalStore()
+    return _store
+
+
+class IngestRateThrottle(BaseThrottle):
+    """
+    Seau à jetons par dispositif (authentifié par sa clé d'API) et par client ;
+    la requête est refusée si l'un des deux est vide. Le champ `device_id` du
+    corps n'est pas utilisé : le client le choisit librement.
+    """
+
+    def allow_request(self, request, view):
+        rates = getattr(settings, 'INGEST_THROTTLE_RATES', DEFAULT_RATES)
+        store = get_store()
+        waits = [store.take(f'client:{self.client_key(request)}', *rates['client'])]
+        device_id = self.device_key(request)
+        if device_id:
+            waits.append(store.take(f'device:{device_id}', *rates['device']))
+        self._wait = max(waits)
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+    def client_key(self, request):
+        user = request.user
+        if user and user.is_authenticated:
+            return f'user:{user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def device_key(self, request):
+        # Dispositif authentifié (request.auth, voir attendance/devices.py) ; sinon seau du client seul
+        return getattr(request.auth, 'device_id', None)
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Trop de pointages en cours de traitement, réessayez plus tard."
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF ajoute l'en-tête Retry-After pour les exceptions qui portent `wait`
+        self.wait = wait
+
+
+class IngestThrottleMixin:
+    """
+    Limitation de débit et contre-pression pour les actions listées dans
+    `ingest_actions` d'un ViewSet
+    """
+    ingest_actions = ()
+
+    def is_ingest(self):
+        return getattr(self, 'action', None) in self.ingest_actions
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+        if self.is_ingest():
+            throttles.append(IngestRateThrottle())
+        return throttles
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.is_ingest():
+            return
+        soft, hard = getattr(settings, 'INGEST_BACKPRESSURE', DEFAULT_BACKPRESSURE)
+        store = get_store()
+        depth = store.enter()
+        self._ingest_depth = depth
+        if depth > hard:
+            store.leave()
+            self._ingest_depth = None
+            raise Overloaded(wait=self.slow_down_seconds(depth, soft))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        depth = getattr(self, '_ingest_depth', None)
+        if depth is not None:
+            get_store().leave()
+            self._ingest_depth = None
+            soft, _ = getattr(settings, 'INGEST_BACKPRESSURE', DEFAULT_BACKPRESSURE)
+            if depth > soft:
+                response['X-Ingest-Slow-Down'] = str(self.slow_down_seconds(depth, soft))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def slow_down_seconds(self, depth, soft):
+        """Attente conseillée, proportionnelle au dépassement du premier seuil"""
+        return max(1, math.ceil((depth - soft) / max(soft, 1)))
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from .lanes import lane_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +14,7 @@ urlpatterns = [
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/users/', include('users.urls')),
     path('api/attendance/', include('attendance.urls')),
+    path('api/metrics/lanes/', lane_metrics, name='lane-metrics'),
 ]
 
 if settings.DEBUG:
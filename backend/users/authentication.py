@@ -0,0 +1,123 @@
+"""
+Authentification JWT sans requête par appel.
+
+Les jetons portent le rôle, l'état et l'identité de l'utilisateur (claims
+ajoutés à l'émission). L'utilisateur de la requête est construit à partir de
+ces claims, sans lecture de la table des utilisateurs ; les champs absents
+des claims sont chargés à la demande.
+
+L'état courant d'un compte (actif, rôle) est gardé en mémoire par processus
+et relu (ce compte seul) au plus toutes les JWT_USER_STATE_TTL secondes : un
+employé archivé ou un changement de rôle s'applique aux jetons déjà émis en
+quelques secondes.
+
+L'utilisateur construit depuis les claims est en lecture seule : ses champs
+viennent du jeton et peuvent être périmés, son enregistrement ou sa
+suppression lève PermissionDenied.
+"""
+import threading
+import time as clock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.base import DEFERRED
+from django.db.models.signals import post_save, post_delete
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# Champs recopiés dans les jetons (en plus de l'id)
+CLAIM_FIELDS = ('username', 'first_name', 'last_name', 'email', 'role', 'is_active')
+
+def add_user_claims(token, user):
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+class UserStateCache:
+    """
+    (rôle, actif) des comptes vus par ce processus, chacun relu par une
+    requête sur sa clé primaire au plus toutes les `ttl` secondes ; un compte
+    modifié dans ce processus est oublié aussitôt
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {user_id: ((rôle, actif) ou None si le compte n'existe pas, lu à)}
+        self._states = {}
+        post_save.connect(self._invalidate, sender=User, weak=False)
+        post_delete.connect(self._invalidate, sender=User, weak=False)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'JWT_USER_STATE_TTL', 5)
+
+    def get(self, user_id):
+        """(rôle, actif) du compte, ou None s'il n'existe pas"""
+        now = clock.monotonic()
+        cached = self._states.get(user_id)
+        if cached is not None and now - cached[1] < self.ttl:
+            return cached[0]
+        state = User.objects.filter(pk=user_id).values_list('role', 'is_active').first()
+        with self._lock:
+            self._states[user_id] = (state, now)
+        return state
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(user_id, None)
+
+    def _invalidate(self, sender, instance, **kwargs):
+        self.invalidate(instance.pk)
+
+
+user_states = UserStateCache()
+
+
+def active_state(user_id):
+    """Rôle courant du compte ; AuthenticationFailed s'il est archivé ou supprimé"""
+    state = user_states.get(user_id)
+    if state is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    role, is_active = state
+    if not is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return role
+
+
+def claims_user(token, role):
+    """
+    Instance User construite à partir des claims, sans requête : les champs
+    non fournis sont différés (chargés à la première lecture)
+    """
+    loaded = {field: token.get(field, '') for field in CLAIM_FIELDS}
+    loaded.update(id=token[api_settings.USER_ID_CLAIM], role=role, is_active=True)
+    values = [loaded.get(field.attname, DEFERRED) for field in User._meta.concrete_fields]
+    user = User.from_db(None, list(loaded), values)
+    # Claims éventuellement périmés : jamais réécrits en base (voir User.save)
+    user.from_claims = True
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication qui ne lit pas l'utilisateur en base à chaque requête.
+    Les jetons émis sans ces claims (avant leur ajout) sont traités comme
+    par JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return claims_user(validated_token, active_state(user_id))
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import PermissionDenied
 from django.db import models
 
 class User(AbstractUser):
@@ -29,8 +30,27 @@ class User(AbstractUser):
         verbose_name = 'Utilisateur'
         verbose_name_plural = 'Utilisateurs'
     
+    # Vrai pour l'utilisateur construit depuis les claims d'un jeton
+    # (users/authentication.py) : champs éventuellement périmés
+    from_claims = False
+
     def __str__(self):
         return f"{self.get_full_name()} - {self.get_role_display()}"
+
+    def _check_persistable(self):
+        if self.from_claims:
+            raise PermissionDenied(
+                "Un utilisateur construit depuis les claims du jeton ne peut pas être "
+                "enregistré ni supprimé : relire l'utilisateur en base pour le modifier"
+            )
+
+    def save(self, *args, **kwargs):
+        self._check_persistable()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self._check_persistable()
+        return super().delete(*args, **kwargs)
     
     @property
     def is_rh(self):
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import active_state, add_user_claims
 
 User = get_user_model()
 
@@ -38,4 +41,24 @@ class UserUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['first_name', 'last_name', 'email', 'role', 'matricule', 
-                 'telephone', 'date_embauche', 'departement', 'poste', 'is_active'] 
\ No newline at end of file
+                 'telephone', 'date_embauche', 'departement', 'poste', 'is_active'] 
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Jetons portant le rôle et l'identité (lus par StatelessJWTAuthentication)"""
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refuse le rafraîchissement pour un compte archivé ; le rôle suit le compte"""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        role = active_state(refresh[api_settings.USER_ID_CLAIM])
+        if 'role' in refresh:
+            refresh['role'] = role
+            attrs['refresh'] = str(refresh)
+        return super().validate(attrs)
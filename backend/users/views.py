@@ -22,7 +22,8 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Récupérer les informations de l'utilisateur connecté"""
-        serializer = self.get_serializer(request.user)
+        # request.user ne porte que les champs du jeton : profil complet lu ici
+        serializer = self.get_serializer(User.objects.get(pk=request.user.pk))
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])